@@ -16,7 +16,7 @@ import subprocess
 import time
 import sys
 from alsaaudio import Mixer
-from threading import Thread, Timer
+from threading import Thread
 
 import serial
 
@@ -35,6 +35,7 @@ from mycroft.util import play_wav, create_signal, connected, \
     wait_while_speaking
 from mycroft.util.audio_test import record
 from mycroft.util.log import LOG
+from mycroft.util.timer_service import TimerService
 from queue import Queue
 
 
@@ -265,7 +266,7 @@ class Enclosure(object):
         # any acknowledgement of the "system.version" within those
         # 5 seconds, assume there is nothing on the other end (e.g.
         # we aren't running a Mark 1 with an Arduino)
-        Timer(5, self.check_for_response).start()
+        TimerService.get().call_later(5, self.check_for_response)
 
         # Notifications from mycroft-core
         self.ws.on("enclosure.notify.no_internet", self.on_no_internet)
@@ -289,9 +290,9 @@ class Enclosure(object):
             # clients are up and connected to the messagebus in order to
             # receive the "speak".  This was sometimes happening too
             # quickly and the user wasn't notified what to do.
-            Timer(5, self._do_net_check).start()
+            TimerService.get().call_later(5, self._do_net_check)
 
-        Timer(60, self._hack_check_for_duplicates).start()
+        TimerService.get().call_later(60, self._hack_check_for_duplicates)
 
     def on_no_internet(self, event=None):
         if connected():
@@ -33,13 +33,14 @@ So it is common to have '' as the active skill.
 """
 
 import json
-from threading import Thread, Timer
+from threading import Thread
 
 import os
 
 from mycroft.messagebus.client.ws import WebsocketClient
 from mycroft.util import get_ipc_directory
 from mycroft.util.log import LOG
+from mycroft.util.timer_service import TimerService
 
 
 def _write_data(dictionary):
@@ -155,7 +156,7 @@ def initiate_display_manager_ws():
 
     def set_delay(event=None):
         should_remove[0] = True
-        Timer(2, check_flag, [should_remove]).start()
+        TimerService.get().call_later(2, check_flag, should_remove)
 
     def set_remove_flag(event=None):
         should_remove[0] = False
@@ -170,7 +171,7 @@ def initiate_display_manager_ws():
 
     def set_wakeword_skill(event=None):
         set_active("wakeword")
-        Timer(10, remove_wake_word).start()
+        TimerService.get().call_later(10, remove_wake_word)
 
     ws = WebsocketClient()
     ws.on('recognizer_loop:audio_output_end', set_delay)
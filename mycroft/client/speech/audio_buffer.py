@@ -0,0 +1,143 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Buffers for raw audio captured by the listener.
+"""
+import wave
+
+
+def write_wav(filename, chunks, sample_rate, sample_width):
+    """
+        Write mono audio to a wav file, chunk by chunk.
+
+        Args:
+            filename (str): path of the wav file
+            chunks (iterable): bytes-like objects holding the frame data
+            sample_rate (int): samples per second
+            sample_width (int): bytes per sample
+    """
+    wav_file = wave.open(filename, 'wb')
+    try:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(sample_rate)
+        for chunk in chunks:
+            wav_file.writeframesraw(chunk)
+    finally:
+        wav_file.close()
+
+
+class RingBuffer(object):
+    """
+        Fixed size circular buffer keeping the most recent audio.
+
+        The memory is allocated once, appending copies the chunk into it
+        without creating new objects.
+
+        Args:
+            size (int): number of bytes to keep
+    """
+    def __init__(self, size):
+        self.size = size
+        self._data = bytearray(size)
+        self._view = memoryview(self._data)
+        self._end = 0  # Position the next byte is written to
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, chunk):
+        """ Add audio, dropping the oldest audio once the buffer is full. """
+        chunk = memoryview(chunk)[-self.size:]
+        first = min(len(chunk), self.size - self._end)
+        self._view[self._end:self._end + first] = chunk[:first]
+        rest = len(chunk) - first
+        self._view[:rest] = chunk[first:]
+        self._end = (self._end + len(chunk)) % self.size
+        self._len = min(self._len + len(chunk), self.size)
+
+    def views(self, num_bytes=None):
+        """
+            The most recent audio as memoryviews of the buffer, without
+            copying it. The views are only valid until the next append.
+
+            Args:
+                num_bytes (int): bytes to get, all if None
+
+            Returns:
+                list: one or two memoryviews holding the audio in order
+        """
+        if num_bytes is None or num_bytes > self._len:
+            num_bytes = self._len
+        start = self._end - num_bytes
+        if start >= 0:
+            return [self._view[start:self._end]]
+        return [self._view[start:], self._view[:self._end]]
+
+    def get(self, num_bytes=None, padding=b''):
+        """
+            The most recent audio as bytes.
+
+            Args:
+                num_bytes (int): bytes to get, all if None
+                padding (bytes): appended to the audio, copied along with it
+
+            Returns:
+                bytes: the audio followed by the padding
+        """
+        return b''.join(self.views(num_bytes) + [padding])
+
+    def clear(self):
+        self._end = 0
+        self._len = 0
+
+
+class AudioBuffer(object):
+    """
+        Buffer for audio of unknown length, like a recorded phrase.
+
+        Appended chunks are kept in a list and only joined when the audio
+        is requested, copying the audio once instead of on every append.
+
+        Args:
+            data (bytes): audio to start with
+    """
+    def __init__(self, data=b''):
+        self.chunks = [data] if data else []
+        self._len = len(data)
+
+    def __len__(self):
+        return self._len
+
+    def append(self, chunk):
+        self.chunks.append(chunk)
+        self._len += len(chunk)
+
+    def get(self):
+        """
+            All audio as bytes. The joined audio replaces the chunks so
+            asking again doesn't copy it again.
+
+            Returns:
+                bytes: the audio
+        """
+        if len(self.chunks) != 1:
+            self.chunks = [b''.join(self.chunks)]
+        return self.chunks[0]
+
+    def clear(self):
+        self.chunks = []
+        self._len = 0
@@ -39,7 +39,7 @@ class AudioProducer(Thread):
     mic for potential speech chunks and pushes them onto the queue.
     """
 
-    def __init__(self, state, queue, mic, recognizer, emitter):
+    def __init__(self, state, queue, mic, recognizer, emitter, stt=None):
         super(AudioProducer, self).__init__()
         self.daemon = True
         self.state = state
@@ -47,13 +47,18 @@ class AudioProducer(Thread):
         self.mic = mic
         self.recognizer = recognizer
         self.emitter = emitter
+        self.stt = stt
+        self.audio_lost = 0
 
     def run(self):
         with self.mic as source:
             self.recognizer.adjust_for_ambient_noise(source)
             while self.state.running:
                 try:
-                    audio = self.recognizer.listen(source, self.emitter)
+                    # Stream the utterance to the STT engine while it's
+                    # recorded, unless it's only checked for the wakeup word
+                    stt = None if self.state.sleeping else self.stt
+                    audio = self.recognizer.listen(source, self.emitter, stt)
                     self.queue.put(audio)
                 except IOError as e:
                     # NOTE: Audio stack on raspi is slightly different, throws
@@ -62,6 +67,20 @@ class AudioProducer(Thread):
                     # The internet was not helpful.
                     # http://stackoverflow.com/questions/10733903/pyaudio-input-overflowed
                     self.emitter.emit("recognizer_loop:ioerror", e)
+                self.report_stats(source.stream.stats())
+
+    def report_stats(self, stats):
+        """
+            Log the audio lost and the input latency after each utterance.
+        """
+        lost = stats['overflows'] + stats['dropped']
+        if lost > self.audio_lost:
+            LOG.warning("Audio lost: {} input overflows, {} chunks dropped "
+                        "while busy".format(stats['overflows'],
+                                            stats['dropped']))
+            self.audio_lost = lost
+        LOG.debug("Input latency: {:.3f} s, max {:.3f} s".format(
+            stats['latency'], stats['max_latency']))
 
     def stop(self):
         """
@@ -159,7 +178,7 @@ class AudioConsumer(Thread):
     def transcribe(self, audio):
         try:
             # Invoke the STT engine on the audio clip
-            text = self.stt.execute(audio).lower().strip()
+            text = self.stt.finish(audio).lower().strip()
             LOG.debug("STT: " + text)
             return text
         except sr.RequestError as e:
@@ -268,11 +287,11 @@ class RecognizerLoop(EventEmitter):
         """
         self.state.running = True
         queue = Queue()
+        stt = STTFactory.create()
         self.producer = AudioProducer(self.state, queue, self.microphone,
-                                      self.responsive_recognizer, self)
+                                      self.responsive_recognizer, self, stt)
         self.producer.start()
-        self.consumer = AudioConsumer(self.state, queue, self,
-                                      STTFactory.create(),
+        self.consumer = AudioConsumer(self.state, queue, self, stt,
                                       self.wakeup_recognizer,
                                       self.wakeword_recognizer)
         self.consumer.start()
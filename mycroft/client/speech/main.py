@@ -22,6 +22,7 @@ from mycroft.identity import IdentityManager
 from mycroft.lock import Lock as PIDLock  # Create/Support PID locking file
 from mycroft.messagebus.client.ws import WebsocketClient
 from mycroft.messagebus.message import Message
+from mycroft.session import SessionManager
 from mycroft.util import create_daemon, wait_for_exit_signal, \
     reset_sigint_handler
 from mycroft.util.log import LOG
@@ -66,8 +67,13 @@ def handle_utterance(event):
     ws.emit(Message('recognizer_loop:utterance', event, context))
 
 
+def handle_partial_utterance(event):
+    ws.emit(Message('recognizer_loop:partial_utterance', event))
+
+
 def handle_unknown():
-    ws.emit(Message('mycroft.speech.recognition.unknown'))
+    ws.emit(Message('mycroft.speech.recognition.unknown',
+                    {'session': SessionManager.get().session_id}))
 
 
 def handle_speak(event):
@@ -140,6 +146,7 @@ def main():
     Configuration.init(ws)
     loop = RecognizerLoop()
     loop.on('recognizer_loop:utterance', handle_utterance)
+    loop.on('recognizer_loop:partial_utterance', handle_partial_utterance)
     loop.on('recognizer_loop:speech.recognition.unknown', handle_unknown)
     loop.on('speak', handle_speak)
     loop.on('recognizer_loop:record_begin', handle_record_begin)
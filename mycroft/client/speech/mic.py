@@ -12,15 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import audioop
-import collections
 import datetime
 from hashlib import md5
 import shutil
+import wave
+from collections import deque
 from tempfile import gettempdir
-from threading import Thread, Lock
+from threading import Event, Lock, Thread
 from time import sleep, time as get_time
 
+import monotonic
 import os
 import pyaudio
 import speech_recognition
@@ -35,6 +36,11 @@ import requests
 from subprocess import check_output, Popen, PIPE
 
 from mycroft.api import DeviceApi
+from mycroft.client.speech.audio_buffer import (
+    AudioBuffer, RingBuffer, write_wav
+)
+from mycroft.client.speech.mic_level import MIC_LEVEL_FILE, MicLevelWriter
+from mycroft.client.speech.vad import VadFactory
 from mycroft.configuration import Configuration
 from mycroft.session import SessionManager
 from mycroft.util import (
@@ -47,52 +53,152 @@ from mycroft.util.log import LOG
 
 
 class MutableStream(object):
-    def __init__(self, wrapped_stream, format, muted=False):
-        assert wrapped_stream is not None
-        self.wrapped_stream = wrapped_stream
-        self.muted = muted
+    """
+        Audio captured by a callback and queued until it's read.
 
-        self.SAMPLE_WIDTH = pyaudio.get_sample_size(format)
+        PyAudio calls callback() from its own thread with each chunk
+        recorded. The chunks are kept in a bounded deque, when the reader
+        falls behind the oldest chunks are dropped and counted instead of
+        blocking the audio thread. Appending to and popping from a deque
+        are atomic, so the audio thread takes no lock unless the reader
+        is waiting for audio.
+
+        Args:
+            sample_width (int): bytes per sample
+            sample_rate (int): samples per second
+            chunk_size (int): frames per chunk delivered to the callback
+            muted (bool): start muted
+            max_chunks (int): chunks to queue before dropping audio
+    """
+    # Seconds to wait for audio before checking if the stream is still up
+    READ_TIMEOUT = 1.0
+
+    def __init__(self, sample_width, sample_rate, chunk_size, muted=False,
+                 max_chunks=50):
+        self.wrapped_stream = None
+        self.muted = muted
+        self.SAMPLE_WIDTH = sample_width
+        self.SAMPLE_RATE = sample_rate
+        self.CHUNK = chunk_size
         self.muted_buffer = b''.join([b'\x00' * self.SAMPLE_WIDTH])
 
+        self.chunks = deque(maxlen=max_chunks)
+        self._available = Event()  # Set when a chunk was added
+        self._leftover = b''
+
+        # Stats on the audio lost and the delay before it's read
+        self.overflows = 0  # Overflows reported by the audio device
+        self.dropped = 0  # Chunks dropped since the reader fell behind
+        self.input_latency = 0.0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self._reported_overflows = 0
+
+    def start(self, wrapped_stream):
+        """ Use the PyAudio stream calling callback() with audio. """
+        self.wrapped_stream = wrapped_stream
+        self.input_latency = wrapped_stream.get_input_latency()
+
+    def callback(self, in_data, frame_count, time_info, status):
+        """ PyAudio stream callback, queues the recorded chunk. """
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self._push(in_data)
+        return None, pyaudio.paContinue
+
+    def _push(self, chunk):
+        if len(self.chunks) == self.chunks.maxlen:
+            # The deque drops the oldest audio, it's too late anyway
+            self.dropped += 1
+        self.chunks.append(chunk)
+        if not self._available.is_set():
+            self._available.set()
+
     def mute(self):
         self.muted = True
 
     def unmute(self):
         self.muted = False
 
+    def is_active(self):
+        return (self.wrapped_stream is not None and
+                self.wrapped_stream.is_active())
+
+    def _next_chunk(self):
+        while True:
+            try:
+                return self.chunks.popleft()
+            except IndexError:
+                pass
+            self._available.clear()
+            # A chunk may have been added before the event was cleared
+            if self.chunks:
+                continue
+            if (not self._available.wait(self.READ_TIMEOUT) and
+                    not self.is_active()):
+                raise IOError('Audio stream is not active')
+
     def read(self, size, of_exc=False):
         """
             Read data from stream.
 
             Arguments:
-                size (int): Number of bytes to read
+                size (int): Number of frames to read
                 of_exc (bool): flag determining if the audio producer thread
                                should throw IOError at overflows.
 
             Returns:
                 Data read from device
         """
-        frames = collections.deque()
-        remaining = size
-        while remaining > 0:
-            to_read = min(self.wrapped_stream.get_read_available(), remaining)
-            if to_read == 0:
-                sleep(.01)
-                continue
-            result = self.wrapped_stream.read(to_read,
-                                              exception_on_overflow=of_exc)
-            frames.append(result)
-            remaining -= to_read
+        num_bytes = size * self.SAMPLE_WIDTH
+        frames = [self._leftover]
+        available = len(self._leftover)
+        while available < num_bytes:
+            chunk = self._next_chunk()
+            frames.append(chunk)
+            available += len(chunk)
+        # Usually a single chunk of the requested size, used as is
+        frames = [f for f in frames if f]
+        audio = frames[0] if len(frames) == 1 else b''.join(frames)
+        self._leftover = audio[num_bytes:]
+        audio = audio[:num_bytes]
+
+        self._update_latency()
+        lost = self.overflows + self.dropped
+        if lost > self._reported_overflows:
+            self._reported_overflows = lost
+            if of_exc:
+                raise IOError('Audio input overflowed')
 
         if self.muted:
             return self.muted_buffer
-        input_latency = self.wrapped_stream.get_input_latency()
-        if input_latency > 0.2:
-            LOG.warning("High input latency: %f" % input_latency)
-        audio = b"".join(list(frames))
         return audio
 
+    def _update_latency(self):
+        buffered = (len(self.chunks) * self.CHUNK * self.SAMPLE_WIDTH +
+                    len(self._leftover))
+        latency = (self.input_latency +
+                   float(buffered) / (self.SAMPLE_RATE * self.SAMPLE_WIDTH))
+        if latency > 0.2 and self.latency <= 0.2:
+            LOG.warning("High input latency: %f" % latency)
+        self.latency = latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def stats(self):
+        """
+            Audio lost and input latency since the stream was opened.
+
+            Returns:
+                dict: overflows reported by the device, chunks dropped,
+                      current and max latency in seconds
+        """
+        return {
+            'overflows': self.overflows,
+            'dropped': self.dropped,
+            'latency': self.latency,
+            'max_latency': self.max_latency
+        }
+
     def close(self):
         self.wrapped_stream.close()
         self.wrapped_stream = None
@@ -104,6 +210,85 @@ class MutableStream(object):
         return self.wrapped_stream.stop_stream()
 
 
+class FileStream(MutableStream):
+    """
+        Stream playing back a wav file as if it was being recorded.
+
+        A thread reads the file chunk by chunk, when the file ends silence
+        is recorded until the stream is closed.
+
+        Args:
+            filename (str): mono wav file to read
+            chunk_size (int): frames per chunk
+            realtime (bool): deliver chunks at the pace of the audio,
+                             dropping them if the reader falls behind. If
+                             False chunks are delivered as fast as they're
+                             read and never dropped.
+            max_chunks (int): chunks to queue before dropping audio
+    """
+    def __init__(self, filename, chunk_size=1024, realtime=True,
+                 max_chunks=50):
+        self.wav = wave.open(filename, 'rb')
+        super(FileStream, self).__init__(self.wav.getsampwidth(),
+                                         self.wav.getframerate(), chunk_size,
+                                         max_chunks=max_chunks)
+        self.realtime = realtime
+        self.finished = Event()  # Set once the whole file was recorded
+        self._stopped = Event()
+        self._space = Event()  # Set when a chunk was read
+        self._thread = Thread(target=self._record)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _record(self):
+        chunk_bytes = self.CHUNK * self.SAMPLE_WIDTH
+        sec_per_chunk = float(self.CHUNK) / self.SAMPLE_RATE
+        next_time = monotonic.monotonic()
+        while not self._stopped.is_set():
+            chunk = self.wav.readframes(self.CHUNK)
+            if len(chunk) < chunk_bytes:
+                self.finished.set()
+                chunk += get_silence(chunk_bytes - len(chunk))
+            if self.realtime:
+                next_time += sec_per_chunk
+                if self._stopped.wait(next_time - monotonic.monotonic()):
+                    break
+                self._push(chunk)
+            else:
+                self._put(chunk)
+
+    def _put(self, chunk):
+        """ Queue chunk, waiting for the reader instead of dropping audio. """
+        while not self._stopped.is_set():
+            if len(self.chunks) < self.chunks.maxlen:
+                self._push(chunk)
+                return
+            self._space.clear()
+            if len(self.chunks) < self.chunks.maxlen:
+                continue
+            self._space.wait(self.READ_TIMEOUT)
+
+    def _next_chunk(self):
+        chunk = super(FileStream, self)._next_chunk()
+        self._space.set()
+        return chunk
+
+    def is_active(self):
+        return not self._stopped.is_set()
+
+    def close(self):
+        self._stopped.set()
+        self._space.set()
+        self._thread.join()
+        self.wav.close()
+
+    def is_stopped(self):
+        return self._stopped.is_set()
+
+    def stop_stream(self):
+        self._stopped.set()
+
+
 class MutableMicrophone(Microphone):
     def __init__(self, device_index=None, sample_rate=16000, chunk_size=1024,
                  mute=False):
@@ -118,12 +303,15 @@ class MutableMicrophone(Microphone):
         assert self.stream is None, \
             "This audio source is already inside a context manager"
         self.audio = pyaudio.PyAudio()
-        self.stream = MutableStream(self.audio.open(
+        self.stream = MutableStream(self.SAMPLE_WIDTH, self.SAMPLE_RATE,
+                                    self.CHUNK, self.muted)
+        self.stream.start(self.audio.open(
             input_device_index=self.device_index, channels=1,
             format=self.format, rate=self.SAMPLE_RATE,
             frames_per_buffer=self.CHUNK,
             input=True,  # stream is an input stream
-        ), self.format, self.muted)
+            stream_callback=self.stream.callback
+        ))
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -147,6 +335,55 @@ class MutableMicrophone(Microphone):
         return self.muted
 
 
+class FileMicrophone(AudioSource):
+    """
+        Source recording a wav file instead of a microphone, for testing
+        the listener with known audio.
+
+        Args:
+            filename (str): mono wav file to read
+            chunk_size (int): frames per chunk
+            realtime (bool): deliver the audio at the pace it was recorded
+    """
+    def __init__(self, filename, chunk_size=1024, realtime=True):
+        self.filename = filename
+        wav = wave.open(filename, 'rb')
+        try:
+            self.SAMPLE_WIDTH = wav.getsampwidth()
+            self.SAMPLE_RATE = wav.getframerate()
+        finally:
+            wav.close()
+        self.CHUNK = chunk_size
+        self.realtime = realtime
+        self.stream = None
+        self.muted = False
+
+    def __enter__(self):
+        assert self.stream is None, \
+            "This audio source is already inside a context manager"
+        self.stream = FileStream(self.filename, self.CHUNK, self.realtime)
+        if self.muted:
+            self.stream.mute()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
+        self.stream = None
+
+    def mute(self):
+        self.muted = True
+        if self.stream:
+            self.stream.mute()
+
+    def unmute(self):
+        self.muted = False
+        if self.stream:
+            self.stream.unmute()
+
+    def is_muted(self):
+        return self.muted
+
+
 def get_silence(num_bytes):
     return b'\0' * num_bytes
 
@@ -155,14 +392,6 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
     # Padding of silence when feeding to pocketsphinx
     SILENCE_SEC = 0.01
 
-    # The minimum seconds of noise before a
-    # phrase can be considered complete
-    MIN_LOUD_SEC_PER_PHRASE = 0.5
-
-    # The minimum seconds of silence required at the end
-    # before a phrase will be considered complete
-    MIN_SILENCE_AT_END = 0.25
-
     # The maximum seconds a phrase can be recorded,
     # provided there is noise the entire time
     RECORDING_TIMEOUT = 10.0
@@ -186,8 +415,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         speech_recognition.Recognizer.__init__(self)
         self.wake_word_recognizer = wake_word_recognizer
         self.audio = pyaudio.PyAudio()
-        self.multiplier = listener_config.get('multiplier')
-        self.energy_ratio = listener_config.get('energy_ratio')
+        self.listener_config = listener_config
+        self.vad = None
         # check the config for the flag to save wake words.
 
         self.save_utterances = listener_config.get('record_utterances', False)
@@ -196,7 +425,15 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         self.upload_lock = Lock()
         self.save_wake_words_dir = join(gettempdir(), 'mycroft_wake_words')
         self.filenames_to_upload = []
-        self.mic_level_file = os.path.join(get_ipc_directory(), "mic_level")
+        # The microphone level is shared through a memory map, the text
+        # file is only written for readers that haven't moved to it
+        self.mic_level = MicLevelWriter(
+            os.path.join(get_ipc_directory(), MIC_LEVEL_FILE))
+        if listener_config.get('mic_level_file', False):
+            self.mic_level_file = os.path.join(get_ipc_directory(),
+                                               "mic_level")
+        else:
+            self.mic_level_file = None
         self._stop_signaled = False
 
         # The maximum audio in seconds to keep for transcribing a phrase
@@ -214,11 +451,7 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
     def record_sound_chunk(self, source):
         return source.stream.read(source.CHUNK, self.overflow_exc)
 
-    @staticmethod
-    def calc_energy(sound_chunk, sample_width):
-        return audioop.rms(sound_chunk, sample_width)
-
-    def _record_phrase(self, source, sec_per_buffer):
+    def _record_phrase(self, source, sec_per_buffer, stt=None):
         """Record an entire spoken phrase.
 
         Essentially, this code waits for a period of silence and then returns
@@ -228,32 +461,19 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         Args:
             source (AudioSource):  Source producing the audio chunks
             sec_per_buffer (float):  Fractional number of seconds in each chunk
+            stt (STT): engine fed with the audio as it's recorded
 
         Returns:
-            bytearray: complete audio buffer recorded, including any
-                       silence at the end of the user's utterance
+            AudioBuffer: complete audio buffer recorded, including any
+                         silence at the end of the user's utterance
         """
 
-        num_loud_chunks = 0
-        noise = 0
-
-        max_noise = 25
-        min_noise = 0
-
-        silence_duration = 0
-
-        def increase_noise(level):
-            if level < max_noise:
-                return level + 200 * sec_per_buffer
-            return level
-
-        def decrease_noise(level):
-            if level > min_noise:
-                return level - 100 * sec_per_buffer
-            return level
+        vad = self._get_vad(source)
+        vad.start_phrase()
 
-        # Smallest number of loud chunks required to return
-        min_loud_chunks = int(self.MIN_LOUD_SEC_PER_PHRASE / sec_per_buffer)
+        # Seconds of chunks with speech and of silence since the last speech
+        loud_duration = 0.0
+        silence_duration = 0.0
 
         # Maximum number of chunks to record before timing out
         max_chunks = int(self.RECORDING_TIMEOUT / sec_per_buffer)
@@ -263,40 +483,30 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         max_chunks_of_silence = int(self.RECORDING_TIMEOUT_WITH_SILENCE /
                                     sec_per_buffer)
 
-        # bytearray to store audio in
-        byte_data = get_silence(source.SAMPLE_WIDTH)
+        # Buffer to store audio in
+        byte_data = AudioBuffer(get_silence(source.SAMPLE_WIDTH))
+        if stt:
+            stt.feed(byte_data.get())
 
         phrase_complete = False
         while num_chunks < max_chunks and not phrase_complete:
             chunk = self.record_sound_chunk(source)
-            byte_data += chunk
+            byte_data.append(chunk)
             num_chunks += 1
+            if stt:
+                stt.feed(chunk)
 
-            energy = self.calc_energy(chunk, source.SAMPLE_WIDTH)
-            test_threshold = self.energy_threshold * self.multiplier
-            is_loud = energy > test_threshold
-            if is_loud:
-                noise = increase_noise(noise)
-                num_loud_chunks += 1
+            speech, silence = vad.process(chunk)
+            if speech > 0:
+                loud_duration += sec_per_buffer
+                silence_duration = silence
             else:
-                noise = decrease_noise(noise)
-                self._adjust_threshold(energy, sec_per_buffer)
-
-            if num_chunks % 10 == 0:
-                with open(self.mic_level_file, 'w') as f:
-                    f.write("Energy:  cur=" + str(energy) + " thresh=" +
-                            str(self.energy_threshold))
-                f.close()
-
-            was_loud_enough = num_loud_chunks > min_loud_chunks
-
-            quiet_enough = noise <= min_noise
-            if quiet_enough:
-                silence_duration += sec_per_buffer
-                if silence_duration < self.MIN_SILENCE_AT_END:
-                    quiet_enough = False  # gotta be silent for min of 1/4 sec
-            else:
-                silence_duration = 0
+                silence_duration += silence
+
+            self._write_mic_level(vad, num_chunks % 10 == 0)
+
+            was_loud_enough = loud_duration > vad.MIN_LOUD_SEC_PER_PHRASE
+            quiet_enough = silence_duration >= vad.MIN_SILENCE_AT_END
             recorded_too_much_silence = num_chunks > max_chunks_of_silence
             if quiet_enough and (was_loud_enough or recorded_too_much_silence):
                 phrase_complete = True
@@ -307,6 +517,48 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
 
         return byte_data
 
+    def _write_mic_level(self, vad, write_file):
+        """
+            Publish the energy of the last chunk and the silence threshold.
+
+            Args:
+                vad (VadEngine): detector that processed the chunk
+                write_file (bool): also write the compatibility text file,
+                                   if enabled
+        """
+        self.mic_level.write(vad.energy, vad.threshold)
+        if write_file and self.mic_level_file:
+            with open(self.mic_level_file, 'w') as f:
+                f.write("Energy:  cur=" + str(vad.energy) + " thresh=" +
+                        str(vad.threshold))
+
+    def _get_vad(self, source):
+        """ The voice activity detector for the audio of the source. """
+        if (self.vad is None or
+                self.vad.sample_rate != source.SAMPLE_RATE or
+                self.vad.sample_width != source.SAMPLE_WIDTH):
+            self.vad = VadFactory.create(self.listener_config,
+                                         source.SAMPLE_RATE,
+                                         source.SAMPLE_WIDTH)
+        return self.vad
+
+    def adjust_for_ambient_noise(self, source, duration=1):
+        """
+            Calibrate the voice activity detector with the background
+            noise heard during duration seconds.
+
+            Args:
+                source (AudioSource):  Source producing the audio chunks
+                duration (float):  seconds to listen
+        """
+        vad = self._get_vad(source)
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        # Whole chunks only, like speech_recognition did
+        elapsed = sec_per_buffer
+        while elapsed <= duration:
+            vad.calibrate(self.record_sound_chunk(source))
+            elapsed += sec_per_buffer
+
     @staticmethod
     def sec_to_bytes(sec, source):
         return int(sec * source.SAMPLE_RATE) * source.SAMPLE_WIDTH
@@ -380,25 +632,20 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
 
         silence = get_silence(num_silent_bytes)
 
-        # bytearray to store audio in
-        byte_data = silence
-
         buffers_per_check = self.SEC_BETWEEN_WW_CHECKS / sec_per_buffer
         buffers_since_check = 0.0
 
-        # Max bytes for byte_data before audio is removed from the front
+        # Bytes of audio to keep and to test for the wake word
         max_size = self.sec_to_bytes(self.SAVED_WW_SEC, source)
         test_size = self.sec_to_bytes(self.TEST_WW_SEC, source)
 
+        # Ring buffer to store the most recent audio in
+        byte_data = RingBuffer(max_size)
+        byte_data.append(silence)
+
         said_wake_word = False
 
-        # Rolling buffer to track the audio energy (loudness) heard on
-        # the source recently.  An average audio energy is maintained
-        # based on these levels.
-        energies = []
-        idx_energy = 0
-        avg_energy = 0.0
-        energy_avg_samples = int(5 / sec_per_buffer)  # avg over last 5 secs
+        vad = self._get_vad(source)
 
         ww_module = self.wake_word_recognizer.__class__.__name__
         if ww_module == 'PreciseHotword':
@@ -413,58 +660,27 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
                 break
             chunk = self.record_sound_chunk(source)
 
-            energy = self.calc_energy(chunk, source.SAMPLE_WIDTH)
-            if energy < self.energy_threshold * self.multiplier:
-                self._adjust_threshold(energy, sec_per_buffer)
+            # Follow the background noise
+            vad.update(chunk)
 
-            if len(energies) < energy_avg_samples:
-                # build the average
-                energies.append(energy)
-                avg_energy += float(energy) / energy_avg_samples
-            else:
-                # maintain the running average and rolling buffer
-                avg_energy -= float(energies[idx_energy]) / energy_avg_samples
-                avg_energy += float(energy) / energy_avg_samples
-                energies[idx_energy] = energy
-                idx_energy = (idx_energy + 1) % energy_avg_samples
-
-                # maintain the threshold using average
-                if energy < avg_energy * 1.5:
-                    if energy > self.energy_threshold:
-                        # bump the threshold to just above this value
-                        self.energy_threshold = energy * 1.2
-
-            # Periodically output energy level stats.  This can be used to
-            # visualize the microphone input, e.g. a needle on a meter.
-            if counter % 3:
-                with open(self.mic_level_file, 'w') as f:
-                    f.write("Energy:  cur=" + str(energy) + " thresh=" +
-                            str(self.energy_threshold))
-                f.close()
+            # Output energy level stats.  This can be used to visualize
+            # the microphone input, e.g. a needle on a meter.
+            self._write_mic_level(vad, counter % 3)
             counter += 1
 
-            # At first, the buffer is empty and must fill up.  After that
-            # just drop the first chunk bytes to keep it the same size.
-            needs_to_grow = len(byte_data) < max_size
-            if needs_to_grow:
-                byte_data += chunk
-            else:  # Remove beginning of audio and add new chunk to end
-                byte_data = byte_data[len(chunk):] + chunk
+            # Once the buffer is full the oldest audio is overwritten
+            byte_data.append(chunk)
 
             buffers_since_check += 1.0
             self.wake_word_recognizer.update(chunk)
             if buffers_since_check > buffers_per_check:
                 buffers_since_check -= buffers_per_check
-                chopped = byte_data[-test_size:] \
-                    if test_size < len(byte_data) else byte_data
-                audio_data = chopped + silence
+                audio_data = byte_data.get(test_size, silence)
                 said_wake_word = \
                     self.wake_word_recognizer.found_wake_word(audio_data)
                 # if a wake word is success full then record audio in temp
                 # file.
                 if self.save_wake_words and said_wake_word:
-                    audio = self._create_audio_data(byte_data, source)
-
                     if not isdir(self.save_wake_words_dir):
                         mkdir(self.save_wake_words_dir)
                     dr = self.save_wake_words_dir
@@ -478,8 +694,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
                         str(model_hash)
                     ]
                     fn = join(dr, '.'.join(components) + '.wav')
-                    with open(fn, 'wb') as f:
-                        f.write(audio.get_wav_data())
+                    write_wav(fn, byte_data.views(), source.SAMPLE_RATE,
+                              source.SAMPLE_WIDTH)
 
                     if self.upload_config['enable'] or self.config['opt_in']:
                         t = Thread(target=self._upload_file, args=(fn,))
@@ -494,7 +710,7 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         """
         return AudioData(raw_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
 
-    def listen(self, source, emitter):
+    def listen(self, source, emitter, stt=None):
         """Listens for chunks of audio that Mycroft should perform STT on.
 
         This will listen continuously for a wake-up-word, then return the
@@ -505,6 +721,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             source (AudioSource):  Source producing the audio chunks
             emitter (EventEmitter): Emitter for notifications of when recording
                                     begins and ends.
+            stt (STT): engine to stream the phrase to while it's recorded,
+                       its finish() gives the transcription
 
         Returns:
             AudioData: audio with the user's utterance, minus the wake-up-word
@@ -514,11 +732,10 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         #        bytes_per_sec = source.SAMPLE_RATE * source.SAMPLE_WIDTH
         sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
 
-        # Every time a new 'listen()' request begins, reset the threshold
-        # used for silence detection.  This is as good of a reset point as
-        # any, as we expect the user and Mycroft to not be talking.
-        # NOTE: adjust_for_ambient_noise() doc claims it will stop early if
-        #       speech is detected, but there is no code to actually do that.
+        # Every time a new 'listen()' request begins, recalibrate the
+        # detection of speech to the background noise.  This is as good of
+        # a reset point as any, as we expect the user and Mycroft to not be
+        # talking.
         self.adjust_for_ambient_noise(source, 1.0)
 
         LOG.debug("Waiting for wake word...")
@@ -537,25 +754,20 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             if file:
                 play_wav(file)
 
-        frame_data = self._record_phrase(source, sec_per_buffer)
-        audio_data = self._create_audio_data(frame_data, source)
+        if stt:
+            def on_partial(text):
+                emitter.emit("recognizer_loop:partial_utterance",
+                             {'utterance': text})
+            stt.start(source.SAMPLE_RATE, source.SAMPLE_WIDTH, on_partial)
+        frame_data = self._record_phrase(source, sec_per_buffer, stt)
+        audio_data = self._create_audio_data(frame_data.get(), source)
         emitter.emit("recognizer_loop:record_end")
         if self.save_utterances:
             LOG.info("Recording utterance")
             stamp = str(datetime.datetime.now())
             filename = "/tmp/mycroft_utterance%s.wav" % stamp
-            with open(filename, 'wb') as filea:
-                filea.write(audio_data.get_wav_data())
+            write_wav(filename, frame_data.chunks, source.SAMPLE_RATE,
+                      source.SAMPLE_WIDTH)
             LOG.debug("Thinking...")
 
         return audio_data
-
-    def _adjust_threshold(self, energy, seconds_per_buffer):
-        if self.dynamic_energy_threshold and energy > 0:
-            # account for different chunk sizes and rates
-            damping = (
-                self.dynamic_energy_adjustment_damping ** seconds_per_buffer)
-            target_energy = energy * self.energy_ratio
-            self.energy_threshold = (
-                self.energy_threshold * damping +
-                target_energy * (1 - damping))
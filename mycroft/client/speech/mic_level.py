@@ -0,0 +1,123 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Microphone level shared with other processes through a memory map.
+
+The listener writes the energy of each chunk heard along with the silence
+threshold to a small file in the IPC directory, which it and the readers
+map into memory. Updating and polling the level doesn't need any system
+calls.
+
+The file holds a single record:
+    seq (uint64):        incremented before and after each update
+    energy (double):     energy of the last chunk
+    threshold (double):  energy threshold for silence
+    timestamp (double):  time of the update
+
+The sequence number is odd while an update is being written, a reader
+retries if it is odd or changed while reading the record.
+"""
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+MIC_LEVEL_FILE = 'mic_level.mmap'
+
+RECORD = struct.Struct('<Qddd')
+SEQ = struct.Struct('<Q')
+
+MicLevel = namedtuple('MicLevel', ['energy', 'threshold', 'timestamp',
+                                   'seq'])
+
+
+def _map_file(filename, writable):
+    if writable:
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o666)
+    else:
+        fd = os.open(filename, os.O_RDONLY)
+    try:
+        if writable and os.fstat(fd).st_size < RECORD.size:
+            # Only ever grow the file, readers may have it mapped
+            os.write(fd, b'\0' * RECORD.size)
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        return mmap.mmap(fd, RECORD.size, access=access)
+    finally:
+        os.close(fd)
+
+
+class MicLevelWriter(object):
+    """
+        Publishes the microphone level of the listener.
+
+        Args:
+            filename (str): path of the shared file
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._map = _map_file(filename, writable=True)
+        self.seq = SEQ.unpack_from(self._map)[0] & ~1
+
+    def write(self, energy, threshold):
+        """ Update the level, readers see the change right away. """
+        self.seq += 1
+        SEQ.pack_into(self._map, 0, self.seq)
+        RECORD.pack_into(self._map, 0, self.seq, energy, threshold,
+                         time.time())
+        self.seq += 1
+        SEQ.pack_into(self._map, 0, self.seq)
+
+    def close(self):
+        self._map.close()
+
+
+class MicLevelReader(object):
+    """
+        Polls the microphone level published by the listener.
+
+        Args:
+            filename (str): path of the shared file, it must exist and have
+                            been written to by a MicLevelWriter
+
+        Raises:
+            OSError: if the file doesn't exist
+            ValueError: if the file is too small to hold the record
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._map = _map_file(filename, writable=False)
+
+    def read(self, retries=10):
+        """
+            Get the latest microphone level.
+
+            Args:
+                retries (int): times to retry while the record is updated
+
+            Returns:
+                MicLevel: the level, None if nothing was written yet or the
+                          record kept changing while reading it
+        """
+        for _ in range(retries):
+            seq, energy, threshold, timestamp = RECORD.unpack_from(self._map)
+            if seq % 2 == 0 and SEQ.unpack_from(self._map)[0] == seq:
+                if seq == 0:
+                    return None
+                return MicLevel(energy, threshold, timestamp, seq)
+        return None
+
+    def close(self):
+        self._map.close()
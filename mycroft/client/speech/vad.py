@@ -0,0 +1,311 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Voice activity detection for the listener.
+
+A detector follows the background noise while the listener waits for the
+wake word and finds the speech in the chunks of a phrase being recorded,
+which decides when the user stopped talking. The detector is selected with
+the "module" setting in the "vad" section of the listener config.
+"""
+import audioop
+from collections import deque
+
+from mycroft.util.log import LOG
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class VadEngine(object):
+    """
+        Base class for voice activity detectors.
+
+        Args:
+            config (dict): listener config
+            sample_rate (int): samples per second
+            sample_width (int): bytes per sample
+    """
+    # The minimum seconds of chunks with speech before a
+    # phrase can be considered complete
+    MIN_LOUD_SEC_PER_PHRASE = 0.5
+
+    # The minimum seconds of silence required at the end
+    # before a phrase will be considered complete
+    MIN_SILENCE_AT_END = 0.25
+
+    def __init__(self, config, sample_rate, sample_width):
+        self.config = config
+        self.vad_config = config.get('vad', {})
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        # Energy of the last chunk and the energy considered loud, shown
+        # on the microphone level meter
+        self.energy = 0.0
+        self.threshold = 0.0
+
+    def seconds(self, chunk):
+        return float(len(chunk)) / (self.sample_rate * self.sample_width)
+
+    def calibrate(self, chunk):
+        """ Learn the background noise from a chunk without speech. """
+        pass
+
+    def update(self, chunk):
+        """ Follow the background noise while waiting for the wake word. """
+        pass
+
+    def start_phrase(self):
+        """ Called before the chunks of a new phrase are processed. """
+        pass
+
+    def process(self, chunk):
+        """
+            Find the speech in a chunk of the phrase being recorded.
+
+            Args:
+                chunk (bytes): audio following the previous chunk
+
+            Returns:
+                tuple: seconds of speech in the chunk and seconds of
+                       silence at its end
+        """
+        return 0.0, self.seconds(chunk)
+
+
+class EnergyVad(VadEngine):
+    """
+        Compares the RMS energy of whole chunks with a threshold following
+        the background noise.
+
+        The end of a phrase is found with a noise counter, raised by loud
+        chunks and lowered by quiet ones. Silence is only counted once the
+        counter is back at zero.
+    """
+    # Seconds of chunks averaged to find changes in the background noise
+    AVERAGE_SEC = 5.0
+
+    # Limits of the noise counter
+    MAX_NOISE = 25
+    MIN_NOISE = 0
+
+    def __init__(self, config, sample_rate, sample_width):
+        super(EnergyVad, self).__init__(config, sample_rate, sample_width)
+        self.threshold = self.vad_config.get('energy_threshold', 300)
+        self.multiplier = config.get('multiplier', 1.0)
+        self.energy_ratio = config.get('energy_ratio', 1.5)
+        self.damping = self.vad_config.get('damping', 0.15)
+        self.energies = deque()
+        self.energy_sum = 0.0
+        self.noise = self.MIN_NOISE
+
+    def _calc_energy(self, chunk):
+        self.energy = audioop.rms(chunk, self.sample_width)
+        return self.energy
+
+    def _adjust_threshold(self, energy, seconds):
+        # Move the threshold towards the energy, faster for longer chunks
+        damping = self.damping ** seconds
+        target_energy = energy * self.energy_ratio
+        self.threshold = (self.threshold * damping +
+                          target_energy * (1 - damping))
+
+    def _is_loud(self, energy):
+        return energy > self.threshold * self.multiplier
+
+    def calibrate(self, chunk):
+        self._adjust_threshold(self._calc_energy(chunk), self.seconds(chunk))
+
+    def update(self, chunk):
+        energy = self._calc_energy(chunk)
+        seconds = self.seconds(chunk)
+        if not self._is_loud(energy) and energy > 0:
+            self._adjust_threshold(energy, seconds)
+
+        self.energies.append(energy)
+        self.energy_sum += energy
+        if len(self.energies) * seconds > self.AVERAGE_SEC:
+            self.energy_sum -= self.energies.popleft()
+            avg_energy = self.energy_sum / len(self.energies)
+            # Raise the threshold when the background gets louder
+            if energy < avg_energy * 1.5 and energy > self.threshold:
+                self.threshold = energy * 1.2
+
+    def start_phrase(self):
+        self.noise = self.MIN_NOISE
+
+    def process(self, chunk):
+        energy = self._calc_energy(chunk)
+        seconds = self.seconds(chunk)
+        if self._is_loud(energy):
+            if self.noise < self.MAX_NOISE:
+                self.noise += 200 * seconds
+            return seconds, 0.0
+
+        if self.noise > self.MIN_NOISE:
+            self.noise -= 100 * seconds
+        if energy > 0:
+            self._adjust_threshold(energy, seconds)
+        if self.noise <= self.MIN_NOISE:
+            return 0.0, seconds
+        return 0.0, 0.0  # Still too noisy to count as silence
+
+
+class SpectralVad(VadEngine):
+    """
+        Classifies short frames of audio as speech by comparing their
+        energy, zero crossing rate and spectral flatness with those of the
+        background noise. Requires NumPy.
+
+        A frame is speech if it's louder than the noise and either less
+        noise-like (lower spectral flatness) or crossing zero at a
+        different rate, or if it's much louder than the noise.
+
+        The silence after the last speech frame is exact to the frame, so
+        a phrase ends on MIN_SILENCE_AT_END alone.
+    """
+    MIN_LOUD_SEC_PER_PHRASE = 0.25
+    MIN_SILENCE_AT_END = 0.4
+
+    # Lowest background energy assumed, in dB relative to full scale
+    MIN_NOISE_DB = -70.0
+
+    def __init__(self, config, sample_rate, sample_width):
+        super(SpectralVad, self).__init__(config, sample_rate, sample_width)
+        if np is None:
+            raise ImportError('The spectral VAD requires NumPy')
+        if sample_width not in (2, 4):
+            raise ValueError('Unsupported sample width {}'.format(
+                sample_width))
+        cfg = self.vad_config
+        self.frame_size = int(sample_rate * cfg.get('frame_ms', 20) / 1000)
+        self.frame_sec = float(self.frame_size) / sample_rate
+        self.energy_margin = cfg.get('energy_margin', 6.0)  # dB
+        self.flatness_margin = cfg.get('flatness_margin', 4.0)  # dB
+        self.zcr_margin = cfg.get('zcr_margin', 0.15)
+        # Part of the noise estimate replaced by each frame of background
+        # and, to recover from a louder background, each frame of speech
+        self.noise_rate = cfg.get('noise_rate', 0.05)
+        self.speech_noise_rate = cfg.get('speech_noise_rate', 0.002)
+
+        self.dtype = '<i2' if sample_width == 2 else '<i4'
+        self.scale = float(2 ** (8 * sample_width - 1))
+        self.window = np.hanning(self.frame_size)
+        freqs = np.fft.rfftfreq(self.frame_size, 1.0 / sample_rate)
+        self.band = (freqs >= 100) & (freqs <= 4000)  # Speech frequencies
+
+        # Energy (dB), spectral flatness (dB) and zero crossing rate of the
+        # background, assumed quiet until calibrated
+        self.noise = np.array([self.MIN_NOISE_DB, 0.0, 0.5])
+        self._leftover = np.zeros(0)
+        self._update_threshold()
+
+    def _frames(self, chunk):
+        """ The samples of the chunk as full frames, the rest is kept. """
+        samples = np.frombuffer(chunk, dtype=self.dtype) / self.scale
+        samples = np.concatenate((self._leftover, samples))
+        num_frames = len(samples) // self.frame_size
+        used = num_frames * self.frame_size
+        self._leftover = samples[used:]
+        return samples[:used].reshape(num_frames, self.frame_size)
+
+    def _features(self, frames):
+        """ Energy, spectral flatness and zero crossing rate per frame. """
+        power = np.mean(frames ** 2, axis=1)
+        energy = 10 * np.log10(power + 1e-12)
+
+        spectrum = np.abs(np.fft.rfft(frames * self.window)) ** 2
+        spectrum = spectrum[:, self.band] + 1e-12
+        flatness = 10 * (np.mean(np.log10(spectrum), axis=1) -
+                         np.log10(np.mean(spectrum, axis=1)))
+
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        self.energy = float(np.sqrt(np.mean(power)) * 2 ** 15) \
+            if len(power) else 0.0
+        return np.column_stack((energy, flatness, zcr))
+
+    def _update_threshold(self):
+        # Energy of the loud frames on the scale of 16 bit samples
+        self.threshold = float(
+            10 ** ((self.noise[0] + self.energy_margin) / 20) * 2 ** 15)
+
+    def _adapt(self, features, rate):
+        self.noise += (features - self.noise) * rate
+        # Follow the background down right away
+        self.noise[0] = max(min(self.noise[0], features[0]),
+                            self.MIN_NOISE_DB)
+
+    def _classify(self, frames):
+        """ Whether each frame is speech, following the noise. """
+        is_speech = []
+        for features in self._features(frames):
+            loudness = features[0] - self.noise[0]
+            speech = loudness >= 2 * self.energy_margin or (
+                loudness >= self.energy_margin and (
+                    self.noise[1] - features[1] >= self.flatness_margin or
+                    abs(features[2] - self.noise[2]) >= self.zcr_margin))
+            if speech:
+                self._adapt(features, self.speech_noise_rate)
+            else:
+                self._adapt(features, self.noise_rate)
+            is_speech.append(bool(speech))
+        self._update_threshold()
+        return is_speech
+
+    def calibrate(self, chunk):
+        for features in self._features(self._frames(chunk)):
+            self.noise += (features - self.noise) * 0.2
+        self._update_threshold()
+
+    def update(self, chunk):
+        self._classify(self._frames(chunk))
+
+    def process(self, chunk):
+        is_speech = self._classify(self._frames(chunk))
+        speech_frames = sum(is_speech)
+        if speech_frames:
+            silent_frames = is_speech[::-1].index(True)
+        else:
+            silent_frames = len(is_speech)
+        return speech_frames * self.frame_sec, silent_frames * self.frame_sec
+
+
+class VadFactory(object):
+    CLASSES = {
+        "energy": EnergyVad,
+        "spectral": SpectralVad
+    }
+
+    @staticmethod
+    def create(config, sample_rate, sample_width):
+        """
+            Create the voice activity detector set in the listener config.
+
+            Args:
+                config (dict): listener config
+                sample_rate (int): samples per second
+                sample_width (int): bytes per sample
+        """
+        module = config.get('vad', {}).get('module', 'energy')
+        clazz = VadFactory.CLASSES.get(module)
+        try:
+            return clazz(config, sample_rate, sample_width)
+        except Exception:
+            LOG.exception('Could not create VAD. Falling back to default.')
+            return EnergyVad(config, sample_rate, sample_width)
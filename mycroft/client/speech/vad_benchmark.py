@@ -0,0 +1,143 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Voice Activity Detection Benchmark
+Records wav files with each voice activity detector and measures how long
+after the end of the speech the recording stops.
+
+Each file is played between stretches of its own background noise, the
+quietest 300 ms of the file repeated. The listener calibrates on the noise
+before it, like it does before waiting for the wake word, and then records
+the phrase. The speech is taken to end with the last 10 ms of the file at
+least 12 dB louder than the background.
+"""
+import argparse
+import audioop
+import math
+import wave
+from glob import glob
+from os.path import basename, dirname, join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from mycroft.client.speech.audio_buffer import write_wav
+from mycroft.client.speech.mic import FileMicrophone, ResponsiveRecognizer
+from mycroft.client.speech.vad import VadFactory
+
+DATA_DIR = join(dirname(__file__), '..', '..', '..', 'test', 'unittests',
+                'client', 'data')
+
+FRAME_SEC = 0.01
+CALIBRATION_SEC = 1.0
+NOISE_SEC = 0.3
+NOISE_BEFORE = 4  # Repetitions of the noise, more than the calibration
+NOISE_AFTER = 12
+
+
+class MockHotWord(object):
+    key_phrase = 'hey mycroft'
+    num_phonemes = 5
+
+
+def read_wav(filename):
+    wav = wave.open(filename, 'rb')
+    try:
+        return (wav.readframes(wav.getnframes()), wav.getframerate(),
+                wav.getsampwidth())
+    finally:
+        wav.close()
+
+
+def frame_energies(audio, frame_bytes, sample_width):
+    return [audioop.rms(audio[i:i + frame_bytes], sample_width)
+            for i in range(0, len(audio) - frame_bytes + 1, frame_bytes)]
+
+
+def speech_end(audio, sample_rate, sample_width):
+    """ Seconds into the audio where the speech ends, and the noise. """
+    frame_bytes = int(FRAME_SEC * sample_rate) * sample_width
+    energies = frame_energies(audio, frame_bytes, sample_width)
+    noise_frames = int(NOISE_SEC / FRAME_SEC)
+    sums = [sum(energies[i:i + noise_frames])
+            for i in range(len(energies) - noise_frames + 1)]
+    start = sums.index(min(sums)) * frame_bytes
+    noise = audio[start:start + noise_frames * frame_bytes]
+
+    floor = max(audioop.rms(noise, sample_width), 1)
+    loud = [i for i, e in enumerate(energies) if e >= floor * 10 ** 0.6]
+    return (loud[-1] + 1) * FRAME_SEC, noise
+
+
+def endpoint_delay(filename, module, tmp_dir, chunk_size):
+    """ Seconds between the end of the speech and of the recording. """
+    audio, sample_rate, sample_width = read_wav(filename)
+    end, noise = speech_end(audio, sample_rate, sample_width)
+    played = join(tmp_dir, basename(filename))
+    write_wav(played, [noise] * NOISE_BEFORE + [audio] +
+              [noise] * NOISE_AFTER, sample_rate, sample_width)
+
+    recognizer = ResponsiveRecognizer(MockHotWord())
+    config = dict(recognizer.listener_config, vad={'module': module})
+    recognizer.vad = VadFactory.create(config, sample_rate, sample_width)
+    with FileMicrophone(played, chunk_size, realtime=False) as source:
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        recognizer.adjust_for_ambient_noise(source, CALIBRATION_SEC)
+        calibrated = (math.floor(CALIBRATION_SEC / sec_per_buffer) *
+                      sec_per_buffer)
+        recorded = recognizer._record_phrase(source, sec_per_buffer)
+    # The recording starts with a sample of silence
+    stopped = calibrated + (len(recorded) - sample_width) / float(
+        sample_rate * sample_width)
+    speech_ended = NOISE_BEFORE * len(noise) / float(
+        sample_rate * sample_width) + end
+    return stopped - speech_ended
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'files', nargs='*', default=sorted(glob(join(DATA_DIR, '*.wav'))),
+        help="Wav files to record (Default: the client test data)")
+    parser.add_argument(
+        '-c', '--chunk', dest='chunk', type=int, default=1024,
+        help="Frames per chunk (Default: 1024)")
+    parser.add_argument(
+        '-m', '--modules', dest='modules', nargs='+',
+        default=sorted(VadFactory.CLASSES),
+        help="Voice activity detectors (Default: all)")
+    args = parser.parse_args()
+
+    tmp_dir = mkdtemp()
+    try:
+        print('End of recording after the end of speech (s)')
+        print('{:24}'.format('') +
+              ''.join('{:>10}'.format(m) for m in args.modules))
+        totals = dict((m, 0.0) for m in args.modules)
+        for filename in args.files:
+            line = '{:24}'.format(basename(filename))
+            for module in args.modules:
+                delay = endpoint_delay(filename, module, tmp_dir, args.chunk)
+                totals[module] += abs(delay)
+                line += '{:10.2f}'.format(delay)
+            print(line)
+        print('{:24}'.format('mean absolute') +
+              ''.join('{:10.2f}'.format(totals[m] / len(args.files))
+                      for m in args.modules))
+    finally:
+        rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -39,8 +39,10 @@ import textwrap
 import json
 import mycroft.version
 from threading import Thread, Lock
+from mycroft.client.speech.mic_level import MIC_LEVEL_FILE, MicLevelReader
 from mycroft.messagebus.client.ws import WebsocketClient
 from mycroft.messagebus.message import Message
+from mycroft.skills.load_report import format_load_report
 from mycroft.util import get_ipc_directory
 from mycroft.util.log import LOG
 
@@ -252,39 +254,25 @@ def start_log_monitor(filename):
 class MicMonitorThread(Thread):
     def __init__(self, filename):
         Thread.__init__(self)
-        self.filename = filename
-        self.st_results = os.stat(filename)
+        self.meter = MicLevelReader(filename)
+        self.seq = None
 
     def run(self):
+        global meter_cur
+        global meter_thresh
+
         while True:
             try:
-                st_results = os.stat(self.filename)
-
-                if (not st_results.st_ctime == self.st_results.st_ctime or
-                        not st_results.st_mtime == self.st_results.st_mtime):
-                    self.read_file_from(0)
-                    self.st_results = st_results
+                # Reading the shared memory doesn't need any system calls
+                level = self.meter.read()
+                if level and level.seq != self.seq:
+                    self.seq = level.seq
+                    meter_cur = level.energy
+                    meter_thresh = level.threshold
                     draw_screen()
             finally:
                 time.sleep(0.2)
 
-    def read_file_from(self, bytefrom):
-        global meter_cur
-        global meter_thresh
-
-        with io.open(self.filename, 'r') as fh:
-            fh.seek(bytefrom)
-            while True:
-                line = fh.readline()
-                if line == "":
-                    break
-
-                # Just adjust meter settings
-                # Ex:Energy:  cur=4 thresh=1.5
-                parts = line.split("=")
-                meter_thresh = float(parts[-1])
-                meter_cur = float(parts[-2].split(" ")[0])
-
 
 def start_mic_monitor(filename):
     if os.path.isfile(filename):
@@ -722,6 +710,7 @@ def show_help():
     scr.addstr(19, 0,  ":find 'str'             show logs containing 'str'")
     scr.addstr(20, 0,  ":keycode (show|hide)    display keyboard codes")
     scr.addstr(21, 0,  ":clear log              flush the logs")
+    scr.addstr(22, 0,  ":slowest (# skills)     show slowest loading skills")
 
     scr.addstr(curses.LINES - 1, 0,  center(23) + "Press any key to return",
                CLR_HEADING)
@@ -735,7 +724,8 @@ def show_help():
 
 def show_skills(skills):
     """
-        Show list of loaded skills in as many column as necessary
+        Show list of loaded skills in as many column as necessary,
+        skills which aren't loaded are shown with their state
 
         TODO: Handle multiscreen
     """
@@ -752,10 +742,13 @@ def show_skills(skills):
     row = 2
     column = 0
     col_width = 0
-    for skill in sorted(skills):
-        scr.addstr(row, column,  "  {}".format(skill))
+    for skill in sorted(skills, key=lambda s: s['id']):
+        text = skill['id']
+        if skill['state'] != 'loaded':
+            text += ' ({})'.format(skill['state'])
+        scr.addstr(row, column,  "  {}".format(text))
         row += 1
-        col_width = max(col_width, len(skill))
+        col_width = max(col_width, len(text))
         if row == 21:
             # Reached bottom of screen, start at top and move output to a
             # New column
@@ -772,6 +765,30 @@ def show_skills(skills):
     scr.refresh()
 
 
+def show_load_report(report, count):
+    """
+        Show the skills which were slowest to load
+    """
+    global scr
+    global screen_mode
+
+    if not scr:
+        return
+
+    screen_mode = 1  # showing help (prevents overwrite by log updates)
+    scr.erase()
+    scr.addstr(0, 0,  center(25) + "Slowest skills", CLR_CMDLINE)
+    scr.addstr(1, 1,  "=" * (curses.COLS - 2), CLR_CMDLINE)
+    count = min(count, curses.LINES - 5)
+    for row, text in enumerate(format_load_report(report, count)):
+        scr.addstr(row + 2, 0, text[:curses.COLS - 1])
+
+    scr.addstr(curses.LINES - 1, 0,  center(23) + "Press any key to return",
+               CLR_HEADING)
+
+    scr.refresh()
+
+
 def center(str_len):
     # generate number of characters needed to center a string
     # of the given length
@@ -854,10 +871,28 @@ def handle_cmd(cmd):
         if lines > max_chat_area:
             lines = max_chat_area
         cy_chat_area = lines
+    elif "slowest" in cmd:
+        # Show report of the skill loading
+        try:
+            count = int(_get_cmd_param(cmd))
+        except ValueError:
+            count = 10
+        message = ws.wait_for_response(
+            Message('mycroft.skills.load_report.request'),
+            reply_type='mycroft.skills.load_report')
+
+        if message and 'skills' in message.data:
+            show_load_report(message.data, count)
+            c = scr.getch()  # blocks
+            screen_mode = 0  # back to main screen
+            draw_screen()
+        else:
+            add_log_message("No skill load report available")
     elif "skills" in cmd:
         # List loaded skill
         message = ws.wait_for_response(
-            Message('skillmanager.list'), reply_type='mycroft.skills.list')
+            Message('mycroft.skills.registry.request'),
+            reply_type='mycroft.skills.registry')
 
         if message and 'skills' in message.data:
             show_skills(message.data['skills'])
@@ -1062,7 +1097,7 @@ start_log_monitor("/var/log/mycroft-skills.log")
 start_log_monitor("/var/log/mycroft-speech-client.log")
 
 # Monitor IPC file containing microphone level info
-start_mic_monitor(os.path.join(get_ipc_directory(), "mic_level"))
+start_mic_monitor(os.path.join(get_ipc_directory(), MIC_LEVEL_FILE))
 
 
 def main():
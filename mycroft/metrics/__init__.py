@@ -12,9 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import atexit
 import json
+import os
 import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from os.path import dirname, exists, splitext
 
 import requests
 
@@ -23,6 +28,7 @@ from mycroft.configuration import Configuration
 from mycroft.session import SessionManager
 from mycroft.util.log import LOG
 from mycroft.util.setup_base import get_version
+from mycroft.util.timer_service import TimerService
 from copy import copy
 
 
@@ -35,7 +41,7 @@ def report_metric(name, data):
         data (dict): JSON dictionary to report. Must be valid JSON
     """
     try:
-        if is_paired() and Configuration().get()['opt_in']:
+        if Configuration().get()['opt_in'] and is_paired():
             DeviceApi().report_metric(name, data)
     except requests.RequestException as e:
         LOG.error('Metric couldn\'t be uploaded, due to a network error ({})'
@@ -110,6 +116,181 @@ class Stopwatch(object):
             return 'Not started'
 
 
+class Tracer(object):
+    """
+        Records timing spans of the utterance handling pipeline.
+
+        Spans are grouped by the ident of the utterance. The spans of the
+        latest utterances are kept in memory and all spans are appended to
+        a trace file in the Chrome trace event format, which can be opened
+        with chrome://tracing or Perfetto.
+
+        Spans are buffered and written to the file by the TimerService
+        every flush_interval seconds, not by the thread being traced.
+    """
+    __instance = None
+    __instance_lock = threading.Lock()
+
+    @staticmethod
+    def get():
+        """ Get the Tracer configured by the "trace" config section. """
+        with Tracer.__instance_lock:
+            if not Tracer.__instance:
+                config = Configuration.get().get('trace', {})
+                path = config.get('file')
+                if path:
+                    # Each process writes its own file
+                    root, ext = splitext(path)
+                    path = '{}.{}{}'.format(root, os.getpid(), ext)
+                Tracer.__instance = Tracer(
+                    config.get('enabled', False), path,
+                    config.get('max_traces', 50),
+                    config.get('max_file_size', 1024 * 1024),
+                    config.get('flush_interval', 1.0))
+            return Tracer.__instance
+
+    def __init__(self, enabled=True, path=None, max_traces=50,
+                 max_file_size=1024 * 1024, flush_interval=1.0):
+        self.enabled = enabled
+        self.path = path
+        self.max_traces = max_traces
+        self.max_file_size = max_file_size
+        self.flush_interval = flush_interval
+        self.traces = OrderedDict()  # ident: {'start': time, 'spans': []}
+        self.lock = threading.Lock()
+        self._file = None
+        self._file_lock = threading.Lock()
+        self._pending = []  # Spans not yet written to the file
+        self._flush_timer = None
+        if enabled and path:
+            atexit.register(self.flush)
+
+    def start_trace(self, ident):
+        """
+            Start tracing an utterance.
+
+            Args:
+                ident (str): identifier of user interaction
+        """
+        if not self.enabled or ident is None:
+            return
+        with self.lock:
+            self._get_trace(ident)
+
+    def _get_trace(self, ident):
+        trace = self.traces.get(ident)
+        if not trace:
+            trace = self.traces[ident] = {'start': time.time(), 'spans': []}
+            while len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+        return trace
+
+    def add_span(self, ident, name, start, duration, data=None):
+        """
+            Add a finished span to the trace of an utterance.
+
+            Args:
+                ident (str):      identifier of user interaction
+                name (str):       name of the stage
+                start (float):    start time (time.time())
+                duration (float): duration in seconds
+                data (dict):      additional information about the stage
+        """
+        if not self.enabled or ident is None:
+            return
+        args = dict(data or {})
+        args['ident'] = ident
+        event = {
+            'name': name, 'cat': 'intent', 'ph': 'X',
+            'ts': int(start * 1000000), 'dur': int(duration * 1000000),
+            'pid': os.getpid(), 'tid': threading.get_ident(),
+            'args': args
+        }
+        with self.lock:
+            self._get_trace(ident)['spans'].append(event)
+            if self.path:
+                self._pending.append(event)
+                if not self._flush_timer:
+                    self._flush_timer = TimerService.get().call_later(
+                        self.flush_interval, self.flush)
+
+    @contextmanager
+    def span(self, ident, name, data=None):
+        """
+            Measure the time spent in a with-block as a span.
+
+            Args:
+                ident (str): identifier of user interaction
+                name (str):  name of the stage
+                data (dict): additional information about the stage
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_span(ident, name, start, time.time() - start, data)
+
+    def add_first_span(self, ident, name, data=None):
+        """
+            Add a span from the start of the trace until now, unless there
+            already is a span with the same name.
+
+            Used to measure time until the first occurrence of an event
+            such as the first speak message.
+        """
+        if not self.enabled or ident is None:
+            return
+        with self.lock:
+            trace = self._get_trace(ident)
+            if any(span['name'] == name for span in trace['spans']):
+                return
+            start = trace['start']
+        self.add_span(ident, name, start, time.time() - start, data)
+
+    def get_traces(self):
+        """
+            Get traces of the latest utterances, oldest first.
+
+            Returns:
+                list: dicts with ident and spans for each utterance
+        """
+        with self.lock:
+            return [{'ident': ident, 'spans': list(trace['spans'])}
+                    for ident, trace in self.traces.items()]
+
+    def flush(self):
+        """ Write the buffered spans to the trace file. """
+        with self.lock:
+            events, self._pending = self._pending, []
+            self._flush_timer = None
+        if events:
+            with self._file_lock:
+                self._write(events)
+
+    def _write(self, events):
+        """ Append events to the trace file (JSON Array Format). """
+        if not self.path:
+            return
+        try:
+            if self._file and self._file.tell() > self.max_file_size:
+                self._file.close()
+                os.rename(self.path, self.path + '.1')
+                self._file = None
+            if not self._file:
+                if not exists(dirname(self.path)):
+                    os.makedirs(dirname(self.path))
+                self._file = open(self.path, 'a')
+                if self._file.tell() == 0:
+                    # The closing bracket is optional in the format
+                    self._file.write('[\n')
+            self._file.write(''.join(json.dumps(event) + ',\n'
+                                     for event in events))
+            self._file.flush()
+        except (IOError, OSError) as e:
+            LOG.error('Could not write trace: {}'.format(repr(e)))
+            self.path = None
+
+
 class MetricsAggregator(object):
     """
     MetricsAggregator is not threadsafe, and multiple clients writing the
@@ -160,11 +341,10 @@ class MetricsAggregator(object):
                  len(payload['levels']))
         if count > 0:
             LOG.debug(json.dumps(payload))
-
-            def publish():
-                publisher.publish(payload)
-
-            threading.Thread(target=publish).start()
+            # Network requests can take long, don't use the TimerService
+            t = threading.Thread(target=publisher.publish, args=(payload,))
+            t.daemon = True
+            t.start()
 
 
 class MetricsPublisher(object):
@@ -19,8 +19,11 @@ from os.path import dirname, exists, isdir
 
 from mycroft.configuration import Configuration
 from mycroft.messagebus.client.ws import WebsocketClient
+from mycroft.messagebus.message import Message
 from mycroft.skills.core import create_skill_descriptor, load_skill
 from mycroft.skills.intent_service import IntentService
+from mycroft.util import (create_daemon, reset_sigint_handler,
+                          wait_for_exit_signal)
 from mycroft.util.log import LOG
 
 
@@ -36,6 +39,8 @@ class SkillContainer(object):
 
         sys.path.append(params.dir)
         self.dir = params.dir
+        self.skill_id = params.skill_id or hash(self.dir)
+        self.skill = None
 
         self.enable_intent = params.enable_intent
 
@@ -52,6 +57,7 @@ class SkillContainer(object):
         parser.add_argument("--use-ssl", action='store_true', default=False)
         parser.add_argument("--enable-intent", action='store_true',
                             default=False)
+        parser.add_argument("--skill-id", default=None)
         return parser.parse_args(args)
 
     def __init_client(self, params):
@@ -71,20 +77,42 @@ class SkillContainer(object):
 
     def load_skill(self):
         if self.enable_intent:
-            IntentService(self.ws)
+            # Get the names of the skills loaded by the skills service
+            IntentService(self.ws).request_skill_names()
 
         skill_descriptor = create_skill_descriptor(self.dir)
-        self.skill = load_skill(skill_descriptor, self.ws, hash(self.dir))
+        self.skill = load_skill(skill_descriptor, self.ws, self.skill_id)
+        data = {'path': self.dir, 'id': self.skill_id}
+        if self.skill:
+            data['name'] = self.skill.name
+            self.ws.on('skill.converse.request', self.handle_converse_request)
+            self.ws.emit(Message('mycroft.skills.loaded', data))
+        else:
+            self.ws.emit(Message('mycroft.skills.loading_failure', data))
+
+    def handle_converse_request(self, message):
+        """ Let the skill converse if the request is for this skill. """
+        skill_id = message.data['skill_id']
+        if skill_id != self.skill_id:
+            return
+        try:
+            result = self.skill.converse(message.data['utterances'],
+                                         message.data['lang'])
+        except Exception:
+            LOG.exception('Error in converse method for skill ' +
+                          str(skill_id))
+            result = False
+        self.ws.emit(message.reply('skill.converse.response',
+                                   {'skill_id': skill_id, 'result': result}))
 
     def run(self):
-        try:
-            self.ws.on('message', LOG.debug)
-            self.ws.on('open', self.load_skill)
-            self.ws.on('error', LOG.error)
-            self.ws.run_forever()
-        except Exception as e:
-            LOG.error("Error: {0}".format(e))
-            self.stop()
+        """ Run the skill until interrupted. """
+        self.ws.on('message', LOG.debug)
+        self.ws.once('open', self.load_skill)
+        self.ws.on('error', LOG.error)
+        create_daemon(self.ws.run_forever)
+        wait_for_exit_signal()
+        self.stop()
 
     def stop(self):
         if self.skill:
@@ -92,13 +120,10 @@ class SkillContainer(object):
 
 
 def main():
+    reset_sigint_handler()
     container = SkillContainer(sys.argv[1:])
-    try:
-        container.run()
-    except KeyboardInterrupt:
-        container.stop()
-    finally:
-        sys.exit()
+    container.run()
+    sys.exit()
 
 
 if __name__ == "__main__":
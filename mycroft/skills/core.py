@@ -12,8 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import imp
-import operator
+import bisect
+import importlib
+import importlib.util
 import sys
 import time
 import csv
@@ -23,9 +24,11 @@ from datetime import datetime, timedelta
 
 import abc
 import re
+
+import monotonic
 from adapt.intent import Intent, IntentBuilder
 from os.path import join, abspath, dirname, basename, exists
-from threading import Event
+from threading import Event, Lock, Thread
 
 from mycroft import dialog
 from mycroft.api import DeviceApi
@@ -35,7 +38,9 @@ from mycroft.configuration import Configuration
 from mycroft.dialog import DialogLoader
 from mycroft.filesystem import FileSystemAccess
 from mycroft.messagebus.message import Message
-from mycroft.metrics import report_metric, report_timing, Stopwatch
+from mycroft.metrics import report_metric, report_timing, Stopwatch, Tracer
+from mycroft.skills.handler_executor import HandlerExecutor
+from mycroft.skills.load_report import SkillLoadProfile
 from mycroft.skills.settings import SkillSettings
 from mycroft.skills.skill_data import (load_vocabulary, load_regex, to_alnum,
                                        munge_regex, munge_intent_parser)
@@ -87,7 +92,53 @@ def open_intent_envelope(message):
                   intent_dict.get('optional'))
 
 
-def load_skill(skill_descriptor, emitter, skill_id, BLACKLISTED_SKILLS=None):
+def load_skill_module(path, name):
+    """
+        Import a skill directory as the package name.
+
+        The skill is imported like any other package, so its bytecode is
+        cached in __pycache__ and the skill can import its own submodules.
+        A previously imported version of the skill is removed first.
+
+        Args:
+            path (str): skill directory
+            name (str): module name of the skill
+        Returns:
+            module: the skill module
+    """
+    unload_skill_module(name)
+    spec = importlib.util.spec_from_file_location(
+        name, join(path, MainModule + '.py'),
+        submodule_search_locations=[path])
+    if not hasattr(importlib.util, 'module_from_spec'):  # Python 3.4
+        return spec.loader.load_module(name)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        unload_skill_module(name)
+        raise
+    return module
+
+
+def unload_skill_module(name):
+    """
+        Remove a skill module and its submodules from sys.modules so they
+        can be garbage collected and are imported fresh the next time.
+
+        Args:
+            name (str): module name of the skill
+    """
+    for module_name in list(sys.modules):
+        if module_name == name or module_name.startswith(name + '.'):
+            del sys.modules[module_name]
+    # Make sure files added to the skill since are found
+    importlib.invalidate_caches()
+
+
+def load_skill(skill_descriptor, emitter, skill_id, BLACKLISTED_SKILLS=None,
+               profile=None):
     """
         load skill from skill descriptor.
 
@@ -95,37 +146,41 @@ def load_skill(skill_descriptor, emitter, skill_id, BLACKLISTED_SKILLS=None):
             skill_descriptor: descriptor of skill to load
             emitter:          messagebus emitter
             skill_id:         id number for skill
+            profile:          SkillLoadProfile recording the load time
         Returns:
             MycroftSkill: the loaded skill or None on failure
     """
     BLACKLISTED_SKILLS = BLACKLISTED_SKILLS or []
     path = skill_descriptor["path"]
     name = basename(path)
+    profile = profile or SkillLoadProfile(skill_id, path)
     LOG.info("ATTEMPTING TO LOAD SKILL: {} with ID {}".format(
         name, skill_id
     ))
     if name in BLACKLISTED_SKILLS:
         LOG.info("SKILL IS BLACKLISTED " + name)
         return None
-    main_file = join(path, MainModule + '.py')
     try:
-        with open(main_file, 'rb') as fp:
-            skill_module = imp.load_module(
-                name.replace('.', '_'), fp, main_file,
-                ('.py', 'rb', imp.PY_SOURCE)
-            )
+        with profile.phase('import'):
+            skill_module = load_skill_module(path, name.replace('.', '_'))
         if (hasattr(skill_module, 'create_skill') and
                 callable(skill_module.create_skill)):
             # v2 skills framework
-            skill = skill_module.create_skill()
-            skill.settings.allow_overwrite = True
-            skill.settings.load_skill_settings_from_file()
-            skill.bind(emitter)
-            skill.skill_id = skill_id
-            skill.load_data_files(path)
+            with profile.phase('create'):
+                skill = skill_module.create_skill()
+                skill.settings.allow_overwrite = True
+                skill.settings.load_skill_settings_from_file()
+                skill.bind(emitter)
+                skill.skill_id = skill_id
+            with profile.phase('data_files'):
+                profile.counts.update(skill.load_data_files(path) or {})
             # Set up intent handlers
-            skill.initialize()
-            skill._register_decorated()
+            with profile.phase('initialize'):
+                skill.initialize()
+                skill._register_decorated()
+            profile.counts['intents'] = (
+                len(skill.registered_intents) +
+                len([e for e, _ in skill.events if e.endswith('.intent')]))
             LOG.info("Loaded " + name)
 
             # The very first time a skill is run, speak the intro
@@ -137,6 +192,9 @@ def load_skill(skill_descriptor, emitter, skill_id, BLACKLISTED_SKILLS=None):
                 intro = skill.get_intro_message()
                 if intro:
                     skill.speak(intro)
+            profile.phases['settings'] = getattr(skill.settings, 'io_time',
+                                                 0.0)
+            profile.loaded = True
             return skill
         else:
             LOG.warning("Module {} does not appear to be skill".format(name))
@@ -222,6 +280,9 @@ class MycroftSkill(object):
         self.events = []
         self.scheduled_repeats = []
         self.skill_id = ''
+        # Number of handler calls, failed calls and seconds spent in them
+        self.handler_stats = {'calls': 0, 'errors': 0, 'time': 0.0,
+                              'queue_time': 0.0, 'max_queue_time': 0.0}
 
     @property
     def location(self):
@@ -446,8 +507,23 @@ class MycroftSkill(object):
             this enables converse method to be called even without skill being
             used in last 5 minutes
         """
-        self.emitter.emit(Message('active_skill_request',
-                                  {"skill_id": self.skill_id}))
+        self._emit_reply('active_skill_request', {"skill_id": self.skill_id})
+
+    def _emit_reply(self, msg_type, data):
+        """
+            Emit message as a reply to the message currently being handled
+            (if any) keeping context such as the session of the utterance.
+
+            Returns:
+                Message: the emitted message
+        """
+        message = dig_for_message()
+        if message:
+            message = message.reply(msg_type, data)
+        else:
+            message = Message(msg_type, data)
+        self.emitter.emit(message)
+        return message
 
     def _register_decorated(self):
         """
@@ -580,9 +656,14 @@ class MycroftSkill(object):
                                 removed after it has been run once.
         """
 
-        def wrapper(message):
+        def run_handler(message, queue_watch=None):
             skill_data = {'name': get_handler_name(handler)}
             stopwatch = Stopwatch()
+            if queue_watch:
+                queue_time = queue_watch.stop()
+                self.handler_stats['queue_time'] += queue_time
+                self.handler_stats['max_queue_time'] = max(
+                    queue_time, self.handler_stats['max_queue_time'])
             try:
                 message = unmunge_message(message, self.skill_id)
                 # Indicate that the skill handler is starting
@@ -596,9 +677,11 @@ class MycroftSkill(object):
                         handler()
                     else:
                         handler(message)
-                    self.settings.store()  # Store settings if they've changed
+                    # Store settings if they've changed
+                    self.settings.schedule_store()
 
             except Exception as e:
+                self.handler_stats['errors'] += 1
                 # Convert "MyFancySkill" to "My Fancy Skill" for speaking
                 handler_name = re.sub(r"([a-z])([A-Z])", r"\1 \2", self.name)
                 msg_data = {'skill': handler_name}
@@ -611,6 +694,9 @@ class MycroftSkill(object):
                 if once:
                     self.remove_event(name)
 
+                self.handler_stats['calls'] += 1
+                self.handler_stats['time'] += stopwatch.time or 0.0
+
                 # Indicate that the skill handler has completed
                 if handler_info:
                     msg_type = handler_info + '.complete'
@@ -621,6 +707,33 @@ class MycroftSkill(object):
                 if context and 'ident' in context:
                     report_timing(context['ident'], 'skill_handler', stopwatch,
                                   {'handler': handler.__name__})
+                    if stopwatch.time is not None:
+                        Tracer.get().add_span(context['ident'],
+                                              'skill_handler',
+                                              stopwatch.timestamp,
+                                              stopwatch.time,
+                                              {'handler': skill_data['name']})
+                    if queue_watch:
+                        report_timing(context['ident'], 'skill_handler_queue',
+                                      queue_watch,
+                                      {'handler': handler.__name__})
+                        Tracer.get().add_span(context['ident'],
+                                              'skill_handler_queue',
+                                              queue_watch.timestamp,
+                                              queue_watch.time,
+                                              {'handler': skill_data['name']})
+
+        def wrapper(message):
+            if handler_info:
+                # Run intent handlers on the handler executor, keeping the
+                # messagebus threads free for other messages
+                queue_watch = Stopwatch()
+                queue_watch.start()
+                HandlerExecutor.get().submit(
+                    self.skill_id or self.name, get_handler_name(handler),
+                    lambda: run_handler(message, queue_watch), self.emitter)
+            else:
+                run_handler(message)
 
         if handler:
             if once:
@@ -808,8 +921,7 @@ class MycroftSkill(object):
         if not isinstance(word, str):
             raise ValueError('word should be a string')
         context = to_alnum(self.skill_id) + context
-        self.emitter.emit(Message('add_context',
-                                  {'context': context, 'word': word}))
+        self._emit_reply('add_context', {'context': context, 'word': word})
 
     def remove_context(self, context):
         """
@@ -817,7 +929,7 @@ class MycroftSkill(object):
         """
         if not isinstance(context, str):
             raise ValueError('context should be a string')
-        self.emitter.emit(Message('remove_context', {'context': context}))
+        self._emit_reply('remove_context', {'context': context})
 
     def register_vocabulary(self, entity, entity_type):
         """ Register a word to an keyword
@@ -853,11 +965,9 @@ class MycroftSkill(object):
         self.enclosure.register(self.name)
         data = {'utterance': utterance,
                 'expect_response': expect_response}
-        message = dig_for_message()
-        if message:
-            self.emitter.emit(message.reply("speak", data))
-        else:
-            self.emitter.emit(Message("speak", data))
+        message = self._emit_reply("speak", data)
+        Tracer.get().add_first_span((message.context or {}).get('ident'),
+                                    'first_speak', {'skill': self.name})
 
     def speak_dialog(self, key, data=None, expect_response=False):
         """
@@ -881,22 +991,31 @@ class MycroftSkill(object):
             LOG.debug('No dialog loaded, ' + dialog_dir + ' does not exist')
 
     def load_data_files(self, root_directory):
+        """
+            Load dialog, vocabulary and regular expressions of the skill.
+
+            Returns:
+                dict: number of registered vocab and regex entries
+        """
         self.init_dialog(root_directory)
-        self.load_vocab_files(join(root_directory, 'vocab', self.lang))
+        counts = {'vocab': self.load_vocab_files(
+            join(root_directory, 'vocab', self.lang)), 'regex': 0}
         regex_path = join(root_directory, 'regex', self.lang)
         self.root_dir = root_directory
         if exists(regex_path):
-            self.load_regex_files(regex_path)
+            counts['regex'] = self.load_regex_files(regex_path)
+        return counts
 
     def load_vocab_files(self, vocab_dir):
         self.vocab_dir = vocab_dir
         if exists(vocab_dir):
-            load_vocabulary(vocab_dir, self.emitter, self.skill_id)
+            return load_vocabulary(vocab_dir, self.emitter, self.skill_id)
         else:
             LOG.debug('No vocab loaded, ' + vocab_dir + ' does not exist')
+            return 0
 
     def load_regex_files(self, regex_dir):
-        load_regex(regex_dir, self.emitter, self.skill_id)
+        return load_regex(regex_dir, self.emitter, self.skill_id)
 
     def __handle_stop(self, event):
         """
@@ -1090,13 +1209,53 @@ class MycroftSkill(object):
 
     def cancel_all_repeating_events(self):
         """ Cancel any repeating events started by the skill. """
-        for e in self.scheduled_repeats:
-            self.cancel_scheduled_event(e)
+        # scheduled_repeats holds the unique names
+        names = [e for e in self.scheduled_repeats if self.remove_event(e)]
+        self.scheduled_repeats = []
+        if names:
+            self.emitter.emit(Message('mycroft.scheduler.remove_events',
+                                      data={'events': names}))
 
 
 #######################################################################
 # FallbackSkill base class
 #######################################################################
+class _FallbackRun(object):
+    """
+        Fallback handler evaluated in its own thread.
+
+        Args:
+            handler:  fallback handler
+            message:  intent_failure message
+            finished: function called when the handler returned
+    """
+    def __init__(self, handler, message, finished):
+        self.started = Event()
+        self.done = Event()
+        self.start = None
+        self.result = None
+        self.error = None
+        thread = Thread(target=self._run, args=(handler, message, finished))
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, handler, message, finished):
+        self.start = monotonic.monotonic()
+        self.started.set()
+        try:
+            self.result = handler(message)
+        except Exception as e:
+            self.error = e
+        finally:
+            finished()
+            self.done.set()
+
+    def wait_started(self):
+        """ Monotonic time the handler started running. """
+        self.started.wait()
+        return self.start
+
+
 class FallbackSkill(MycroftSkill):
     """
         FallbackSkill is used to declare a fallback to be called when
@@ -1105,6 +1264,12 @@ class FallbackSkill(MycroftSkill):
         by their priority.
     """
     fallback_handlers = {}
+    # Priorities of fallback_handlers kept in sorted order
+    _fallback_order = []
+    # Per handler statistics, name: {calls, successes, timeouts, ...}
+    _fallback_stats = {}
+    _fallback_lock = Lock()
+    _fallback_running = set()  # Handlers whose last run hasn't returned
 
     def __init__(self, name=None, emitter=None):
         MycroftSkill.__init__(self, name, emitter)
@@ -1114,7 +1279,17 @@ class FallbackSkill(MycroftSkill):
 
     @classmethod
     def make_intent_failure_handler(cls, ws):
-        """Goes through all fallback handlers until one returns True"""
+        """Goes through all fallback handlers until one returns True
+
+        Handlers are tried in priority order. Each handler gets at most
+        handler_timeout seconds and the complete chain total_timeout
+        seconds (configured in the skills.fallback section). Speculative
+        handlers are started in parallel with the chain and their result
+        is used when their turn comes.
+        """
+        config = Configuration.get()['skills'].get('fallback', {})
+        handler_timeout = config.get('handler_timeout', 10.0)
+        total_timeout = config.get('total_timeout', 20.0)
 
         def handler(message):
             # indicate fallback handling start
@@ -1122,29 +1297,22 @@ class FallbackSkill(MycroftSkill):
                             data={'handler': "fallback"}))
 
             stopwatch = Stopwatch()
-            handler_name = None
             with stopwatch:
-                for _, handler in sorted(cls.fallback_handlers.items(),
-                                         key=operator.itemgetter(0)):
-                    try:
-                        if handler(message):
-                            #  indicate completion
-                            handler_name = get_handler_name(handler)
-                            ws.emit(Message(
-                                'mycroft.skill.handler.complete',
+                handler_name = cls._run_fallbacks(message, handler_timeout,
+                                                  total_timeout)
+            if handler_name:
+                #  indicate completion
+                ws.emit(Message('mycroft.skill.handler.complete',
                                 data={'handler': "fallback",
                                       "fallback_handler": handler_name}))
-                            break
-                    except Exception:
-                        LOG.exception('Exception in fallback.')
-                else:  # No fallback could handle the utterance
-                    ws.emit(Message('complete_intent_failure'))
-                    warning = "No fallback could handle intent."
-                    LOG.warning(warning)
-                    #  indicate completion with exception
-                    ws.emit(Message('mycroft.skill.handler.complete',
-                                    data={'handler': "fallback",
-                                          'exception': warning}))
+            else:  # No fallback could handle the utterance
+                ws.emit(Message('complete_intent_failure'))
+                warning = "No fallback could handle intent."
+                LOG.warning(warning)
+                #  indicate completion with exception
+                ws.emit(Message('mycroft.skill.handler.complete',
+                                data={'handler': "fallback",
+                                      'exception': warning}))
 
             # Send timing metric
             if message.context and message.context['ident']:
@@ -1152,8 +1320,157 @@ class FallbackSkill(MycroftSkill):
                 report_timing(ident, 'fallback_handler', stopwatch,
                               {'handler': handler_name})
 
+        def send_stats(message):
+            ws.emit(message.reply('mycroft.skills.fallback.stats.response',
+                                  {'handlers': cls.get_fallback_stats()}))
+
+        ws.on('mycroft.skills.fallback.stats', send_stats)
         return handler
 
+    @classmethod
+    def _run_fallbacks(cls, message, handler_timeout, total_timeout):
+        """
+            Run the fallback chain for a message.
+
+            Every handler runs in a thread of its own and the chain moves
+            on when it takes longer than handler_timeout. The result of a
+            handler that timed out is ignored. A handler still running from
+            an earlier utterance is skipped, so hung handlers don't pile up
+            threads.
+
+            Args:
+                message:         intent_failure message
+                handler_timeout: max time in seconds for a handler, from
+                                 when it started running
+                total_timeout:   max time in seconds for the whole chain
+
+            Returns:
+                str: name of the handler that handled the utterance or None
+        """
+        with cls._fallback_lock:
+            chain = [cls.fallback_handlers[p] for p in cls._fallback_order]
+        deadline = monotonic.monotonic() + total_timeout
+        ident = (message.context or {}).get('ident')
+
+        # Speculative handlers don't have side effects until committed,
+        # start all of them right away
+        speculative = {}
+        for index, fallback in enumerate(chain):
+            if getattr(fallback, 'speculative', False):
+                speculative[index] = cls._start_fallback(fallback, message)
+
+        handled_by = None
+        for index, fallback in enumerate(chain):
+            name = cls._get_fallback_name(fallback)
+            remaining = deadline - monotonic.monotonic()
+            if remaining <= 0:
+                LOG.warning('Fallback time budget exhausted before '
+                            '{}'.format(name))
+                break
+            if index in speculative:
+                run = speculative.pop(index)
+            else:
+                run = cls._start_fallback(fallback, message)
+            if run is None:
+                LOG.warning('Fallback {} is still running, skipping'.format(
+                    name))
+                cls._update_fallback_stats(ident, name,
+                                           monotonic.monotonic(), 'timeout')
+                continue
+            start = run.wait_started()
+            timeout = min(handler_timeout - (monotonic.monotonic() - start),
+                          remaining)
+            if not run.done.wait(max(timeout, 0)):
+                LOG.warning('Fallback {} timed out, skipping'.format(name))
+                cls._update_fallback_stats(ident, name, start, 'timeout')
+                continue
+            result = run.result
+            try:
+                if run.error is not None:
+                    raise run.error
+                if callable(result):  # Commit speculative result
+                    result()
+                    result = True
+            except Exception:
+                LOG.exception('Exception in fallback.')
+                cls._update_fallback_stats(ident, name, start, 'error')
+                continue
+            cls._update_fallback_stats(ident, name, start,
+                                       'success' if result else 'failure')
+            if result:
+                handled_by = name
+                break
+
+        # Speculative evaluations left in speculative are never committed
+        return handled_by
+
+    @classmethod
+    def _start_fallback(cls, fallback, message):
+        """
+            Start a fallback handler in a thread of its own.
+
+            Returns:
+                _FallbackRun: the started handler, None if the handler is
+                              still running from an earlier utterance
+        """
+        with cls._fallback_lock:
+            if fallback in cls._fallback_running:
+                return None
+            cls._fallback_running.add(fallback)
+
+        def finished():
+            with cls._fallback_lock:
+                cls._fallback_running.discard(fallback)
+
+        return _FallbackRun(fallback, message, finished)
+
+    @staticmethod
+    def _get_fallback_name(handler):
+        return getattr(handler, 'handler_name', None) or \
+            get_handler_name(handler)
+
+    @classmethod
+    def _update_fallback_stats(cls, ident, name, start, result):
+        """
+            Record the outcome of a fallback handler.
+
+            Args:
+                ident (str):   identifier of the utterance
+                name (str):    fallback handler name
+                start (float): monotonic time the handler was started
+                result (str):  'success', 'failure', 'timeout' or 'error'
+        """
+        duration = monotonic.monotonic() - start
+        with cls._fallback_lock:
+            stats = cls._fallback_stats.setdefault(
+                name, {'calls': 0, 'successes': 0, 'timeouts': 0,
+                       'errors': 0, 'total_time': 0.0, 'max_time': 0.0})
+            stats['calls'] += 1
+            stats['successes'] += int(result == 'success')
+            stats['timeouts'] += int(result == 'timeout')
+            stats['errors'] += int(result == 'error')
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+        Tracer.get().add_span(ident, 'fallback', time.time() - duration,
+                              duration, {'handler': name, 'result': result})
+
+    @classmethod
+    def get_fallback_stats(cls):
+        """
+            Get latency and success rate of the fallback handlers.
+
+            Returns:
+                dict: handler name: statistics dict
+        """
+        with cls._fallback_lock:
+            result = {}
+            for name, stats in cls._fallback_stats.items():
+                result[name] = dict(stats)
+                result[name]['success_rate'] = (stats['successes'] /
+                                                stats['calls'])
+                result[name]['avg_time'] = stats['total_time'] / stats['calls']
+            return result
+
     @classmethod
     def _register_fallback(cls, handler, priority):
         """
@@ -1164,25 +1481,46 @@ class FallbackSkill(MycroftSkill):
         Lower priority gets run first
         0 for high priority 100 for low priority
         """
-        while priority in cls.fallback_handlers:
-            priority += 1
+        with cls._fallback_lock:
+            while priority in cls.fallback_handlers:
+                priority += 1
 
-        cls.fallback_handlers[priority] = handler
+            cls.fallback_handlers[priority] = handler
+            bisect.insort(cls._fallback_order, priority)
 
-    def register_fallback(self, handler, priority):
+    def register_fallback(self, handler, priority, speculative=False):
         """
             register a fallback with the list of fallback handlers
             and with the list of handlers registered by this instance
+
+            A speculative handler may be run in parallel with higher
+            priority fallbacks. Instead of acting directly it should return
+            a function performing the action (speaking the answer etc.)
+            which is only called if no higher priority fallback handled the
+            utterance.
+
+            Args:
+                handler:     fallback handler, receives the message
+                priority:    0 for high priority 100 for low priority
+                speculative: True if the handler can run speculatively
         """
 
         def wrapper(*args, **kwargs):
-            if handler(*args, **kwargs):
+            result = handler(*args, **kwargs)
+            if callable(result):
+                def commit():
+                    result()
+                    self.make_active()
+                return commit
+            elif result:
                 self.make_active()
                 return True
             return False
 
+        wrapper.handler_name = get_handler_name(handler)
+        wrapper.speculative = speculative
         self.instance_fallback_handlers.append(wrapper)
-        self._register_fallback(handler, priority)
+        self._register_fallback(wrapper, priority)
 
     @classmethod
     def remove_fallback(cls, handler_to_del):
@@ -1192,10 +1530,13 @@ class FallbackSkill(MycroftSkill):
             Args:
                 handler_to_del: reference to handler
         """
-        for priority, handler in cls.fallback_handlers.items():
-            if handler == handler_to_del:
-                del cls.fallback_handlers[priority]
-                return
+        with cls._fallback_lock:
+            for priority, handler in cls.fallback_handlers.items():
+                if handler == handler_to_del:
+                    del cls.fallback_handlers[priority]
+                    index = bisect.bisect_left(cls._fallback_order, priority)
+                    del cls._fallback_order[index]
+                    return
         LOG.warning('Could not remove fallback!')
 
     def remove_instance_handlers(self):
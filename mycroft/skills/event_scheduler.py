@@ -12,21 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import heapq
 import json
+import math
+import os
 import time
-from threading import Thread
+from itertools import count
+from threading import Condition, Lock, Thread
 
 from os.path import isfile
 
 from mycroft.messagebus.message import Message
+from mycroft.metrics import MetricsAggregator
 from mycroft.util.log import LOG
-from queue import Queue
 
 
 def repeat_time(sched_time, repeat):
     """Next scheduled time for repeating event. Asserts that the
     time is not in the past.
 
+    The time is computed from the scheduled time rather than the time the
+    event was sent, so repeating events don't drift.
+
     Args:
         sched_time (float): Scheduled unix time for the event
         repeat (float):     Repeat period in seconds
@@ -34,13 +41,28 @@ def repeat_time(sched_time, repeat):
     Returns: (float) time for next event
     """
     next_time = sched_time + repeat
-    if next_time < time.time():
-        # Schedule at an offset to assure no doubles
-        next_time = time.time() + repeat
+    current_time = time.time()
+    if next_time < current_time:
+        # Skip the repeats that were missed
+        next_time += repeat * math.ceil((current_time - next_time) / repeat)
     return next_time
 
 
 class EventScheduler(Thread):
+    """
+        Thread sending messages at scheduled times.
+
+        The scheduled times are kept in a heap, the thread sleeps until the
+        earliest of them and is woken up when the schedule changes.
+    """
+    # Longest time to sleep, so changes of the system clock are noticed
+    MAX_WAIT = 60
+    # Report the lateness of fired events at most this often (seconds)
+    METRICS_INTERVAL = 60
+    # Operations in the journal before it's compacted into the snapshot,
+    # at least the number of scheduled times
+    JOURNAL_SIZE = 1000
+
     def __init__(self, emitter, schedule_file='/opt/mycroft/schedule.json'):
         """
             Create an event scheduler thread. Will send messages at a
@@ -48,23 +70,37 @@ class EventScheduler(Thread):
 
             Args:
                 emitter:        event emitter to use to send messages
-                schedule_file:  File to store pending events to on shutdown
+                schedule_file:  File to store pending events to, changes
+                                are appended to a journal next to it
         """
         super(EventScheduler, self).__init__()
         self.events = {}
+        # Heap of (time, sequence number, event), entries of removed events
+        # are left in the heap and skipped when they're due
+        self._heap = []
+        self._stale = 0
+        self._counter = count()
+        self.event_lock = Lock()
+        self._changed = Condition(self.event_lock)
+        self.metrics = MetricsAggregator()
+        self._metrics_time = time.time()
         self.emitter = emitter
         self.isRunning = True
         self.schedule_file = schedule_file
+        self.journal_file = (schedule_file or '') + '.journal'
+        self._journal = None
+        self._journal_size = 0
         if self.schedule_file:
             self.load()
 
-        self.add = Queue()
-        self.remove = Queue()
-        self.update = Queue()
         self.emitter.on('mycroft.scheduler.schedule_event',
                         self.schedule_event_handler)
+        self.emitter.on('mycroft.scheduler.schedule_events',
+                        self.schedule_events_handler)
         self.emitter.on('mycroft.scheduler.remove_event',
                         self.remove_event_handler)
+        self.emitter.on('mycroft.scheduler.remove_events',
+                        self.remove_events_handler)
         self.emitter.on('mycroft.scheduler.update_event',
                         self.update_event_handler)
         self.emitter.on('mycroft.scheduler.get_event',
@@ -73,98 +109,190 @@ class EventScheduler(Thread):
 
     def load(self):
         """
-            Load json data with active events from json file.
+            Load json data with active events from json file and replay the
+            changes made since it was written from the journal.
         """
+        json_data = {}
         if isfile(self.schedule_file):
-            json_data = {}
             with open(self.schedule_file) as f:
                 try:
                     json_data = json.load(f)
                 except Exception as e:
                     LOG.error(e.message)
-            current_time = time.time()
+        with self.event_lock:
             for key in json_data:
-                event_list = json_data[key]
+                self.events[key] = [tuple(e) for e in json_data[key]]
+            replayed = self._replay_journal()
+            current_time = time.time()
+            for key in list(self.events):
                 # discard non repeating events that has already happened
-                self.events[key] = [tuple(e) for e in event_list
+                self.events[key] = [e for e in self.events[key]
                                     if e[0] > current_time or e[1]]
+                if not self.events[key]:
+                    del self.events[key]
+            self._rebuild_heap()
+        if replayed:
+            self.store()
 
-    def fetch_new_events(self):
+    def _replay_journal(self):
         """
-            Fetch new events and add to list of pending events.
-        """
-        while not self.add.empty():
-            event, sched_time, repeat, data = self.add.get(timeout=1)
-            # get current list of scheduled times for event, [] if missing
-            event_list = self.events.get(event, [])
+            Apply the operations in the journal, requires the lock.
 
-            # Don't schedule if the event is repeating and already scheduled
-            if repeat and event in self.events:
-                LOG.debug('Repeating event {} is already scheduled, discarding'
-                          .format(event))
-            else:
-                # add received event and time
-                event_list.append((sched_time, repeat, data))
-                self.events[event] = event_list
+            Returns:
+                int: number of operations applied
+        """
+        if not isfile(self.journal_file):
+            return 0
+        replayed = 0
+        with open(self.journal_file) as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # The last line can be cut short by a crash
+                    LOG.warning('Skipping broken line in scheduler journal')
+                    continue
+                if op[0] == 'add':
+                    event, sched_time, repeat, data = op[1:]
+                    event_list = self.events.setdefault(event, [])
+                    # The journal may already be part of the snapshot if
+                    # writing the snapshot was interrupted
+                    if (sched_time, repeat, data) not in event_list:
+                        event_list.append((sched_time, repeat, data))
+                elif op[0] == 'remove':
+                    self.events.pop(op[1], None)
+                elif op[0] == 'update' and self.events.get(op[1]):
+                    sched_time, repeat, _ = self.events[op[1]][0]
+                    self.events[op[1]][0] = (sched_time, repeat, op[2])
+                replayed += 1
+        return replayed
 
-    def remove_events(self):
+    def _write_journal(self, ops):
         """
-            Remove event from event list.
+            Append operations to the journal, requires the lock.
+
+            Once the journal outgrows the schedule it's compacted into a new
+            snapshot of the schedule.
         """
-        while not self.remove.empty():
-            event = self.remove.get()
-            if event in self.events:
-                self.events.pop(event)
+        if not self.schedule_file or not ops:
+            return
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_file, 'a')
+            self._journal.write(''.join(json.dumps(op) + '\n' for op in ops))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal_size += len(ops)
+        except (IOError, OSError) as e:
+            LOG.error('Couldn\'t write scheduler journal ({})'.format(e))
+        if self._journal_size > max(self.JOURNAL_SIZE, len(self._heap)):
+            self._store()
+
+    def _rebuild_heap(self):
+        """ Create the heap from the events, requires the lock. """
+        self._heap = [(t, next(self._counter), event)
+                      for event in self.events for t, _, _ in
+                      self.events[event]]
+        heapq.heapify(self._heap)
+        self._stale = 0
 
-    def update_events(self):
+    def _add(self, event, sched_time, repeat, data):
+        """ Add a time to an event, requires the lock. """
+        self.events.setdefault(event, []).append((sched_time, repeat, data))
+        heapq.heappush(self._heap, (sched_time, next(self._counter), event))
+        self._changed.notify()
+
+    def _pop_due(self, current_time):
         """
-            Update event list with new data.
+            Remove the scheduled times that have passed, requires the lock.
+
+            Returns:
+                list: (event, time, repeat, data) of the passed times
         """
-        while not self.remove.empty():
-            event, data = self.update.get()
-            # if there is an active event with this name
-            if len(self.events.get(event, [])) > 0:
-                time, repeat, _ = self.events[event][0]
-                self.events[event][0] = (time, repeat, data)
+        passed = []
+        while self._heap and self._heap[0][0] <= current_time:
+            sched_time, _, event = heapq.heappop(self._heap)
+            event_list = self.events.get(event, [])
+            for i, (t, repeat, data) in enumerate(event_list):
+                if t == sched_time:
+                    del event_list[i]
+                    break
+            else:
+                self._stale -= 1  # The time was removed
+                continue
+            if not event_list:
+                del self.events[event]
+            passed.append((event, sched_time, repeat, data))
+        return passed
 
     def run(self):
         while self.isRunning:
             self.check_state()
-            time.sleep(0.5)
+            with self._changed:
+                if not self.isRunning:
+                    break
+                timeout = self.MAX_WAIT
+                if self._heap:
+                    timeout = min(self._heap[0][0] - time.time(), timeout)
+                if timeout > 0:
+                    self._changed.wait(timeout)
 
     def check_state(self):
         """
-            Check if an event should be triggered.
+            Send the messages of the events that are due.
         """
-        # Remove events
-        self.remove_events()
-        # Fetch newly scheduled events
-        self.fetch_new_events()
-        # Update events
-        self.update_events()
-
-        # Check all events
-        for event in self.events:
-            current_time = time.time()
-            e = self.events[event]
-            # Get scheduled times that has passed
-            passed = [(t, r, d) for (t, r, d) in e if t <= current_time]
-            # and remaining times that we're still waiting for
-            remaining = [(t, r, d) for t, r, d in e if t > current_time]
-            # Trigger registered methods
-            for sched_time, repeat, data in passed:
-                self.emitter.emit(Message(event, data))
-                # if this is a repeated event add a new trigger time
+        current_time = time.time()
+        with self.event_lock:
+            passed = self._pop_due(current_time)
+            # if this is a repeated event add a new trigger time
+            for event, sched_time, repeat, data in passed:
                 if repeat:
-                    next_time = repeat_time(sched_time, repeat)
-                    remaining.append((next_time, repeat, data))
-            # update list of events
-            self.events[event] = remaining
+                    self._add(event, repeat_time(sched_time, repeat), repeat,
+                              data)
+
+        for event, sched_time, repeat, data in passed:
+            self.emitter.emit(Message(event, data))
+            self.metrics.timer('scheduler.lateness',
+                               time.time() - sched_time)
+        if current_time - self._metrics_time > self.METRICS_INTERVAL:
+            self._metrics_time = current_time
+            self.metrics.flush()
 
     def schedule_event(self, event, sched_time, repeat=None, data=None):
-        """ Send event to thread using thread safe queue. """
-        data = data or {}
-        self.add.put((event, sched_time, repeat, data))
+        """
+            Add an event to the schedule.
+
+            Args:
+                event (str):        message type to send
+                sched_time (float): unix time to send the message at
+                repeat (float):     repeat interval in seconds
+                data (dict):        message data
+        """
+        self.schedule_events([(event, sched_time, repeat, data)])
+
+    def schedule_events(self, events):
+        """
+            Add several events to the schedule at once.
+
+            Args:
+                events (list): (event, time, repeat, data) tuples, see
+                               schedule_event()
+        """
+        journal = []
+        with self.event_lock:
+            for event, sched_time, repeat, data in events:
+                data = data or {}
+                # Don't schedule if the event is repeating and already
+                # scheduled
+                if repeat and event in self.events:
+                    LOG.debug('Repeating event {} is already scheduled, '
+                              'discarding'.format(event))
+                    continue
+                self._add(event, sched_time, repeat, data)
+                # Repeating events are scheduled again by their skills
+                if not repeat:
+                    journal.append(('add', event, sched_time, repeat, data))
+            self._write_journal(journal)
 
     def schedule_event_handler(self, message):
         """
@@ -182,24 +310,84 @@ class EventScheduler(Thread):
         sched_time = message.data.get('time')
         repeat = message.data.get('repeat')
         data = message.data.get('data')
-        if event and sched_time:
+        if self._check_event_data(message.data):
             self.schedule_event(event, sched_time, repeat, data)
-        elif not event:
+
+    @staticmethod
+    def _check_event_data(data):
+        """ Check that the data of a scheduled event is complete. """
+        if not data.get('event'):
             LOG.error('Scheduled event name not provided')
-        else:
+        elif not data.get('time'):
             LOG.error('Scheduled event time not provided')
+        else:
+            return True
+        return False
+
+    def schedule_events_handler(self, message):
+        """
+            Messagebus interface to the schedule_events method.
+            Required data in the message envelope is
+                events: list of events with the data described in
+                        schedule_event_handler
+        """
+        events = [(e['event'], e['time'], e.get('repeat'), e.get('data'))
+                  for e in message.data.get('events', [])
+                  if self._check_event_data(e)]
+        self.schedule_events(events)
 
     def remove_event(self, event):
-        """ Remove event using thread safe queue. """
-        self.remove.put(event)
+        """ Remove all scheduled times of the event. """
+        self.remove_events([event])
+
+    def remove_events(self, events=None, prefix=None):
+        """
+            Remove several events at once.
+
+            Args:
+                events (list): names of the events to remove
+                prefix (str):  remove all events starting with prefix, like
+                               the events of a skill
+        """
+        with self.event_lock:
+            events = list(events or [])
+            if prefix:
+                events += [e for e in self.events if e.startswith(prefix)]
+            journal = []
+            for event in events:
+                removed = self.events.pop(event, None)
+                if removed:
+                    journal.append(('remove', event))
+                    self._stale += len(removed)
+            if journal:
+                self._write_journal(journal)
+                # Drop the entries of removed events if they pile up
+                if self._stale > len(self._heap) // 2:
+                    self._rebuild_heap()
+                self._changed.notify()
 
     def remove_event_handler(self, message):
         """ Messagebus interface to the remove_event method. """
         event = message.data.get('event')
         self.remove_event(event)
 
+    def remove_events_handler(self, message):
+        """
+            Messagebus interface to the remove_events method, the message
+            data holds the events list and/or the prefix.
+        """
+        self.remove_events(message.data.get('events'),
+                           message.data.get('prefix'))
+
     def update_event(self, event, data):
-        self.update((event, data))
+        """ Change the data sent with the next occurrence of the event. """
+        with self.event_lock:
+            # if there is an active event with this name
+            if len(self.events.get(event, [])) > 0:
+                sched_time, repeat, _ = self.events[event][0]
+                self.events[event][0] = (sched_time, repeat, data)
+                if not repeat:
+                    self._write_journal([('update', event, data)])
 
     def update_event_handler(self, message):
         """ Messagebus interface to the update_event method. """
@@ -213,9 +401,10 @@ class EventScheduler(Thread):
             Emits another event sending event status
         """
         event_name = message.data.get("name")
-        event = None
-        if event_name in self.events:
-            event = self.events[event_name]
+        with self.event_lock:
+            event = self.events.get(event_name)
+            if event is not None:
+                event = list(event)
         emitter_name = 'mycroft.event_status.callback.{}'.format(event_name)
         self.emitter.emit(Message(emitter_name, data=event))
 
@@ -223,29 +412,63 @@ class EventScheduler(Thread):
         """
             Write current schedule to disk.
         """
-        with open(self.schedule_file, 'w') as f:
-            json.dump(self.events, f)
+        with self.event_lock:
+            self._store()
+
+    def _store(self):
+        """
+            Replace the snapshot of the schedule and empty the journal,
+            requires the lock.
+        """
+        if not self.schedule_file:
+            return
+        events = {}
+        for event in self.events:
+            event_list = [e for e in self.events[event] if not e[1]]
+            if event_list:
+                events[event] = event_list
+        tmp_file = self.schedule_file + '.tmp'
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(events, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.schedule_file)
+            # Operations replayed twice after a crash here are harmless
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_file, 'w')
+            self._journal_size = 0
+        except (IOError, OSError) as e:
+            LOG.error('Couldn\'t store schedule ({})'.format(e))
 
     def clear_repeating(self):
         """
             Remove repeating events from events dict.
         """
-        for e in self.events:
-            self.events[e] = [i for i in self.events[e] if i[1] is None]
+        with self.event_lock:
+            for e in self.events:
+                self.events[e] = [i for i in self.events[e] if i[1] is None]
+            self._rebuild_heap()
 
     def clear_empty(self):
         """
             Remove empty event entries from events dict
         """
-        self.events = {k: self.events[k] for k in self.events
-                       if self.events[k] != []}
+        with self.event_lock:
+            self.events = {k: self.events[k] for k in self.events
+                           if self.events[k] != []}
 
     def shutdown(self):
         """ Stop the running thread. """
-        self.isRunning = False
+        with self._changed:
+            self.isRunning = False
+            self._changed.notify()
         # Remove listeners
         self.emitter.remove_all_listeners('mycroft.scheduler.schedule_event')
+        self.emitter.remove_all_listeners('mycroft.scheduler.schedule_events')
         self.emitter.remove_all_listeners('mycroft.scheduler.remove_event')
+        self.emitter.remove_all_listeners('mycroft.scheduler.remove_events')
         self.emitter.remove_all_listeners('mycroft.scheduler.update_event')
         # Wait for thread to finish
         self.join()
@@ -254,3 +477,6 @@ class EventScheduler(Thread):
         self.clear_empty()
         # Store all pending scheduled events
         self.store()
+        if self._journal is not None:
+            self._journal.close()
+        self.metrics.flush()
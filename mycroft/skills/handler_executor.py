@@ -0,0 +1,263 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Executor for skill intent handlers.
+
+The handlers run on worker threads of their own instead of the thread pool
+dispatching messagebus messages, so slow handlers can't hold up messages
+like mycroft.stop. A skill can only occupy a limited number of workers,
+further handlers of the skill wait for one of them to finish.
+
+Handlers running longer than the soft timeout are reported with a
+mycroft.skill.handler.timeout message. After the hard timeout the handler
+is abandoned: it's reported again, its worker is replaced and it no
+longer counts against the limit of its skill.
+"""
+from collections import deque
+from threading import Condition, Lock, Thread
+
+import monotonic
+
+from mycroft.configuration import Configuration
+from mycroft.messagebus.message import Message
+from mycroft.util.log import LOG
+
+
+class HandlerJob(object):
+    """ A handler submitted to the executor. """
+    def __init__(self, skill_id, name, func, emitter=None):
+        self.skill_id = skill_id
+        self.name = name
+        self.func = func
+        self.emitter = emitter
+        self.submitted = monotonic.monotonic()
+        self.started = None
+        self.soft_timeout = False
+        self.abandoned = False
+
+    @property
+    def queue_time(self):
+        if self.started is None:
+            return None
+        return self.started - self.submitted
+
+
+class HandlerExecutor(object):
+    """
+        Runs skill handlers on a bounded number of worker threads.
+
+        Args:
+            max_workers (int):     number of worker threads
+            max_per_skill (int):   handlers of one skill running at once
+            soft_timeout (float):  seconds before a handler is reported as
+                                   slow, 0 to disable
+            hard_timeout (float):  seconds before a handler is abandoned,
+                                   0 to disable
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self, max_workers=8, max_per_skill=2, soft_timeout=10.0,
+                 hard_timeout=60.0):
+        self.max_workers = max_workers
+        self.max_per_skill = max_per_skill
+        self.soft_timeout = soft_timeout
+        self.hard_timeout = hard_timeout
+        self.lock = Lock()
+        self._changed = Condition(self.lock)
+        # Wakes the watchdog when a handler starts
+        self._started = Condition(self.lock)
+        self._ready = deque()
+        self._waiting = {}  # skill_id: jobs over the limit of the skill
+        self._active = {}  # skill_id: number of jobs ready or running
+        self._running = set()
+        self._stopped = False
+        for _ in range(max_workers):
+            self._start_worker()
+        self._watchdog = None
+        if soft_timeout or hard_timeout:
+            self._watchdog = Thread(target=self._watch)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+
+    @classmethod
+    def get(cls):
+        """ Get the executor shared by all skills in this process. """
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = Configuration.get()['skills'].get('handlers', {})
+                cls._instance = cls(config.get('max_workers', 8),
+                                    config.get('max_per_skill', 2),
+                                    config.get('soft_timeout', 10.0),
+                                    config.get('hard_timeout', 60.0))
+            return cls._instance
+
+    def submit(self, skill_id, name, func, emitter=None):
+        """
+            Run a handler of a skill.
+
+            Args:
+                skill_id (str):  id of the skill, used for its limit
+                name (str):      name of the handler
+                func (callable): function running the handler
+                emitter:         messagebus emitter for timeout messages
+
+            Returns:
+                HandlerJob: the submitted job
+        """
+        job = HandlerJob(skill_id, name, func, emitter)
+        with self.lock:
+            if self._active.get(skill_id, 0) < self.max_per_skill:
+                self._active[skill_id] = self._active.get(skill_id, 0) + 1
+                self._ready.append(job)
+                self._changed.notify_all()
+            else:
+                self._waiting.setdefault(skill_id, deque()).append(job)
+        return job
+
+    def join(self, timeout=None):
+        """
+            Wait until all submitted handlers have finished or were
+            abandoned.
+
+            Returns:
+                bool: False if the timeout expired first
+        """
+        end = None if timeout is None else monotonic.monotonic() + timeout
+        with self.lock:
+            while self._active:
+                remaining = None
+                if end is not None:
+                    remaining = end - monotonic.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._changed.wait(remaining)
+        return True
+
+    def shutdown(self):
+        """ Stop the workers once the submitted handlers are done. """
+        with self.lock:
+            self._stopped = True
+            self._changed.notify_all()
+            self._started.notify_all()
+
+    def _start_worker(self):
+        worker = Thread(target=self._work)
+        worker.daemon = True
+        worker.start()
+
+    def _release(self, skill_id):
+        """ Let the next waiting handler of the skill run. Requires lock. """
+        waiting = self._waiting.get(skill_id)
+        if waiting:
+            self._ready.append(waiting.popleft())
+            if not waiting:
+                del self._waiting[skill_id]
+        elif self._active.get(skill_id, 0) > 1:
+            self._active[skill_id] -= 1
+        else:
+            self._active.pop(skill_id, None)
+        self._changed.notify_all()
+
+    def _work(self):
+        while True:
+            with self.lock:
+                while not self._ready and not self._stopped:
+                    self._changed.wait()
+                if not self._ready:
+                    return
+                job = self._ready.popleft()
+                job.started = monotonic.monotonic()
+                self._running.add(job)
+                self._started.notify_all()
+            try:
+                job.func()
+            except Exception:
+                LOG.exception('Error in handler ' + job.name)
+            finally:
+                with self.lock:
+                    self._running.discard(job)
+                    if job.abandoned:
+                        # The worker has been replaced, quit
+                        LOG.info('Abandoned handler {} finished after '
+                                 '{:.1f} seconds'.format(
+                                     job.name,
+                                     monotonic.monotonic() - job.started))
+                        return
+                    self._release(job.skill_id)
+
+    def _next_timeout(self):
+        """ Time of the next soft or hard timeout, None if there's no
+            running handler to time out. Requires lock.
+        """
+        timeouts = []
+        for job in self._running:
+            if self.soft_timeout and not job.soft_timeout:
+                timeouts.append(job.started + self.soft_timeout)
+            if self.hard_timeout:
+                timeouts.append(job.started + self.hard_timeout)
+        return min(timeouts) if timeouts else None
+
+    def _watch(self):
+        while True:
+            with self.lock:
+                # Sleep until the next handler could time out
+                while not self._stopped:
+                    next_timeout = self._next_timeout()
+                    if next_timeout is None:
+                        self._started.wait()
+                        continue
+                    remaining = next_timeout - monotonic.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._started.wait(remaining)
+                if self._stopped:
+                    return
+                now = monotonic.monotonic()
+                soft = [j for j in self._running
+                        if self.soft_timeout and not j.soft_timeout and
+                        now - j.started >= self.soft_timeout]
+                hard = [j for j in self._running
+                        if self.hard_timeout and
+                        now - j.started >= self.hard_timeout]
+                for job in soft:
+                    job.soft_timeout = True
+                for job in hard:
+                    job.abandoned = True
+                    self._running.discard(job)
+            for job in soft:
+                self._report_timeout(job, 'soft', now)
+            for job in hard:
+                self._report_timeout(job, 'hard', now)
+            if hard:
+                # Let the next handlers run once the timeouts are reported
+                with self.lock:
+                    for job in hard:
+                        self._release(job.skill_id)
+                        self._start_worker()
+
+    @staticmethod
+    def _report_timeout(job, kind, now):
+        elapsed = now - job.started
+        LOG.warning('Handler {} of {} still running after {:.1f} seconds'
+                    '{}'.format(job.name, job.skill_id, elapsed,
+                                ', abandoning it' if kind == 'hard' else ''))
+        if job.emitter:
+            job.emitter.emit(Message('mycroft.skill.handler.timeout', {
+                'skill_id': job.skill_id,
+                'handler': job.name,
+                'timeout': kind,
+                'elapsed': elapsed
+            }))
@@ -0,0 +1,454 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Intent Benchmark
+Measures intent matching throughput, latency, memory and accuracy.
+
+An IntentService and a PadatiousService are connected to an in-memory
+emitter and loaded with a number of synthetic skills (vocab, regex and
+intent files). A labeled corpus of utterances is then replayed through
+the services. The corpus is a file with one JSON object per line:
+
+    {"utterance": "turn on the lights", "intent": "skill-001:LightIntent"}
+
+where intent is null for utterances that shouldn't match. If no corpus
+is given one is generated from the synthetic skills.
+
+Utterances the IntentService can't match are passed through the fallback
+chain, where Padatious is registered, like the skills service does with
+intent_failure. All utterances use the same session and metrics and
+debug logging are disabled while timing so they don't dominate the result.
+"""
+import argparse
+import json
+import math
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from os import makedirs
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from adapt.intent import IntentBuilder
+
+from mycroft.messagebus.message import Message
+from mycroft.metrics import Tracer
+from mycroft.skills import core, intent_service
+from mycroft.skills.core import FallbackSkill
+from mycroft.skills.intent_service import IntentService
+from mycroft.skills.skill_data import (load_vocabulary, load_regex,
+                                       munge_intent_parser)
+from mycroft.util.log import LOG
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'to', 'sa', 'vi', 'de', 'po',
+             'gu', 'fe', 'ba', 'zo', 'ri', 'tu', 'ma', 'xe', 'hi', 'no']
+SHARED_THINGS = ['lights', 'music', 'timer', 'alarm', 'weather', 'news']
+BENCHMARK_SESSION = 'benchmark'
+# Messages sent by the fallback chain besides the matched intent
+FALLBACK_MESSAGES = ['mycroft.skill.handler.start',
+                     'mycroft.skill.handler.complete',
+                     'complete_intent_failure', 'active_skill_request']
+
+
+class FakeEmitter(object):
+    """ In-memory emitter dispatching messages synchronously. """
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+
+    def on(self, event, f):
+        self.handlers.setdefault(event, []).append(f)
+
+    def once(self, event, f):
+        def wrapper(message):
+            self.remove(event, wrapper)
+            f(message)
+        self.on(event, wrapper)
+
+    def remove(self, event, f):
+        if f in self.handlers.get(event, []):
+            self.handlers[event].remove(f)
+
+    def emit(self, message):
+        self.emitted.append(message)
+        for handler in list(self.handlers.get(message.type, [])):
+            handler(message)
+
+
+class SyntheticSkills(object):
+    """
+        Creates skill data (vocab, regex and padatious intent files) for
+        a number of made-up skills and registers it with the services.
+
+        Each skill has two Adapt intents, one of them using a regex
+        entity, and one Padatious intent. A few words are shared between
+        the skills to create ambiguity.
+    """
+    def __init__(self, count, directory, seed=0):
+        self.random = random.Random(seed)
+        self.directory = directory
+        self.used_words = set()
+        self.skills = [self._create_skill('skill-{:03d}'.format(i))
+                       for i in range(count)]
+
+    def word(self):
+        """ Create a unique made up word. """
+        while True:
+            word = ''.join(self.random.choice(SYLLABLES)
+                           for _ in range(self.random.randint(2, 4)))
+            if word not in self.used_words:
+                self.used_words.add(word)
+                return word
+
+    def _create_skill(self, skill_id):
+        skill = {
+            'id': skill_id,
+            'path': join(self.directory, skill_id),
+            'action': [self.word() for _ in range(3)],
+            'setting': [self.word() for _ in range(2)],
+            'unit': self.word(),
+            'things': self.random.sample(SHARED_THINGS, 2),
+            'query': self.word(),
+            'nouns': [self.word() for _ in range(3)]
+        }
+        vocab_dir = join(skill['path'], 'vocab', 'en-us')
+        regex_dir = join(skill['path'], 'regex', 'en-us')
+        makedirs(vocab_dir)
+        makedirs(regex_dir)
+        with open(join(vocab_dir, 'Action.voc'), 'w') as f:
+            f.write('|'.join(skill['action']) + '\n')
+        with open(join(vocab_dir, 'Setting.voc'), 'w') as f:
+            f.write('\n'.join(skill['setting']) + '\n')
+        with open(join(vocab_dir, 'Thing.voc'), 'w') as f:
+            f.write('\n'.join(skill['things']) + '\n')
+        with open(join(regex_dir, 'value.rx'), 'w') as f:
+            f.write('(?P<Value>\\d+) ' + skill['unit'] + '\n')
+        with open(join(vocab_dir, 'query.intent'), 'w') as f:
+            for noun in skill['nouns']:
+                f.write('{} the {}\n'.format(skill['query'], noun))
+                f.write('could you {} my {}\n'.format(skill['query'], noun))
+        return skill
+
+    def register(self, emitter):
+        """ Register the skills like MycroftSkill.load_data_files does. """
+        for skill in self.skills:
+            vocab_dir = join(skill['path'], 'vocab', 'en-us')
+            load_vocabulary(vocab_dir, emitter, skill['id'])
+            load_regex(join(skill['path'], 'regex', 'en-us'), emitter,
+                       skill['id'])
+            intents = [
+                IntentBuilder('ActionIntent').require('Action')
+                .optionally('Thing').build(),
+                IntentBuilder('SettingIntent').require('Setting')
+                .require('Value').build()
+            ]
+            for intent in intents:
+                munge_intent_parser(intent, intent.name, skill['id'])
+                emitter.emit(Message('register_intent', intent.__dict__))
+            emitter.emit(Message('padatious:register_intent', {
+                'file_name': join(vocab_dir, 'query.intent'),
+                'name': skill['id'] + ':query.intent'
+            }))
+
+    def create_corpus(self, size, unmatched_ratio=0.1, padatious=True):
+        """ Create labeled utterances for the skills.
+
+        Args:
+            size (int): number of utterances
+            unmatched_ratio (float): share of utterances matching nothing
+            padatious (bool): include utterances for the padatious intents
+
+        Returns:
+            list: (utterance, intent name or None) tuples
+        """
+        corpus = []
+        for _ in range(size):
+            if self.random.random() < unmatched_ratio:
+                utterance = ' '.join(self.word() for _ in range(3))
+                corpus.append((utterance, None))
+                continue
+            skill = self.random.choice(self.skills)
+            kind = self.random.randint(0, 2 if padatious else 1)
+            if kind == 0:
+                utterance = '{} the {}'.format(
+                    self.random.choice(skill['action']),
+                    self.random.choice(skill['things']))
+                intent = skill['id'] + ':ActionIntent'
+            elif kind == 1:
+                utterance = 'set {} to {} {}'.format(
+                    self.random.choice(skill['setting']),
+                    self.random.randint(1, 100), skill['unit'])
+                intent = skill['id'] + ':SettingIntent'
+            else:
+                utterance = 'please {} the {}'.format(
+                    skill['query'], self.random.choice(skill['nouns']))
+                intent = skill['id'] + ':query.intent'
+            corpus.append((utterance, intent))
+        return corpus
+
+
+def load_corpus(filename):
+    """ Load labeled utterances from a JSON lines file.
+
+    Returns:
+        list: (utterance, intent name or None) tuples
+    """
+    corpus = []
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                corpus.append((item['utterance'], item.get('intent')))
+    return corpus
+
+
+def percentile(values, percent):
+    """ Nearest rank percentile of a list of values. """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = max(0, int(math.ceil(percent / 100.0 * len(values))) - 1)
+    return values[index]
+
+
+def create_services(emitter, use_padatious=True, cache_dir=None):
+    """ Create the intent services connected to the emitter.
+
+    Returns:
+        tuple: IntentService, PadatiousService or None
+    """
+    def converse_response(message):
+        # No skill is conversing
+        emitter.emit(message.reply('skill.converse.response',
+                                   {'skill_id': 0, 'result': False}))
+
+    emitter.on('skill.converse.request', converse_response)
+    service = IntentService(emitter)
+    # Keep stage timing of the last utterance in memory only
+    service.tracer = Tracer(enabled=True, max_traces=1)
+
+    padatious = None
+    if use_padatious:
+        from mycroft.skills.padatious_service import PadatiousService
+        padatious = PadatiousService(emitter, service)
+        if hasattr(padatious, 'container'):
+            from padatious import IntentContainer
+            padatious.container = IntentContainer(cache_dir)
+        else:
+            padatious = None  # Padatious not installed
+    return service, padatious
+
+
+@contextmanager
+def quiet():
+    """ Disable metrics and logging below warnings.
+
+    Reporting a timing checks the pairing with the backend and every log
+    call walks the stack, both cost more than matching the intent.
+    """
+    def ignore(*args, **kwargs):
+        pass
+
+    timers = [(module, module.report_timing)
+              for module in (intent_service, core)]
+    log_methods = {name: vars(LOG)[name] for name in ('debug', 'info')}
+    for module, _ in timers:
+        module.report_timing = ignore
+    for name in log_methods:
+        setattr(LOG, name, ignore)
+    try:
+        yield
+    finally:
+        for module, report_timing in timers:
+            module.report_timing = report_timing
+        for name, method in log_methods.items():
+            setattr(LOG, name, method)
+
+
+def run_benchmark(service, padatious, corpus):
+    """ Replay the corpus through the intent services.
+
+    Returns:
+        dict: per utterance results
+    """
+    emitter = service.emitter
+    fallback = None
+    if padatious:
+        fallback = FallbackSkill.make_intent_failure_handler(emitter)
+    results = []
+    with quiet():
+        for n, (utterance, expected) in enumerate(corpus):
+            emitter.emitted = []
+            message = Message('recognizer_loop:utterance', {
+                'utterances': [utterance], 'lang': 'en-us',
+                'session': BENCHMARK_SESSION, 'ident': str(n)})
+            start = time.time()
+            service.handle_utterance(message)
+            stages = {'intent_service': time.time() - start}
+            for span in service.tracer.get_traces()[-1]['spans']:
+                stages[span['name']] = (stages.get(span['name'], 0.0) +
+                                        span['dur'] / 1000000.0)
+
+            predicted = None
+            stage = None
+            reply = emitter.emitted[-1] if emitter.emitted else None
+            if reply and reply.type != 'intent_failure':
+                predicted = reply.type
+                stage = 'adapt'
+            elif reply and fallback:
+                emitter.emitted = []
+                start = time.time()
+                fallback(reply)
+                stages['fallback'] = time.time() - start
+                matched = [m.type for m in emitter.emitted
+                           if m.type not in FALLBACK_MESSAGES]
+                if matched:
+                    predicted = matched[0]
+                    stage = 'padatious'
+
+            results.append({
+                'utterance': utterance, 'expected': expected,
+                'predicted': predicted, 'stage': stage, 'stages': stages,
+                'time': sum(stages[s] for s in ('intent_service', 'fallback')
+                            if s in stages)
+            })
+    return results
+
+
+def expected_stage(intent):
+    if intent is None:
+        return 'none'
+    return 'padatious' if intent.endswith('.intent') else 'adapt'
+
+
+def summarize(results, duration):
+    """ Create a report from the benchmark results. """
+    report = {
+        'utterances': len(results),
+        'utterances_per_second': len(results) / duration,
+        'accuracy': (sum(r['predicted'] == r['expected'] for r in results) /
+                     max(len(results), 1)),
+        'stages': {}
+    }
+    stage_names = set()
+    for r in results:
+        stage_names.update(r['stages'])
+    for name in sorted(stage_names):
+        times = [r['stages'][name] for r in results if name in r['stages']]
+        report['stages'][name] = {
+            'count': len(times),
+            'p50': percentile(times, 50),
+            'p95': percentile(times, 95),
+            'p99': percentile(times, 99)
+        }
+    times = [r['time'] for r in results]
+    report['latency'] = {'p50': percentile(times, 50),
+                         'p95': percentile(times, 95),
+                         'p99': percentile(times, 99)}
+
+    report['stage_accuracy'] = {}
+    for stage in ('adapt', 'padatious', 'none'):
+        items = [r for r in results if expected_stage(r['expected']) == stage]
+        if items:
+            correct = sum(r['predicted'] == r['expected'] for r in items)
+            report['stage_accuracy'][stage] = correct / len(items)
+    return report
+
+
+def print_report(report):
+    def ms(value):
+        return '{:8.2f} ms'.format(value * 1000)
+
+    print('Utterances:      {}'.format(report['utterances']))
+    print('Throughput:      {:.1f} utterances/s'.format(
+        report['utterances_per_second']))
+    print('Accuracy:        {:.1%}'.format(report['accuracy']))
+    for stage, accuracy in report['stage_accuracy'].items():
+        print('  {:14} {:.1%}'.format(stage + ':', accuracy))
+    print('Memory:          {:.1f} MB after loading, {:.1f} MB peak'.format(
+        report['memory']['loaded'] / 1e6, report['memory']['peak'] / 1e6))
+    print()
+    print('{:16} {:>7} {:>11} {:>11} {:>11}'.format(
+        'Stage', 'Count', 'p50', 'p95', 'p99'))
+    rows = sorted(report['stages'].items())
+    rows.append(('total', dict(report['latency'],
+                               count=report['utterances'])))
+    for name, stats in rows:
+        print('{:16} {:7} {} {} {}'.format(name, stats['count'],
+                                           ms(stats['p50']),
+                                           ms(stats['p95']),
+                                           ms(stats['p99'])))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-s', '--skills', dest='skills', type=int, default=40,
+        help="Number of synthetic skills to load (Default: 40)")
+    parser.add_argument(
+        '-c', '--corpus', dest='corpus',
+        help="Labeled utterance file, generated if not given")
+    parser.add_argument(
+        '-n', '--utterances', dest='utterances', type=int, default=1000,
+        help="Size of the generated corpus (Default: 1000)")
+    parser.add_argument(
+        '--no-padatious', dest='padatious', action='store_false',
+        help="Only benchmark Adapt")
+    parser.add_argument(
+        '--seed', dest='seed', type=int, default=0,
+        help="Seed for the synthetic skills and corpus (Default: 0)")
+    parser.add_argument(
+        '-o', '--output', dest='output',
+        help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    tmp_dir = mkdtemp()
+    try:
+        tracemalloc.start()
+        emitter = FakeEmitter()
+        service, padatious = create_services(emitter, args.padatious,
+                                             join(tmp_dir, 'intent_cache'))
+        skills = SyntheticSkills(args.skills, join(tmp_dir, 'skills'),
+                                 args.seed)
+        skills.register(emitter)
+        if padatious:
+            padatious.train()
+        loaded_memory = tracemalloc.get_traced_memory()[0]
+
+        if args.corpus:
+            corpus = load_corpus(args.corpus)
+        else:
+            corpus = skills.create_corpus(args.utterances,
+                                          padatious=bool(padatious))
+
+        start = time.time()
+        results = run_benchmark(service, padatious, corpus)
+        report = summarize(results, time.time() - start)
+        report['memory'] = {'loaded': loaded_memory,
+                            'peak': tracemalloc.get_traced_memory()[1]}
+        tracemalloc.stop()
+    finally:
+        rmtree(tmp_dir)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
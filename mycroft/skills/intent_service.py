@@ -13,6 +13,11 @@
 # limitations under the License.
 #
 import time
+from collections import deque, OrderedDict
+from copy import deepcopy
+from itertools import islice
+from threading import Event, Lock, local
+
 from adapt.context import ContextManagerFrame
 from adapt.engine import IntentDeterminationEngine
 
@@ -21,7 +26,7 @@ from mycroft.messagebus.message import Message
 from mycroft.skills.core import open_intent_envelope
 from mycroft.util.log import LOG
 from mycroft.util.parse import normalize
-from mycroft.metrics import report_timing, Stopwatch
+from mycroft.metrics import report_timing, Stopwatch, Tracer
 
 
 class ContextManager(object):
@@ -29,18 +34,37 @@ class ContextManager(object):
     ContextManager
     Use to track context throughout the course of a conversational session.
     How to manage a session's lifecycle is not captured here.
+
+    Frames are stored newest first in a bounded deque. Since frames are
+    always added at the front the oldest frame is always last, making
+    expiry a matter of popping from the end.
     """
 
-    def __init__(self, timeout):
-        self.frame_stack = []
+    def __init__(self, timeout, max_stored_frames=20):
+        self.frame_stack = deque(maxlen=max_stored_frames)
         self.timeout = timeout * 60  # minutes to seconds
+        self._cache = {}  # max_frames: context entities
+
+    def _invalidate(self):
+        self._cache = {}
+
+    def _prune(self):
+        """ Drop expired frames from the end of the stack. """
+        oldest_allowed = time.time() - self.timeout
+        while self.frame_stack and self.frame_stack[-1][1] <= oldest_allowed:
+            self.frame_stack.pop()
+            self._invalidate()
 
     def clear_context(self):
-        self.frame_stack = []
+        self.frame_stack.clear()
+        self._invalidate()
 
     def remove_context(self, context_id):
-        self.frame_stack = [(f, t) for (f, t) in self.frame_stack
-                            if context_id in f.entities[0].get('data', [])]
+        self.frame_stack = deque(
+            ((f, t) for (f, t) in self.frame_stack
+             if context_id in f.entities[0].get('data', [])),
+            maxlen=self.frame_stack.maxlen)
+        self._invalidate()
 
     def inject_context(self, entity, metadata=None):
         """
@@ -63,10 +87,34 @@ class ContextManager(object):
             else:
                 frame = ContextManagerFrame(entities=[entity],
                                             metadata=metadata.copy())
-                self.frame_stack.insert(0, (frame, time.time()))
+                self.frame_stack.appendleft((frame, time.time()))
+            self._invalidate()
         except (IndexError, KeyError):
             pass
 
+    def _build_context(self, max_frames):
+        """ Create weighted entity list from the max_frames newest frames. """
+        context = []
+        for i, (frame, _) in enumerate(islice(self.frame_stack, max_frames)):
+            for entity in frame.entities:
+                entity = entity.copy()
+                entity['confidence'] = entity.get('confidence', 1.0) \
+                    / (2.0 + i)
+                context.append(entity)
+        return context
+
+    @staticmethod
+    def _latest_keywords(entities):
+        """ Only use the latest instance of each keyword. """
+        stripped = []
+        processed = set()
+        for f in entities:
+            keyword = f['data'][0][1]
+            if keyword not in processed:
+                stripped.append(f)
+                processed.add(keyword)
+        return stripped
+
     def get_context(self, max_frames=None, missing_entities=None):
         """ Constructs a list of entities from the context.
 
@@ -80,23 +128,19 @@ class ContextManager(object):
         """
         missing_entities = missing_entities or []
 
-        relevant_frames = [frame[0] for frame in self.frame_stack if
-                           time.time() - frame[1] < self.timeout]
-        if not max_frames or max_frames > len(relevant_frames):
-            max_frames = len(relevant_frames)
+        self._prune()
+        if not max_frames or max_frames > len(self.frame_stack):
+            max_frames = len(self.frame_stack)
 
-        missing_entities = list(missing_entities)
-        context = []
-        for i in range(max_frames):
-            frame_entities = [entity.copy() for entity in
-                              relevant_frames[i].entities]
-            for entity in frame_entities:
-                entity['confidence'] = entity.get('confidence', 1.0) \
-                    / (2.0 + i)
-            context += frame_entities
+        if max_frames not in self._cache:
+            context = self._build_context(max_frames)
+            self._cache[max_frames] = (context,
+                                       self._latest_keywords(context))
+        context, stripped = self._cache[max_frames]
 
-        result = []
         if len(missing_entities) > 0:
+            missing_entities = list(missing_entities)
+            result = []
             for entity in context:
                 if entity.get('data') in missing_entities:
                     result.append(entity)
@@ -105,19 +149,38 @@ class ContextManager(object):
                     # multiple times in missing_entities. Cannot get
                     # an arbitrary number of an entity kind.
                     missing_entities.remove(entity.get('data'))
+            return self._latest_keywords(result)
         else:
-            result = context
+            return list(stripped)  # The list may be sorted by the caller
 
-        # Only use the latest instance of each keyword
-        stripped = []
-        processed = []
-        for f in result:
-            keyword = f['data'][0][1]
-            if keyword not in processed:
-                stripped.append(f)
-                processed.append(keyword)
-        result = stripped
-        return result
+
+class IntentSession(object):
+    """
+    Intent state of a single session (a device, satellite microphone or
+    CLI) identified by the session id of the utterances.
+
+    A new session starts with a copy of the context and active skills of
+    the template session.
+    """
+
+    def __init__(self, session_id, context_timeout, max_stored_frames,
+                 template=None):
+        self.session_id = session_id
+        self.context_manager = ContextManager(context_timeout,
+                                              max_stored_frames)
+        self.active_skills = []  # [skill_id , timestamp]
+        if template:
+            self.context_manager.frame_stack.extend(
+                deepcopy(list(template.context_manager.frame_stack)))
+            self.active_skills = [list(s) for s in template.active_skills]
+        # Converse request/response handling
+        self.converse_lock = Lock()
+        self.converse_event = Event()
+        self.converse_result = False
+        self.touch()
+
+    def touch(self):
+        self.last_used = time.time()
 
 
 class IntentService(object):
@@ -132,7 +195,16 @@ class IntentService(object):
         self.context_max_frames = self.config.get('max_frames', 3)
         self.context_timeout = self.config.get('timeout', 2)
         self.context_greedy = self.config.get('greedy', False)
-        self.context_manager = ContextManager(self.context_timeout)
+        self.context_max_stored_frames = self.config.get('max_stored_frames',
+                                                         20)
+        # Session related initializations
+        self.max_sessions = self.config.get('max_sessions', 32)
+        self.session_timeout = self.config.get('session_timeout', 10) * 60
+        self.sessions = OrderedDict()  # session_id: IntentSession, LRU first
+        self.sessions_lock = Lock()
+        # State set outside of a session, never evicted
+        self.default_session = IntentSession(None, self.context_timeout,
+                                             self.context_max_stored_frames)
         self.emitter = emitter
         self.emitter.on('register_vocab', self.handle_register_vocab)
         self.emitter.on('register_intent', self.handle_register_intent)
@@ -149,13 +221,121 @@ class IntentService(object):
         self.emitter.on('mycroft.speech.recognition.unknown',
                         self.reset_converse)
         self.emitter.on('mycroft.skills.loaded', self.update_skill_name_dict)
+        self.emitter.on('mycroft.skills.registry', self.update_skill_names)
+        # Tracing
+        self.tracer = Tracer.get()
+        self._adapt_timing = local()
+        self.engine.on('tagged_entities', self._handle_tagged_entities)
+        self.emitter.on('mycroft.skills.trace', self.handle_get_traces)
 
         def add_active_skill_handler(message):
-            self.add_active_skill(message.data['skill_id'])
+            for session in self.get_sessions(message):
+                self.add_active_skill(message.data['skill_id'],
+                                      session.session_id)
         self.emitter.on('active_skill_request', add_active_skill_handler)
-        self.active_skills = []  # [skill_id , timestamp]
         self.converse_timeout = 5  # minutes to prune active_skills
 
+    @staticmethod
+    def get_ident(message):
+        """ Get the identifier of an utterance, creating one if missing.
+
+        Args:
+            message (Message): utterance message
+
+        Returns:
+            str: identifier used to link timing of the utterance handling
+        """
+        ident = ((message.context or {}).get('ident') or
+                 message.data.get('ident'))
+        if not ident:
+            utterances = message.data.get('utterances') or ['']
+            ident = str(time.time()) + str(hash(utterances[0]))
+        return ident
+
+    def _handle_tagged_entities(self, result):
+        """ Store time spent tagging the current utterance. """
+        self._adapt_timing.tagging = result.get('time', 0.0)
+
+    def handle_get_traces(self, message):
+        """ Send the stage timing of the latest utterances. """
+        self.emitter.emit(message.reply('mycroft.skills.trace.response',
+                                        {'traces': self.tracer.get_traces()}))
+
+    @staticmethod
+    def get_session_id(message):
+        """ Get the session id of a message.
+
+        The id is read from the message data (utterances from the speech
+        client) or the message context (messages replying to an utterance).
+
+        Args:
+            message (Message): message to check
+
+        Returns:
+            str: session id or None for messages without session
+        """
+        return (message.data.get('session') or
+                (message.context or {}).get('session'))
+
+    def get_session(self, session_id, create=True):
+        """ Get intent state for a session.
+
+        Least recently used sessions are evicted when there are more than
+        max_sessions sessions or when they've been idle for longer than
+        the session_timeout.
+
+        Args:
+            session_id (str): session to fetch, None for the default session
+            create (bool): create the session if it doesn't exist
+
+        Returns:
+            IntentSession: the session or None if it didn't exist and
+                           create is False
+        """
+        if session_id is None:
+            return self.default_session
+        with self.sessions_lock:
+            session = self.sessions.get(session_id)
+            if session:
+                self.sessions.move_to_end(session_id)
+            elif create:
+                session = IntentSession(session_id, self.context_timeout,
+                                        self.context_max_stored_frames,
+                                        self.default_session)
+                self.sessions[session_id] = session
+            else:
+                return None
+            session.touch()
+
+            oldest_allowed = time.time() - self.session_timeout
+            while len(self.sessions) > 1:
+                lru_id, lru = next(iter(self.sessions.items()))
+                if (len(self.sessions) <= self.max_sessions and
+                        lru.last_used > oldest_allowed):
+                    break
+                LOG.debug('Removing idle session {}'.format(lru_id))
+                del self.sessions[lru_id]
+            return session
+
+    def get_sessions(self, message):
+        """ Get the sessions a message applies to.
+
+        Messages without a session id, like context set from a skill's
+        initialize() or a timer, apply to every session. They're kept in
+        the default session too, which new sessions start from.
+
+        Args:
+            message (Message): message to check
+
+        Returns:
+            list: IntentSession objects
+        """
+        session_id = self.get_session_id(message)
+        if session_id is not None:
+            return [self.get_session(session_id)]
+        with self.sessions_lock:
+            return [self.default_session] + list(self.sessions.values())
+
     def update_skill_name_dict(self, message):
         """
             Messagebus handler, updates dictionary of if to skill name
@@ -163,6 +343,19 @@ class IntentService(object):
         """
         self.skill_names[message.data['id']] = message.data['name']
 
+    def update_skill_names(self, message):
+        """
+            Messagebus handler, updates the skill names from the skill
+            registry of the SkillManager.
+        """
+        for skill in message.data.get('skills', []):
+            if skill.get('name'):
+                self.skill_names[skill['id']] = skill['name']
+
+    def request_skill_names(self):
+        """ Ask the SkillManager for the names of the known skills. """
+        self.emitter.emit(Message('mycroft.skills.registry.request'))
+
     def get_skill_name(self, skill_id):
         """ Get skill name from skill ID.
 
@@ -177,43 +370,45 @@ class IntentService(object):
     def reset_converse(self, message):
         """Let skills know there was a problem with speech recognition"""
         lang = message.data.get('lang', "en-us")
-        for skill in self.active_skills:
-            self.do_converse(None, skill[0], lang)
-
-    def do_converse(self, utterances, skill_id, lang):
-        self.emitter.emit(Message("skill.converse.request", {
-            "skill_id": skill_id, "utterances": utterances, "lang": lang}))
-        self.waiting = True
-        self.result = False
-        start_time = time.time()
-        t = 0
-        while self.waiting and t < 5:
-            t = time.time() - start_time
-            time.sleep(0.1)
-        self.waiting = False
-        return self.result
+        for session in self.get_sessions(message):
+            for skill in list(session.active_skills):
+                self.do_converse(None, skill[0], lang, session)
+
+    def do_converse(self, utterances, skill_id, lang, session, ident=None):
+        with session.converse_lock, \
+                self.tracer.span(ident, 'converse', {'skill_id': skill_id}):
+            session.converse_result = False
+            session.converse_event.clear()
+            self.emitter.emit(Message("skill.converse.request", {
+                "skill_id": skill_id, "utterances": utterances, "lang": lang},
+                context={'session': session.session_id, 'ident': ident}))
+            session.converse_event.wait(5)
+            return session.converse_result
 
     def handle_converse_response(self, message):
         # id = message.data["skill_id"]
         # no need to crosscheck id because waiting before new request is made
         # no other skill will make this request is safe assumption
-        result = message.data["result"]
-        self.result = result
-        self.waiting = False
-
-    def remove_active_skill(self, skill_id):
-        for skill in self.active_skills:
-            if skill[0] == skill_id:
-                self.active_skills.remove(skill)
-
-    def add_active_skill(self, skill_id):
+        session = self.get_session(self.get_session_id(message),
+                                   create=False)
+        if session:
+            session.converse_result = message.data["result"]
+            session.converse_event.set()
+
+    def remove_active_skill(self, skill_id, session_id=None):
+        session = self.get_session(session_id)
+        session.active_skills = [skill for skill in session.active_skills
+                                 if skill[0] != skill_id]
+
+    def add_active_skill(self, skill_id, session_id=None):
+        session = self.get_session(session_id)
         # search the list for an existing entry that already contains it
         # and remove that reference
-        self.remove_active_skill(skill_id)
+        self.remove_active_skill(skill_id, session_id)
         # add skill with timestamp to start of skill_list
-        self.active_skills.insert(0, [skill_id, time.time()])
+        session.active_skills.insert(0, [skill_id, time.time()])
 
-    def update_context(self, intent):
+    def update_context(self, intent, session):
         """ Updates context with keyword from the intent.
 
         NOTE: This method currently won't handle one_of intent keywords
@@ -222,15 +417,16 @@ class IntentService(object):
 
         Args:
             intent: Intent to scan for keywords
+            session (IntentSession): session to update
         """
         for tag in intent['__tags__']:
             if 'entities' not in tag:
                 continue
             context_entity = tag['entities'][0]
             if self.context_greedy:
-                self.context_manager.inject_context(context_entity)
+                session.context_manager.inject_context(context_entity)
             elif context_entity['data'][0][1] in self.context_keywords:
-                self.context_manager.inject_context(context_entity)
+                session.context_manager.inject_context(context_entity)
 
     def send_metrics(self, intent, context, stopwatch):
         """
@@ -239,7 +435,7 @@ class IntentService(object):
         NOTE: This only applies to those with Opt In.
         """
         LOG.debug('Sending metric if opt_in is enabled')
-        ident = context['ident'] if context else None
+        ident = context.get('ident') if context else None
         if intent:
             # Recreate skill name from skill id
             parts = intent.get('intent_type', '').split(':')
@@ -272,19 +468,26 @@ class IntentService(object):
             # Get language of the utterance
             lang = message.data.get('lang', "en-us")
             utterances = message.data.get('utterances', '')
+            session = self.get_session(self.get_session_id(message))
+            ident = self.get_ident(message)
+            # Let replies carry the session and the utterance identifier
+            message.context = message.context or {}
+            message.context['session'] = session.session_id
+            message.context['ident'] = ident
+            self.tracer.start_trace(ident)
 
             stopwatch = Stopwatch()
             with stopwatch:
                 # Give active skills an opportunity to handle the utterance
-                converse = self._converse(utterances, lang)
+                converse = self._converse(utterances, lang, session, ident)
 
                 if not converse:
                     # No conversation, use intent system to handle utterance
-                    intent = self._adapt_intent_match(utterances, lang)
+                    intent = self._adapt_intent_match(utterances, lang,
+                                                      session, ident)
 
             if converse:
                 # Report that converse handled the intent and return
-                ident = message.context['ident'] if message.context else None
                 report_timing(ident, 'intent_service', stopwatch,
                               {'intent_type': 'converse'})
                 return
@@ -302,49 +505,59 @@ class IntentService(object):
         except Exception as e:
             LOG.exception(e)
 
-    def _converse(self, utterances, lang):
+    def _converse(self, utterances, lang, session, ident=None):
         """ Give active skills a chance at the utterance
 
         Args:
             utterances (list):  list of utterances
             lang (string):      4 letter ISO language code
+            session (IntentSession): session the utterance belongs to
+            ident (str):        identifier of the utterance, for tracing
 
         Returns:
             bool: True if converse handled it, False if  no skill processes it
         """
 
         # check for conversation time-out
-        self.active_skills = [skill for skill in self.active_skills
-                              if time.time() - skill[
-                                  1] <= self.converse_timeout * 60]
+        session.active_skills = [skill for skill in session.active_skills
+                                 if time.time() - skill[
+                                     1] <= self.converse_timeout * 60]
 
         # check if any skill wants to handle utterance
-        for skill in self.active_skills:
-            if self.do_converse(utterances, skill[0], lang):
+        for skill in list(session.active_skills):
+            if self.do_converse(utterances, skill[0], lang, session, ident):
                 # update timestamp, or there will be a timeout where
                 # intent stops conversing whether its being used or not
-                self.add_active_skill(skill[0])
+                self.add_active_skill(skill[0], session.session_id)
                 return True
         return False
 
-    def _adapt_intent_match(self, utterances, lang):
+    def _adapt_intent_match(self, utterances, lang, session, ident=None):
         """ Run the Adapt engine to search for an matching intent
 
         Args:
             utterances (list):  list of utterances
             lang (string):      4 letter ISO language code
+            session (IntentSession): session the utterance belongs to
+            ident (str):        identifier of the utterance, for tracing
 
         Returns:
             Intent structure, or None if no match was found.
         """
+        with self.tracer.span(ident, 'normalize'):
+            # normalize() changes "it's a boy" to "it is boy", etc.
+            normalized = [normalize(utterance, lang)
+                          for utterance in utterances]
+
         best_intent = None
-        for utterance in utterances:
+        for utterance, normalized_utterance in zip(utterances, normalized):
+            self._adapt_timing.tagging = 0.0
+            start = time.time()
             try:
-                # normalize() changes "it's a boy" to "it is boy", etc.
                 best_intent = next(self.engine.determine_intent(
-                    normalize(utterance, lang), 100,
+                    normalized_utterance, 100,
                     include_tags=True,
-                    context_manager=self.context_manager))
+                    context_manager=session.context_manager))
                 # TODO - Should Adapt handle this?
                 best_intent['utterance'] = utterance
             except StopIteration:
@@ -353,12 +566,21 @@ class IntentService(object):
             except Exception as e:
                 LOG.exception(e)
                 continue
+            finally:
+                # Tagging time is reported by Adapt, the rest is scoring
+                tagging = self._adapt_timing.tagging
+                duration = time.time() - start
+                self.tracer.add_span(ident, 'adapt.tagging', start, tagging,
+                                     {'utterance': utterance})
+                self.tracer.add_span(ident, 'adapt.scoring', start + tagging,
+                                     duration - tagging,
+                                     {'utterance': utterance})
 
         if best_intent and best_intent.get('confidence', 0.0) > 0.0:
-            self.update_context(best_intent)
+            self.update_context(best_intent, session)
             # update active skills
             skill_id = best_intent['intent_type'].split(":")[0]
-            self.add_active_skill(skill_id)
+            self.add_active_skill(skill_id, session.session_id)
             return best_intent
 
     def handle_register_vocab(self, message):
@@ -406,7 +628,8 @@ class IntentService(object):
         entity['data'] = [(word, context)]
         entity['match'] = word
         entity['key'] = word
-        self.context_manager.inject_context(entity)
+        for session in self.get_sessions(message):
+            session.context_manager.inject_context(entity)
 
     def handle_remove_context(self, message):
         """ Remove specific context
@@ -416,8 +639,10 @@ class IntentService(object):
         """
         context = message.data.get('context')
         if context:
-            self.context_manager.remove_context(context)
+            for session in self.get_sessions(message):
+                session.context_manager.remove_context(context)
 
     def handle_clear_context(self, message):
         """ Clears all keywords from context """
-        self.context_manager.clear_context()
+        for session in self.get_sessions(message):
+            session.context_manager.clear_context()
@@ -0,0 +1,210 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Skill Isolation Benchmark
+Runs CPU bound skill handlers concurrently, once with the skills loaded
+in this process (like the skills service does) and once with every skill
+in its own process, supervised like SkillManager does with isolation
+enabled.
+
+While the handlers run, this process measures how quickly it receives
+messages from the bus, showing how much the handlers stall the intent
+service, which shares the process with the skills.
+
+Requires a running messagebus service.
+"""
+import argparse
+import time
+from os import makedirs
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Event, Lock
+
+from mycroft.messagebus.client.ws import WebsocketClient
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import create_skill_descriptor, load_skill
+from mycroft.skills.skill_process import SkillProcess
+from mycroft.util import create_daemon
+
+SKILL_CODE = '''
+from adapt.intent import IntentBuilder
+from mycroft.skills.core import MycroftSkill
+
+
+class CpuSkill(MycroftSkill):
+    def initialize(self):
+        self.register_intent(IntentBuilder('CpuIntent').require('Cpu'),
+                             self.handle_cpu)
+
+    def handle_cpu(self, message):
+        total = 0
+        for i in range(message.data.get('work', 1000000)):
+            total += i * i
+
+    def stop(self):
+        pass
+
+
+def create_skill():
+    return CpuSkill()
+'''
+
+
+def create_skills(directory, count):
+    """ Create skills with a CPU bound intent handler. """
+    paths = []
+    for i in range(count):
+        path = join(directory, 'cpu-skill-{}'.format(i))
+        makedirs(join(path, 'vocab', 'en-us'))
+        with open(join(path, '__init__.py'), 'w') as f:
+            f.write(SKILL_CODE)
+        with open(join(path, 'vocab', 'en-us', 'Cpu.voc'), 'w') as f:
+            f.write('cpu\n')
+        paths.append(path)
+    return paths
+
+
+class Benchmark(object):
+    def __init__(self, ws, paths, work, rounds):
+        self.ws = ws
+        self.paths = paths
+        self.work = work
+        self.rounds = rounds
+        self.lock = Lock()
+        self.completed = 0
+        self.all_completed = Event()
+        self.loaded = set()
+        self.all_loaded = Event()
+        self.latencies = []
+        ws.on('mycroft.skill.handler.complete', self.handle_complete)
+        ws.on('mycroft.skills.loaded', self.handle_loaded)
+        ws.on('isolation_benchmark.ping', self.handle_ping)
+
+    @property
+    def skill_ids(self):
+        return [p.split('/')[-1] for p in self.paths]
+
+    def handle_complete(self, message):
+        with self.lock:
+            self.completed += 1
+            if self.completed >= len(self.paths):
+                self.all_completed.set()
+
+    def handle_loaded(self, message):
+        with self.lock:
+            self.loaded.add(message.data.get('id'))
+            if self.loaded >= set(self.skill_ids):
+                self.all_loaded.set()
+
+    def handle_ping(self, message):
+        self.latencies.append(time.time() - message.data['time'])
+
+    def run_round(self):
+        """ Trigger all handlers at once and wait for them to complete. """
+        self.completed = 0
+        self.all_completed.clear()
+        start = time.time()
+        for skill_id in self.skill_ids:
+            self.ws.emit(Message(skill_id + ':CpuIntent',
+                                 {'work': self.work}))
+        while not self.all_completed.wait(0.05):
+            self.ws.emit(Message('isolation_benchmark.ping',
+                                 {'time': time.time()}))
+        return time.time() - start
+
+    def run(self):
+        self.latencies = []
+        times = [self.run_round() for _ in range(self.rounds)]
+        return {
+            'time': sum(times) / len(times),
+            'max_latency': max(self.latencies or [0]),
+            'avg_latency': (sum(self.latencies) /
+                            max(len(self.latencies), 1))
+        }
+
+
+def run_in_process(benchmark):
+    skills = [load_skill(create_skill_descriptor(path), benchmark.ws,
+                         skill_id)
+              for path, skill_id in zip(benchmark.paths, benchmark.skill_ids)]
+    try:
+        return benchmark.run()
+    finally:
+        for skill in skills:
+            skill._shutdown()
+
+
+def run_in_processes(benchmark, timeout):
+    processes = [SkillProcess(path, skill_id)
+                 for path, skill_id in zip(benchmark.paths,
+                                           benchmark.skill_ids)]
+    for process in processes:
+        process.start()
+    try:
+        if not benchmark.all_loaded.wait(timeout):
+            raise RuntimeError('Skill processes did not start within {} '
+                               'seconds'.format(timeout))
+        return benchmark.run()
+    finally:
+        for process in processes:
+            process.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-s', '--skills', dest='skills', type=int, default=4,
+        help="Number of skills handling an intent at once (Default: 4)")
+    parser.add_argument(
+        '-w', '--work', dest='work', type=int, default=2000000,
+        help="Loop iterations per handler (Default: 2000000)")
+    parser.add_argument(
+        '-r', '--rounds', dest='rounds', type=int, default=3,
+        help="Number of rounds to average (Default: 3)")
+    parser.add_argument(
+        '--timeout', dest='timeout', type=float, default=60,
+        help="Seconds to wait for the skill processes to start")
+    args = parser.parse_args()
+
+    ws = WebsocketClient()
+    create_daemon(ws.run_forever)
+    if not ws.connected_event.wait(10):
+        print('Could not connect to the messagebus')
+        return
+
+    tmp_dir = mkdtemp()
+    try:
+        paths = create_skills(tmp_dir, args.skills)
+        benchmark = Benchmark(ws, paths, args.work, args.rounds)
+        results = [('one process', run_in_process(benchmark)),
+                   ('skill processes', run_in_processes(benchmark,
+                                                        args.timeout))]
+    finally:
+        rmtree(tmp_dir)
+        ws.close()
+
+    print('{} skills running {} iterations at once'.format(
+        args.skills, args.work))
+    print('{:16} {:>10} {:>14} {:>14}'.format(
+        'Mode', 'Time', 'Avg latency', 'Max latency'))
+    for name, result in results:
+        print('{:16} {:>9.2f}s {:>12.1f}ms {:>12.1f}ms'.format(
+            name, result['time'], result['avg_latency'] * 1000,
+            result['max_latency'] * 1000))
+
+
+if __name__ == "__main__":
+    main()
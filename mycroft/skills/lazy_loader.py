@@ -0,0 +1,173 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Support for loading skills on demand.
+
+When a skill is loaded the first time its registrations (vocabulary,
+intents, ...) and the events it handles are stored in a manifest. On
+later starts the registrations are replayed from the manifest and the
+skill itself is only loaded when one of its events fires.
+"""
+import json
+import os
+from os.path import dirname, exists, expanduser
+from threading import Lock
+
+from mycroft.util.log import LOG
+
+# Messages a skill sends to register itself with the intent services
+REGISTRATION_MESSAGES = {
+    'register_vocab',
+    'register_intent',
+    'padatious:register_intent',
+    'padatious:register_entity'
+}
+
+# Events every skill listens to, these don't trigger loading of a skill
+COMMON_EVENTS = {
+    'mycroft.stop',
+    'mycroft.skill.enable_intent',
+    'mycroft.skill.disable_intent',
+    'mycroft.skills.settings.update'
+}
+
+
+class LazySkillEmitter(object):
+    """
+        Emitter handed to a skill, forwarding to the messagebus client.
+
+        Handlers for the events in `events` are kept here instead of on the
+        messagebus client and are called through dispatch(), letting the
+        skill manager load the skill before the handlers are called.
+
+        While `recording` is a list, registration messages sent by the
+        skill are appended to it. Messages with a type in `suppress` are
+        dropped.
+
+        Args:
+            ws: messagebus client
+            events (iterable): events to handle locally
+    """
+    def __init__(self, ws, events=None):
+        self.ws = ws
+        self.events = set(events or [])
+        self.handlers = {}
+        self.recording = None
+        self.suppress = set()
+        self.lock = Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self.ws, attr)
+
+    def on(self, event_name, func):
+        if event_name in self.events:
+            with self.lock:
+                self.handlers.setdefault(event_name, []).append(func)
+        else:
+            self.ws.on(event_name, func)
+
+    def once(self, event_name, func):
+        if event_name in self.events:
+            def wrapper(message):
+                self.remove(event_name, wrapper)
+                func(message)
+            self.on(event_name, wrapper)
+        else:
+            self.ws.once(event_name, func)
+
+    def remove(self, event_name, func):
+        if event_name in self.events:
+            with self.lock:
+                if func in self.handlers.get(event_name, []):
+                    self.handlers[event_name].remove(func)
+        else:
+            self.ws.remove(event_name, func)
+
+    def remove_all_listeners(self, event_name):
+        if event_name in self.events:
+            with self.lock:
+                self.handlers.pop(event_name, None)
+        else:
+            self.ws.remove_all_listeners(event_name)
+
+    def emit(self, message):
+        if (self.recording is not None and
+                message.type in REGISTRATION_MESSAGES |
+                {'mycroft.scheduler.schedule_event'}):
+            self.recording.append({'type': message.type,
+                                   'data': message.data})
+        if message.type not in self.suppress:
+            self.ws.emit(message)
+
+    def dispatch(self, message):
+        """ Call the handlers registered for the message type. """
+        with self.lock:
+            handlers = list(self.handlers.get(message.type, []))
+        for handler in handlers:
+            handler(message)
+
+
+def create_manifest(skill, recording, modified):
+    """
+        Create the manifest of a loaded skill.
+
+        Skills scheduling events or acting as fallbacks must stay loaded,
+        the manifest marks them as not lazy.
+
+        Args:
+            skill (MycroftSkill): the loaded skill
+            recording (list): registration messages sent while loading
+            modified (float): modification time of the skill
+
+        Returns:
+            dict: the manifest
+    """
+    from mycroft.skills.core import FallbackSkill
+    lazy = not (isinstance(skill, FallbackSkill) or
+                any(r['type'] == 'mycroft.scheduler.schedule_event'
+                    for r in recording))
+    events = set(name for name, _ in skill.events
+                 if name not in COMMON_EVENTS)
+    return {
+        'name': skill.name,
+        'modified': modified,
+        'lazy': lazy,
+        'registrations': [r for r in recording
+                          if r['type'] in REGISTRATION_MESSAGES],
+        'events': sorted(events)
+    }
+
+
+def load_manifests(path):
+    """ Load the stored skill manifests, keyed by skill path. """
+    path = expanduser(path)
+    if exists(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            LOG.exception('Could not read skill manifests ' + path)
+    return {}
+
+
+def save_manifests(path, manifests):
+    """ Store the skill manifests, replacing the file atomically. """
+    path = expanduser(path)
+    if not exists(dirname(path)):
+        os.makedirs(dirname(path))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifests, f)
+    os.rename(tmp_path, path)
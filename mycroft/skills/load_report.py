@@ -0,0 +1,157 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Profiling of skill loading.
+
+load_skill() records the time spent in each phase of loading a skill in
+a SkillLoadProfile. The SkillManager combines the profiles into a report
+showing which skills slow down the boot.
+"""
+import json
+import os
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from os.path import dirname, exists
+
+import monotonic
+
+from mycroft.util.log import LOG
+
+
+class SkillLoadProfile(object):
+    """
+        Timing and registrations of loading a skill.
+
+        Args:
+            skill_id (str): id of the skill
+            path (str): skill directory
+    """
+    def __init__(self, skill_id, path):
+        self.skill_id = skill_id
+        self.path = path
+        self.loaded = False
+        self.phases = OrderedDict()
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name):
+        """ Measure the time spent in the with block as phase name. """
+        start = monotonic.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] = (self.phases.get(name, 0.0) +
+                                 monotonic.monotonic() - start)
+
+    @property
+    def total(self):
+        return sum(t for name, t in self.phases.items() if name != 'settings')
+
+    def as_dict(self):
+        data = {
+            'id': self.skill_id,
+            'path': self.path,
+            'loaded': self.loaded,
+            'total': self.total
+        }
+        data.update(self.phases)
+        data.update(self.counts)
+        return data
+
+
+def memory_by_skill(paths):
+    """
+        Get the memory allocated by the code of each skill.
+
+        Requires tracemalloc to be tracing, allocations made while it
+        wasn't are not counted.
+
+        Args:
+            paths (list): skill directories
+
+        Returns:
+            dict: bytes allocated per skill directory
+    """
+    if not tracemalloc.is_tracing():
+        return {}
+    memory = {path: 0 for path in paths}
+    prefixes = [(path.rstrip('/') + os.sep, path) for path in paths]
+    snapshot = tracemalloc.take_snapshot()
+    for stat in snapshot.statistics('filename'):
+        filename = stat.traceback[0].filename
+        for prefix, path in prefixes:
+            if filename.startswith(prefix):
+                memory[path] += stat.size
+                break
+    return memory
+
+
+def create_load_report(profiles, load_time, memory=None):
+    """
+        Create a report of the loaded skills, slowest first.
+
+        Args:
+            profiles (list): SkillLoadProfile for each skill
+            load_time (float): wall clock time spent loading skills
+            memory (dict): bytes allocated per skill path
+
+        Returns:
+            dict: the report
+    """
+    memory = memory or {}
+    skills = []
+    for profile in profiles:
+        data = profile.as_dict()
+        if profile.path in memory:
+            data['memory'] = memory[profile.path]
+        skills.append(data)
+    skills.sort(key=lambda s: s['total'], reverse=True)
+    return {
+        'load_time': load_time,
+        'skill_time': sum(s['total'] for s in skills),
+        'skills': skills
+    }
+
+
+def save_load_report(path, report):
+    """ Write the report as JSON. """
+    try:
+        if not exists(dirname(path)):
+            os.makedirs(dirname(path))
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    except OSError:
+        LOG.exception('Could not write skill load report ' + path)
+
+
+def format_load_report(report, count=10):
+    """ Format the slowest skills of a report as lines of text. """
+    lines = ['Skills loaded in {:.2f} s, {:.2f} s spent in skills'.format(
+                 report['load_time'], report['skill_time']),
+             '{:30} {:>8} {:>8} {:>8} {:>8} {:>6} {:>8}'.format(
+                 'Skill', 'total', 'import', 'init', 'settings',
+                 'intent', 'memory')]
+    for skill in report['skills'][:count]:
+        memory = skill.get('memory')
+        lines.append('{:30} {:>8} {:>8} {:>8} {:>8} {:>6} {:>8}'.format(
+            skill['id'][:30],
+            '{:.0f}ms'.format(skill['total'] * 1000),
+            '{:.0f}ms'.format(skill.get('import', 0) * 1000),
+            '{:.0f}ms'.format(skill.get('initialize', 0) * 1000),
+            '{:.0f}ms'.format(skill.get('settings', 0) * 1000),
+            skill.get('intents', 0),
+            '{:.0f}kB'.format(memory / 1024) if memory is not None else '-'))
+    return lines
@@ -16,12 +16,14 @@ import gc
 import os
 import sys
 import time
+import tracemalloc
 from glob import glob
 from itertools import chain
 
 import monotonic
 from os.path import exists, join, basename, dirname, expanduser, isfile
-from threading import Timer, Thread, Event
+from queue import Queue, Empty
+from threading import Thread, Event, Lock
 
 import mycroft.lock
 from msm import MycroftSkillsManager, SkillRepo, MsmException
@@ -32,15 +34,28 @@ from mycroft.configuration import Configuration
 from mycroft.messagebus.client.ws import WebsocketClient
 from mycroft.messagebus.message import Message
 from mycroft.skills.core import load_skill, create_skill_descriptor, \
-    MainModule, FallbackSkill
+    MainModule, FallbackSkill, unload_skill_module
 from mycroft.skills.event_scheduler import EventScheduler
 from mycroft.skills.intent_service import IntentService
+from mycroft.skills.load_report import (
+    SkillLoadProfile, create_load_report, memory_by_skill, save_load_report
+)
+from mycroft.skills.lazy_loader import (
+    LazySkillEmitter, REGISTRATION_MESSAGES, create_manifest, load_manifests,
+    save_manifests
+)
 from mycroft.skills.padatious_service import PadatiousService
+from mycroft.skills.skill_process import SkillProcess
+from mycroft.skills.skill_registry import (
+    SkillRegistry, FAILED, LAZY, LOADED, PROCESS, UNLOADED
+)
 from mycroft.util import (
     connected, wait_while_speaking, reset_sigint_handler,
     create_echo_function, create_daemon, wait_for_exit_signal
 )
+from mycroft.util.file_watcher import create_file_watcher
 from mycroft.util.log import LOG
+from mycroft.util.timer_service import TimerService
 
 ws = None
 event_scheduler = None
@@ -100,71 +115,100 @@ def _starting_up():
 def check_connection():
     """
         Check for network connection. If not paired trigger pairing.
-        Runs as a Timer every second until connection is detected.
+        Runs every second on the TimerService until connection is detected.
     """
     if connected():
-        enclosure = EnclosureAPI(ws)
+        # Setting up takes several seconds, keep it off the TimerService
+        thread = Thread(target=_handle_connected)
+        thread.daemon = True
+        thread.start()
+    else:
+        TimerService.get().call_later(1, check_connection)
+
+
+def _handle_connected():
+    """ Sync the clock and check pairing once the device is connected. """
+    enclosure = EnclosureAPI(ws)
+
+    if is_paired():
+        # Skip the sync message when unpaired because the prompt to go to
+        # home.mycrof.ai will be displayed by the pairing skill
+        enclosure.mouth_text(dialog.get("message_synching.clock"))
+
+    # Force a sync of the local clock with the internet
+    config = Configuration.get()
+    platform = config['enclosure'].get("platform", "unknown")
+    if platform in ['mycroft_mark_1', 'picroft']:
+        ws.emit(Message("system.ntp.sync"))
+        time.sleep(15)  # TODO: Generate/listen for a message response...
+
+    # Check if the time skewed significantly.  If so, reboot
+    skew = abs((monotonic.monotonic() - start_ticks) -
+               (time.time() - start_clock))
+    if skew > 60 * 60:
+        # Time moved by over an hour in the NTP sync. Force a reboot to
+        # prevent weird things from occcurring due to the 'time warp'.
+        #
+        data = {'utterance': dialog.get("time.changed.reboot")}
+        ws.emit(Message("speak", data))
+        wait_while_speaking()
+
+        # provide visual indicators of the reboot
+        enclosure.mouth_text(dialog.get("message_rebooting"))
+        enclosure.eyes_color(70, 65, 69)  # soft gray
+        enclosure.eyes_spin()
+
+        # give the system time to finish processing enclosure messages
+        time.sleep(1.0)
+
+        # reboot
+        ws.emit(Message("system.reboot"))
+        return
+    else:
+        ws.emit(Message("enclosure.mouth.reset"))
+        time.sleep(0.5)
+
+    ws.emit(Message('mycroft.internet.connected'))
+    # check for pairing, if not automatically start pairing
+    try:
+        if not is_paired(ignore_errors=False):
+            payload = {
+                'utterances': ["pair my device"],
+                'lang': "en-us"
+            }
+            ws.emit(Message("recognizer_loop:utterance", payload))
+        else:
+            from mycroft.api import DeviceApi
+            api = DeviceApi()
+            api.update_version()
+    except BackendDown:
+        data = {'utterance': dialog.get("backend.down")}
+        ws.emit(Message("speak", data))
+        ws.emit(Message("backend.down"))
 
-        if is_paired():
-            # Skip the sync message when unpaired because the prompt to go to
-            # home.mycrof.ai will be displayed by the pairing skill
-            enclosure.mouth_text(dialog.get("message_synching.clock"))
 
-        # Force a sync of the local clock with the internet
-        config = Configuration.get()
-        platform = config['enclosure'].get("platform", "unknown")
-        if platform in ['mycroft_mark_1', 'picroft']:
-            ws.emit(Message("system.ntp.sync"))
-            time.sleep(15)  # TODO: Generate/listen for a message response...
-
-        # Check if the time skewed significantly.  If so, reboot
-        skew = abs((monotonic.monotonic() - start_ticks) -
-                   (time.time() - start_clock))
-        if skew > 60 * 60:
-            # Time moved by over an hour in the NTP sync. Force a reboot to
-            # prevent weird things from occcurring due to the 'time warp'.
-            #
-            data = {'utterance': dialog.get("time.changed.reboot")}
-            ws.emit(Message("speak", data))
-            wait_while_speaking()
-
-            # provide visual indicators of the reboot
-            enclosure.mouth_text(dialog.get("message_rebooting"))
-            enclosure.eyes_color(70, 65, 69)  # soft gray
-            enclosure.eyes_spin()
-
-            # give the system time to finish processing enclosure messages
-            time.sleep(1.0)
-
-            # reboot
-            ws.emit(Message("system.reboot"))
-            return
-        else:
-            ws.emit(Message("enclosure.mouth.reset"))
-            time.sleep(0.5)
+def _is_fallback_skill(path):
+    """
+        Check if a skill defines a FallbackSkill, without importing it.
 
-        ws.emit(Message('mycroft.internet.connected'))
-        # check for pairing, if not automatically start pairing
-        try:
-            if not is_paired(ignore_errors=False):
-                payload = {
-                    'utterances': ["pair my device"],
-                    'lang': "en-us"
-                }
-                ws.emit(Message("recognizer_loop:utterance", payload))
-            else:
-                from mycroft.api import DeviceApi
-                api = DeviceApi()
-                api.update_version()
-        except BackendDown:
-            data = {'utterance': dialog.get("backend.down")}
-            ws.emit(Message("speak", data))
-            ws.emit(Message("backend.down"))
+        Args:
+            path:   skill directory to check
 
-    else:
-        thread = Timer(1, check_connection)
-        thread.daemon = True
-        thread.start()
+        Returns:
+            bool: True if a python file of the skill uses FallbackSkill
+    """
+    for root_dir, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for f in files:
+            if not f.endswith('.py'):
+                continue
+            try:
+                with open(join(root_dir, f)) as source:
+                    if 'FallbackSkill' in source.read():
+                        return True
+            except (IOError, OSError, UnicodeDecodeError):
+                pass
+    return False
 
 
 def _get_last_modified_date(path):
@@ -197,7 +241,8 @@ class SkillManager(Thread):
         self._stop_event = Event()
         self._connected_event = Event()
 
-        self.loaded_skills = {}
+        self.registry = SkillRegistry()
+        self.loaded_skills = self.registry.skills  # By path
         self.ws = ws
         self.enclosure = EnclosureAPI(ws)
 
@@ -221,6 +266,24 @@ class SkillManager(Thread):
         # Update upon request
         ws.on('skillmanager.update', self.schedule_now)
         ws.on('skillmanager.list', self.send_skill_list)
+        ws.on('mycroft.skills.load_report.request', self.send_load_report)
+        ws.on('mycroft.skills.registry.request', self.send_registry)
+        # Skill processes report their own loading
+        ws.on('mycroft.skills.loaded', self.handle_process_loaded)
+        ws.on('mycroft.skills.loading_failure', self.handle_process_loaded)
+        self.load_report = None
+
+        # Manifests of the skills for loading them on demand
+        self.lazy_config = Configuration.get()['skills'].get('lazy_loading',
+                                                             {})
+        self.manifests = {}
+        self.manifest_lock = Lock()
+        if self.lazy_config.get('enabled'):
+            self.manifests = load_manifests(self.lazy_config['manifest'])
+
+        # Skills run in separate processes
+        self.isolation_config = Configuration.get()['skills'].get(
+            'isolation', {})
 
         self.msm = self.create_msm()
 
@@ -315,11 +378,9 @@ class SkillManager(Thread):
             Returns True if the skill was loaded/reloaded
         """
         skill_path = skill_path.rstrip('/')
-        skill = self.loaded_skills.setdefault(skill_path, {})
-        skill.update({
-            "id": basename(skill_path),
-            "path": skill_path
-        })
+        if not os.path.isdir(skill_path):
+            return False  # Removed or not a directory
+        skill = self.registry.add(skill_path)
 
         # check if folder is a skill (must have __init__.py)
         if not MainModule + ".py" in os.listdir(skill_path):
@@ -333,6 +394,9 @@ class SkillManager(Thread):
         if skill.get("loaded") and modified <= last_mod:
             return False  # Nothing to do!
 
+        if self._is_isolated(skill["id"], skill_path):
+            return self._start_process(skill, modified)
+
         # check if skill was modified
         elif skill.get("instance") and modified > last_mod:
             # check if skill has been blocked from reloading
@@ -357,17 +421,39 @@ class SkillManager(Thread):
                            "won't be cleaned from memory.")
                     LOG.warning(msg.format(skill['instance'].name, refs))
             del skill["instance"]
+            skill["state"] = UNLOADED
+            unload_skill_module(skill["id"].replace('.', '_'))
             self.ws.emit(Message("mycroft.skills.shutdown",
                                  {"path": skill_path,
                                   "id": skill["id"]}))
+        elif skill.get("emitter") and modified > last_mod:
+            # Registered from its manifest but never used, remove intents
+            self.ws.emit(Message("detach_skill",
+                                 {"skill_id": str(skill["id"]) + ":"}))
+        self._remove_dispatchers(skill)
 
         skill["loaded"] = True
+        skill["last_modified"] = modified
+        if self._register_lazy(skill):
+            return True
+
         desc = create_skill_descriptor(skill_path)
+        emitter = self.ws
+        if self.lazy_config.get('enabled'):
+            # Record the registrations to create the manifest
+            emitter = LazySkillEmitter(self.ws)
+            emitter.recording = []
+        skill["profile"] = SkillLoadProfile(skill["id"], skill_path)
         skill["instance"] = load_skill(desc,
-                                       self.ws, skill["id"],
-                                       BLACKLISTED_SKILLS)
-        skill["last_modified"] = modified
+                                       emitter, skill["id"],
+                                       BLACKLISTED_SKILLS, skill["profile"])
         if skill['instance'] is not None:
+            skill['state'] = LOADED
+            self.registry.set_name(skill, skill['instance'].name)
+            if emitter is not self.ws:
+                self._store_manifest(skill_path, create_manifest(
+                    skill['instance'], emitter.recording, modified))
+                emitter.recording = None
             self.ws.emit(Message('mycroft.skills.loaded',
                                  {'path': skill_path,
                                   'id': skill['id'],
@@ -375,11 +461,255 @@ class SkillManager(Thread):
                                   'modified': modified}))
             return True
         else:
+            skill['state'] = FAILED
             self.ws.emit(Message('mycroft.skills.loading_failure',
                                  {'path': skill_path,
                                   'id': skill['id']}))
         return False
 
+    def _is_isolated(self, skill_id, skill_path):
+        """ Check if the skill should run in a separate process.
+
+            Fallback skills stay in this process, the fallback chain run on
+            intent_failure only knows the handlers registered here.
+        """
+        skills = self.isolation_config.get('skills', [])
+        if not (self.isolation_config.get('enabled', False) and
+                (skill_id in skills or '*' in skills) and
+                skill_id not in PRIORITY_SKILLS and
+                skill_id not in BLACKLISTED_SKILLS):
+            return False
+        if _is_fallback_skill(skill_path):
+            LOG.info('{} is a fallback skill, not isolating it'.format(
+                skill_id))
+            return False
+        return True
+
+    def _start_process(self, skill, modified):
+        """ Start the process of an isolated skill, restarting it if it
+            is running.
+
+            Returns True
+        """
+        process = skill.get("process")
+        if process:
+            LOG.debug("Restarting Skill process: " + skill["id"])
+            process.stop()
+        else:
+            limit = self.isolation_config.get('memory_limit', 0)
+            process = SkillProcess(skill["path"], skill["id"],
+                                   limit * 1024 * 1024 or None)
+            skill["process"] = process
+        skill["loaded"] = True
+        skill["last_modified"] = modified
+        skill["state"] = PROCESS
+        process.restarts = 0
+        process.start()
+        return True
+
+    def supervise_processes(self):
+        """
+            Restart skill processes which exited or exceed their memory
+            limit. Processes exiting repeatedly are restarted with an
+            increasing delay.
+        """
+        delay = self.isolation_config.get('restart_delay', 5)
+        now = monotonic.monotonic()
+        for skill in list(self.loaded_skills.values()):
+            process = skill.get('process')
+            if not process:
+                continue
+            if process.running:
+                if process.over_memory_limit():
+                    LOG.warning('{} uses {} bytes, restarting it'.format(
+                        skill['id'], process.memory_usage()))
+                    process.stop()
+                elif now - process.start_time > 10 * MINUTES:
+                    process.restarts = 0
+                    continue
+                else:
+                    continue
+            if process.restart_time is None:
+                LOG.error('Process of {} exited with code {}'.format(
+                    skill['id'], process.returncode))
+                skill['state'] = FAILED
+                # Remove the intents until the skill is back
+                self.ws.emit(Message("detach_skill",
+                                     {"skill_id": str(skill["id"]) + ":"}))
+                process.restart_time = now + min(
+                    delay * 2 ** process.restarts, 5 * MINUTES)
+            elif now >= process.restart_time:
+                process.restarts += 1
+                skill['state'] = PROCESS
+                process.start()
+
+    def _store_manifest(self, skill_path, manifest):
+        with self.manifest_lock:
+            self.manifests[skill_path] = manifest
+            try:
+                save_manifests(self.lazy_config['manifest'], self.manifests)
+            except OSError:
+                LOG.exception('Could not store skill manifests')
+
+    def _register_lazy(self, skill):
+        """
+            Register a skill from its manifest without loading it.
+
+            The skill is loaded by _activate_skill() when one of its events
+            is emitted.
+
+            Returns True if the skill was registered
+        """
+        manifest = self.manifests.get(skill['path'])
+        if (not self.lazy_config.get('enabled') or not manifest or
+                not manifest['lazy'] or
+                manifest['modified'] != skill['last_modified'] or
+                skill['id'] in PRIORITY_SKILLS or
+                skill['id'] in BLACKLISTED_SKILLS or
+                skill['id'] in self.lazy_config.get('always_loaded', [])):
+            return False
+
+        for registration in manifest['registrations']:
+            self.ws.emit(Message(registration['type'],
+                                 registration['data']))
+        skill['emitter'] = LazySkillEmitter(self.ws, manifest['events'])
+        skill['lock'] = Lock()
+        for name in manifest['events']:
+            def dispatch(message, skill=skill):
+                self._activate_skill(skill, message)
+            self.ws.on(name, dispatch)
+            skill['dispatchers'].append((name, dispatch))
+
+        skill['state'] = LAZY
+        self.registry.set_name(skill, manifest['name'])
+        LOG.info('Registered {} from manifest'.format(skill['id']))
+        self.ws.emit(Message('mycroft.skills.loaded',
+                             {'path': skill['path'],
+                              'id': skill['id'],
+                              'name': manifest['name'],
+                              'modified': skill['last_modified'],
+                              'lazy': True}))
+        return True
+
+    def _remove_dispatchers(self, skill):
+        """ Remove the handlers for loading the skill on demand. """
+        for name, dispatch in skill.get('dispatchers', []):
+            self.ws.remove(name, dispatch)
+        skill['dispatchers'] = []
+        skill.pop('emitter', None)
+
+    def _activate_skill(self, skill, message):
+        """ Load a skill registered from its manifest and handle message. """
+        with skill['lock']:
+            if not skill.get('instance'):
+                LOG.info('Loading {} on demand'.format(skill['id']))
+                emitter = skill['emitter']
+                # Intents are already registered from the manifest
+                emitter.suppress = REGISTRATION_MESSAGES
+                skill['profile'] = SkillLoadProfile(skill['id'],
+                                                    skill['path'])
+                try:
+                    skill['instance'] = load_skill(
+                        create_skill_descriptor(skill['path']), emitter,
+                        skill['id'], BLACKLISTED_SKILLS, skill['profile'])
+                finally:
+                    emitter.suppress = set()
+                if not skill['instance']:
+                    skill['state'] = FAILED
+                    return
+                skill['state'] = LOADED
+            skill['last_used'] = monotonic.monotonic()
+        skill['emitter'].dispatch(message)
+
+    def unload_idle_skills(self):
+        """ Unload skills loaded on demand which haven't been used lately. """
+        idle_timeout = self.lazy_config.get('idle_timeout', 3600)
+        now = monotonic.monotonic()
+        for skill in list(self.loaded_skills.values()):
+            if not skill.get('emitter') or not skill.get('instance'):
+                continue
+            with skill['lock']:
+                if now - skill['last_used'] < idle_timeout:
+                    continue
+                LOG.info('Unloading idle skill ' + skill['id'])
+                instance = skill.pop('instance')
+                skill['state'] = LAZY
+                emitter = skill['emitter']
+                # Keep the intents registered for the next activation
+                emitter.suppress = {'detach_skill'}
+                try:
+                    instance._shutdown()
+                except Exception:
+                    LOG.exception('Shutting down skill: ' + skill['id'])
+                finally:
+                    emitter.suppress = set()
+                unload_skill_module(skill['id'].replace('.', '_'))
+
+    def load_skills(self, skill_paths):
+        """
+            Load or reload skills concurrently on a pool of worker threads.
+
+            A skill whose loading takes longer than the configured timeout
+            is left to finish in the background and its worker is replaced,
+            so it won't hold back the other skills.
+
+            Args:
+                skill_paths: paths of the skills to check
+
+            Returns True if any of the skills was loaded/reloaded
+        """
+        config = Configuration.get()['skills'].get('loader', {})
+        timeout = config.get('timeout', 60)
+        queued = Queue()
+        for path in skill_paths:
+            queued.put(path)
+        results = Queue()
+        started = {}
+
+        def worker():
+            while True:
+                try:
+                    path = queued.get_nowait()
+                except Empty:
+                    return
+                started[path] = monotonic.monotonic()
+                try:
+                    results.put((path, self._load_or_reload_skill(path)))
+                except Exception:
+                    LOG.exception('Loading ' + path)
+                    results.put((path, False))
+
+        def start_worker():
+            t = Thread(target=worker)
+            t.daemon = True
+            t.start()
+
+        for _ in range(min(config.get('max_workers', 4), len(skill_paths))):
+            start_worker()
+
+        loaded = False
+        pending = set(skill_paths)
+        while pending:
+            now = monotonic.monotonic()
+            for path in list(pending):
+                if path in started and now - started[path] > timeout:
+                    LOG.error('{} did not load within {} seconds, '
+                              'continuing without it'.format(path, timeout))
+                    pending.remove(path)
+                    # The hung load keeps its thread, continue with a new one
+                    start_worker()
+            deadlines = [started[p] + timeout - now
+                         for p in pending if p in started]
+            try:
+                path, result = results.get(
+                    timeout=max(min(deadlines + [1.0]), 0.01))
+            except Empty:
+                continue
+            if path in pending:
+                pending.remove(path)
+                loaded = result or loaded
+        return loaded
+
     def load_priority(self):
         skills = {skill.name: skill for skill in self.msm.list()}
         for skill_name in PRIORITY_SKILLS:
@@ -393,6 +723,14 @@ class SkillManager(Thread):
                         continue
             self._load_or_reload_skill(skill.path)
 
+    def create_watcher(self):
+        """ Create the watcher reporting changed skill directories. """
+        config = Configuration.get()['skills'].get('watch', {})
+        return create_file_watcher(SKILLS_DIR,
+                                   backend=config.get('backend', 'auto'),
+                                   debounce=config.get('debounce', 1.0),
+                                   interval=config.get('poll_interval', 2.0))
+
     def run(self):
         """ Load skills and update periodically from disk and internet """
 
@@ -405,6 +743,15 @@ class SkillManager(Thread):
         # check if skill updates are enabled
         update = Configuration.get()["skills"]["auto_update"]
 
+        # Start watching before the first scan so no change is missed
+        watcher = self.create_watcher()
+        load_time = None
+        report_config = Configuration.get()['skills'].get('load_report', {})
+        trace_memory = (report_config.get('trace_memory') and
+                        not tracemalloc.is_tracing())
+        if trace_memory:
+            tracemalloc.start()
+
         # Scan the file folder that contains Skills.  If a Skill is updated,
         # unload the existing version from memory and reload from the disk.
         while not self._stop_event.is_set():
@@ -412,21 +759,52 @@ class SkillManager(Thread):
             if time.time() >= self.next_download and update:
                 self.download_skills()
 
-            # Look for recently changed skill(s) needing a reload
-            # checking skills dir and getting all skills there
-            skill_paths = glob(join(SKILLS_DIR, '*/'))
-            still_loading = False
-            for skill_path in skill_paths:
-                still_loading = (
-                        self._load_or_reload_skill(skill_path) or
-                        still_loading
-                )
+            self.supervise_processes()
+            if has_loaded:
+                if self.lazy_config.get('enabled'):
+                    self.unload_idle_skills()
+                # Only look at the skills changed on disk
+                skill_paths = watcher.wait(timeout=2)
+            else:
+                # checking skills dir and getting all skills there
+                skill_paths = glob(join(SKILLS_DIR, '*/'))
+            start = monotonic.monotonic()
+            still_loading = self.load_skills(skill_paths)
+            if load_time is None:
+                load_time = monotonic.monotonic() - start
             if not has_loaded and not still_loading and len(skill_paths) > 0:
                 has_loaded = True
+                LOG.info('Skills loaded in {:.2f} seconds'.format(load_time))
+                self.report_load(load_time, report_config.get('file'))
+                if trace_memory:
+                    tracemalloc.stop()
                 self.ws.emit(Message('mycroft.skills.initialized'))
 
-            # Pause briefly before beginning next scan
-            time.sleep(2)
+            if not has_loaded:
+                # Pause briefly before beginning next scan
+                time.sleep(2)
+        watcher.close()
+
+    def report_load(self, load_time, filename=None):
+        """
+            Create the report of the loaded skills and send it on the bus.
+
+            Args:
+                load_time (float): seconds spent loading the skills
+                filename (str): file to write the report to
+        """
+        profiles = [s['profile'] for s in self.loaded_skills.values()
+                    if 'profile' in s]
+        memory = memory_by_skill(list(self.loaded_skills))
+        self.load_report = create_load_report(profiles, load_time, memory)
+        if filename:
+            save_load_report(filename, self.load_report)
+        self.ws.emit(Message('mycroft.skills.load_report', self.load_report))
+
+    def send_load_report(self, message):
+        """ Reply with the report of the skill loading. """
+        self.ws.emit(message.reply('mycroft.skills.load_report',
+                                   self.load_report or {}))
 
     def send_skill_list(self, message=None):
         """
@@ -434,17 +812,41 @@ class SkillManager(Thread):
         """
         try:
             self.ws.emit(Message('mycroft.skills.list', data={'skills': [
-                basename(skill_path) for skill_path in self.loaded_skills
+                skill['id'] for skill in self.registry
             ]}))
         except Exception as e:
             LOG.exception(e)
 
+    def send_registry(self, message):
+        """
+            Reply with the state of the skills matching the id, name or
+            path in the request, or of all skills.
+        """
+        data = message.data or {}
+        skills = self.registry.find(data.get('id'), data.get('name'),
+                                    data.get('path'))
+        self.ws.emit(message.reply('mycroft.skills.registry', {
+            'skills': [self.registry.info(skill) for skill in skills]
+        }))
+
+    def handle_process_loaded(self, message):
+        """ Update the state of a skill running in its own process. """
+        skill = self.registry.get_by_id(message.data.get('id'))
+        if not skill or not skill.get('process'):
+            return
+        if message.type == 'mycroft.skills.loaded':
+            self.registry.set_name(skill, message.data.get('name'))
+        else:
+            skill['state'] = FAILED
+
     def stop(self):
         """ Tell the manager to shutdown """
         self._stop_event.set()
 
         # Do a clean shutdown of all skills
         for name, skill_info in self.loaded_skills.items():
+            if skill_info.get('process'):
+                skill_info['process'].stop()
             instance = skill_info.get('instance')
             if instance:
                 try:
@@ -462,26 +864,34 @@ class SkillManager(Thread):
         utterances = message.data["utterances"]
         lang = message.data["lang"]
 
-        # loop trough skills list and call converse for skill with skill_id
-        for skill in self.loaded_skills:
-            if self.loaded_skills[skill]["id"] == skill_id:
-                try:
-                    instance = self.loaded_skills[skill]["instance"]
-                except BaseException:
-                    LOG.error("converse requested but skill not loaded")
-                    self.ws.emit(Message("skill.converse.response", {
-                        "skill_id": 0, "result": False}))
-                    return
-                try:
-                    result = instance.converse(utterances, lang)
-                    self.ws.emit(Message("skill.converse.response", {
-                        "skill_id": skill_id, "result": result}))
-                    return
-                except BaseException:
-                    LOG.exception(
-                        "Error in converse method for skill " + str(skill_id))
-        self.ws.emit(Message("skill.converse.response",
-                             {"skill_id": 0, "result": False}))
+        skill = self.registry.get_by_id(skill_id)
+        if skill:
+            process = skill.get("process")
+            if process and process.running:
+                return  # Answered by the skill process
+            elif process:
+                LOG.warning("converse requested but the process of {} is "
+                            "not running".format(skill_id))
+                self.ws.emit(message.reply("skill.converse.response", {
+                    "skill_id": skill_id, "result": False}))
+                return
+            try:
+                instance = skill["instance"]
+            except BaseException:
+                LOG.error("converse requested but skill not loaded")
+                self.ws.emit(message.reply("skill.converse.response", {
+                    "skill_id": 0, "result": False}))
+                return
+            try:
+                result = instance.converse(utterances, lang)
+                self.ws.emit(message.reply("skill.converse.response", {
+                    "skill_id": skill_id, "result": result}))
+                return
+            except BaseException:
+                LOG.exception(
+                    "Error in converse method for skill " + str(skill_id))
+        self.ws.emit(message.reply("skill.converse.response",
+                                   {"skill_id": 0, "result": False}))
 
 
 def main():
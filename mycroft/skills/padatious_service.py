@@ -20,7 +20,7 @@ from os.path import expanduser, isfile
 from pkg_resources import get_distribution
 
 from mycroft.configuration import Configuration
-from mycroft.messagebus.message import Message
+from mycroft.metrics import Tracer
 from mycroft.skills.core import FallbackSkill
 from mycroft.util.log import LOG
 
@@ -56,7 +56,7 @@ class PadatiousService(FallbackSkill):
         self.emitter.on('padatious:register_intent', self.register_intent)
         self.emitter.on('padatious:register_entity', self.register_entity)
         self.emitter.on('mycroft.skills.initialized', self.train)
-        self.register_fallback(self.handle_fallback, 5)
+        self.register_fallback(self.handle_fallback, 5, speculative=True)
         self.finished_training_event = Event()
         self.finished_initial_train = False
 
@@ -110,14 +110,18 @@ class PadatiousService(FallbackSkill):
             LOG.debug('Waiting for training to finish...')
             self.finished_training_event.wait()
 
-        data = self.container.calc_intent(utt)
+        ident = (message.context or {}).get('ident')
+        with Tracer.get().span(ident, 'padatious'):
+            data = self.container.calc_intent(utt)
 
         if data.conf < 0.5:
             return False
 
         data.matches['utterance'] = utt
 
-        self.service.add_active_skill(data.name.split(':')[0])
+        def commit():
+            self.service.add_active_skill(data.name.split(':')[0],
+                                          self.service.get_session_id(message))
+            self.emitter.emit(message.reply(data.name, data.matches))
 
-        self.emitter.emit(Message(data.name, data=data.matches))
-        return True
+        return commit
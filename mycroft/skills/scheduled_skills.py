@@ -13,7 +13,7 @@
 # limitations under the License.
 #
 from datetime import datetime
-from threading import Timer, Lock
+from threading import Lock
 from time import mktime
 
 import abc
@@ -23,6 +23,7 @@ from adapt.intent import IntentBuilder
 from mycroft.skills import time_rules
 from mycroft.skills.core import MycroftSkill
 from mycroft.util.log import LOG
+from mycroft.util.timer_service import TimerService
 
 
 class ScheduledSkill(MycroftSkill):
@@ -68,13 +69,11 @@ class ScheduledSkill(MycroftSkill):
             t = times[0]
             now = self.get_utc_time()
             delay = max(float(t) - now, 1)
-            self.timer = Timer(delay, self.notify, [t])
-            self.timer.daemon = True
-            self.start()
+            self.timer = TimerService.get().call_later(delay, self.notify, t)
 
     def start(self):
-        if self.timer:
-            self.timer.start()
+        # The timer is started by schedule()
+        pass
 
     def cancel(self):
         if self.timer:
@@ -113,8 +112,8 @@ class ScheduledSkill(MycroftSkill):
         super(ScheduledSkill, self).shutdown()
         # if timer method is running wait for it to complete
         self.cancel()
-        if self.timer and self.timer.isAlive():
-            self.timer.join()
+        if self.timer:
+            self.timer.wait()
         self.timer = None
 
 
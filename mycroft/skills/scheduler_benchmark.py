@@ -0,0 +1,155 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Event Scheduler Benchmark
+Schedules a large number of events with an EventScheduler in this process
+and measures:
+    - scheduling them with one message per event and with a single
+      mycroft.scheduler.schedule_events message
+    - sending them when they're all due at once
+    - removing them by prefix
+    - how far a sub-second repeating event drifts from its schedule
+
+The schedule is journaled to a temporary directory like on a device.
+"""
+import argparse
+import time
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Event
+
+from pyee import EventEmitter
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.event_scheduler import EventScheduler
+
+
+class CountingEmitter(EventEmitter):
+    """ Emitter counting the scheduled events sent by the scheduler. """
+    def __init__(self, expected=0):
+        super(CountingEmitter, self).__init__()
+        self.expected = expected
+        self.sent = []
+        self.done = Event()
+
+    def emit(self, event, *args, **kwargs):
+        if isinstance(event, Message):
+            self.sent.append(time.time())
+            if len(self.sent) >= self.expected:
+                self.done.set()
+            args = (event,) + args
+            event = event.type
+        return super(CountingEmitter, self).emit(event, *args, **kwargs)
+
+
+def event_data(count, sched_time):
+    return [{'event': 'benchmark-skill:event{}'.format(i),
+             'time': sched_time, 'data': {'i': i}} for i in range(count)]
+
+
+def timed(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def benchmark_scheduling(directory, count):
+    results = {}
+    far_future = time.time() + 3600
+    for batch in (False, True):
+        emitter = CountingEmitter()
+        scheduler = EventScheduler(emitter, join(directory, str(batch)))
+        events = event_data(count, far_future)
+
+        def schedule():
+            if batch:
+                emitter.emit(Message('mycroft.scheduler.schedule_events',
+                                     {'events': events}))
+            else:
+                for e in events:
+                    emitter.emit(Message('mycroft.scheduler.schedule_event',
+                                         e))
+
+        results['batch' if batch else 'single'] = timed(schedule)
+        if batch:
+            results['remove'] = timed(
+                emitter.emit, Message('mycroft.scheduler.remove_events',
+                                      {'prefix': 'benchmark-skill:'}))
+        scheduler.shutdown()
+    return results
+
+
+def benchmark_sending(count):
+    emitter = CountingEmitter(count)
+    scheduler = EventScheduler(emitter, None)
+    sched_time = time.time() + 1
+    scheduler.schedule_events([(e['event'], e['time'], None, e['data'])
+                               for e in event_data(count, sched_time)])
+    emitter.done.wait(sched_time - time.time() + 60)
+    scheduler.shutdown()
+    return emitter.sent[0] - sched_time, emitter.sent[-1] - sched_time
+
+
+def benchmark_repeat(interval, duration):
+    emitter = CountingEmitter(int(duration / interval))
+    scheduler = EventScheduler(emitter, None)
+    start = time.time() + interval
+    scheduler.schedule_event('benchmark-skill:repeat', start, interval)
+    emitter.done.wait(duration + 10)
+    scheduler.shutdown()
+    lateness = [t - (start + i * interval)
+                for i, t in enumerate(emitter.sent)]
+    return lateness[-1], max(lateness)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-n', '--events', dest='events', type=int, default=10000,
+        help="Number of scheduled events (Default: 10000)")
+    parser.add_argument(
+        '-i', '--interval', dest='interval', type=float, default=0.1,
+        help="Interval of the repeating event (Default: 0.1)")
+    parser.add_argument(
+        '-d', '--duration', dest='duration', type=float, default=10,
+        help="Seconds to run the repeating event (Default: 10)")
+    args = parser.parse_args()
+
+    tmp_dir = mkdtemp()
+    try:
+        scheduling = benchmark_scheduling(tmp_dir, args.events)
+    finally:
+        rmtree(tmp_dir)
+    first, last = benchmark_sending(args.events)
+    drift, worst = benchmark_repeat(args.interval, args.duration)
+
+    print('{} events'.format(args.events))
+    print('  schedule_event messages:   {:8.1f} ms'.format(
+        scheduling['single'] * 1000))
+    print('  schedule_events message:   {:8.1f} ms'.format(
+        scheduling['batch'] * 1000))
+    print('  remove_events by prefix:   {:8.1f} ms'.format(
+        scheduling['remove'] * 1000))
+    print('  all due at once, sent after {:.1f} - {:.1f} ms'.format(
+        first * 1000, last * 1000))
+    print('Event repeating every {} s for {} s'.format(
+        args.interval, args.duration))
+    print('  lateness of last repeat: {:.1f} ms, worst: {:.1f} ms'.format(
+        drift * 1000, worst * 1000))
+
+
+if __name__ == '__main__':
+    main()
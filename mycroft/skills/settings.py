@@ -60,25 +60,342 @@
 
 import json
 import hashlib
-from threading import Timer
+import os
+import time
+from functools import wraps
+from threading import Event, Lock, Thread
 from os.path import isfile, join, expanduser
 
+import monotonic
+
 from mycroft.api import DeviceApi, is_paired
 from mycroft.util.log import LOG
+from mycroft.util.timer_service import TimerService
 from mycroft.configuration import ConfigurationManager
 
 
-class SkillSettings(dict):
+def timed_io(func):
+    """ Add the time spent in the decorated method to io_time. """
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._timing_io:
+            return func(self, *args, **kwargs)  # Already counted
+        self._timing_io = True
+        start = time.time()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self.io_time += time.time() - start
+            self._timing_io = False
+    return wrapper
+
+
+def _track(value, changed):
+    """ Wrap lists and dicts so changes to them call changed.
+
+        Used for values owned by the settings, like the ones read from
+        settings.json, the lists and dicts are copied.
+    """
+    if type(value) in (list, _TrackedList):
+        if getattr(value, '_changed', None) is not changed:
+            value = _TrackedList(changed, value)
+    elif type(value) in (dict, _TrackedDict):
+        if getattr(value, '_changed', None) is not changed:
+            value = _TrackedDict(changed, value)
+    return value
+
+
+def _adopt(value, changed):
+    """ Prepare a value stored by a skill.
+
+        Lists and dicts of the skill are stored as they are so references
+        the skill keeps to them stay valid. Changes made through those
+        references can't be tracked, SkillSettings compares them when
+        they're stored instead.
+    """
+    if type(value) in (_TrackedList, _TrackedDict):
+        return _track(value, changed)
+    return value
+
+
+def _has_untracked(value):
+    """ Check for lists and dicts whose changes aren't tracked. """
+    if type(value) in (list, dict):
+        return True
+    if type(value) is _TrackedList:
+        return any(_has_untracked(v) for v in value)
+    if isinstance(value, _TrackedDict):
+        return any(_has_untracked(v) for v in value.values())
+    return False
+
+
+class _TrackedList(list):
+    """ list calling changed when it or a value in it is modified. """
+    def __init__(self, changed=None, values=()):
+        self._changed = changed
+        super(_TrackedList, self).__init__(_track(v, changed) for v in values)
+
+    def _modified(self):
+        if self._changed:
+            self._changed()
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [_adopt(v, self._changed) for v in value]
+        else:
+            value = _adopt(value, self._changed)
+        super(_TrackedList, self).__setitem__(index, value)
+        self._modified()
+
+    def __delitem__(self, index):
+        super(_TrackedList, self).__delitem__(index)
+        self._modified()
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __imul__(self, count):
+        super(_TrackedList, self).__imul__(count)
+        self._modified()
+        return self
+
+    def append(self, value):
+        super(_TrackedList, self).append(_adopt(value, self._changed))
+        self._modified()
+
+    def extend(self, values):
+        super(_TrackedList, self).extend(_adopt(v, self._changed)
+                                         for v in values)
+        self._modified()
+
+    def insert(self, index, value):
+        super(_TrackedList, self).insert(index, _adopt(value, self._changed))
+        self._modified()
+
+    def pop(self, *args):
+        value = super(_TrackedList, self).pop(*args)
+        self._modified()
+        return value
+
+    def remove(self, value):
+        super(_TrackedList, self).remove(value)
+        self._modified()
+
+    def clear(self):
+        super(_TrackedList, self).clear()
+        self._modified()
+
+    def sort(self, *args, **kwargs):
+        super(_TrackedList, self).sort(*args, **kwargs)
+        self._modified()
+
+    def reverse(self):
+        super(_TrackedList, self).reverse()
+        self._modified()
+
+
+class _TrackedDict(dict):
+    """ dict calling changed when it or a value in it is modified. """
+    def __init__(self, changed=None, values=()):
+        self._changed = changed
+        super(_TrackedDict, self).__init__()
+        for key, value in dict(values).items():
+            dict.__setitem__(self, key, _track(value, changed))
+
+    def _modified(self):
+        if self._changed:
+            self._changed()
+
+    def __setitem__(self, key, value):
+        if (key in self and not isinstance(value, (list, dict)) and
+                type(self[key]) is type(value) and self[key] == value):
+            return  # Unchanged
+        super(_TrackedDict, self).__setitem__(key,
+                                              _adopt(value, self._changed))
+        self._modified()
+
+    def __delitem__(self, key):
+        super(_TrackedDict, self).__delitem__(key)
+        self._modified()
+
+    def clear(self):
+        super(_TrackedDict, self).clear()
+        self._modified()
+
+    def pop(self, *args):
+        value = super(_TrackedDict, self).pop(*args)
+        self._modified()
+        return value
+
+    def popitem(self):
+        item = super(_TrackedDict, self).popitem()
+        self._modified()
+        return item
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            dict.__setitem__(self, key, _adopt(default, self._changed))
+            self._modified()
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            dict.__setitem__(self, key, _adopt(value, self._changed))
+        self._modified()
+
+
+class SettingsSync(object):
+    """ Syncs the settings of all skills with the backend.
+
+        The settings of all skills on the device are fetched in a single
+        request every interval, which is cached with ETags, and handed to
+        each registered SkillSettings.
+
+        A skill is synced once when it registers, before the skill is
+        initialized. Skills registering within an interval of each other
+        share the fetched settings, so loading all skills takes one request.
+
+        Args:
+            interval (float): seconds between syncs
+            delay (float):    seconds to wait for more skills when a sync is
+                              requested, so they share a request
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self, interval=60, delay=1.0):
+        self.interval = interval
+        self.delay = delay
+        self.api = DeviceApi()
+        self.settings = []
+        self.lock = Lock()
+        self._fetch_lock = Lock()
+        self._remote_settings = None
+        self._fetch_time = None
+        self._wake = Event()
+        self._running = False
+        self._thread = None
+
+    @classmethod
+    def get(cls):
+        """ Get the sync service shared by all skills in this process. """
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = ConfigurationManager.get().get('skills', {})
+                config = config.get('settings_sync', {})
+                cls._instance = cls(config.get('interval', 60))
+            return cls._instance
+
+    def register(self, settings):
+        """ Sync the SkillSettings now and with every following batch. """
+        with self.lock:
+            # SkillSettings are dicts, compare by identity and not contents
+            if not any(s is settings for s in self.settings):
+                self.settings.append(settings)
+            if not self._running:
+                self._running = True
+                self._thread = Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        if not is_paired():
+            return
+        try:
+            remote_settings = self.fetch(max_age=self.interval)
+        except Exception as e:
+            LOG.error('Failed to fetch skill settings: {}'.format(repr(e)))
+            return
+        settings._poll_skill_settings(remote_settings)
+
+    def unregister(self, settings):
+        with self.lock:
+            self.settings = [s for s in self.settings if s is not settings]
+
+    def sync_soon(self):
+        """ Sync without waiting for the end of the interval. """
+        self._wake.set()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            if self._wake.wait(self.interval):
+                # Let skills registering at the same time share the request
+                time.sleep(self.delay)
+            self._wake.clear()
+            if self._running:
+                self.sync()
+
+    def request_settings(self):
+        """ Get the settings of all skills on this device.
+
+            Returns:
+                list: settings of each skill as stored on the server
+        """
+        settings = self.api.request({
+            "method": "GET",
+            "path": "/" + self.api.identity.uuid + "/skill"
+        })
+        return [skill for skill in settings if skill is not None]
+
+    def fetch(self, max_age=0):
+        """ Get the settings of all skills on this device, requesting them
+            if the last ones are older than max_age seconds.
+
+            Args:
+                max_age (float): seconds the last fetched settings are used
+
+            Returns:
+                list: settings of each skill as stored on the server
+        """
+        with self._fetch_lock:
+            if (self._fetch_time is None or
+                    monotonic.monotonic() - self._fetch_time >= max_age):
+                self._remote_settings = self.request_settings()
+                self._fetch_time = monotonic.monotonic()
+            return self._remote_settings
+
+    def sync(self):
+        """ Fetch the settings of all skills and update the skills. """
+        with self.lock:
+            skills = list(self.settings)
+        if not skills or not is_paired():
+            return
+        try:
+            remote_settings = self.fetch()
+        except Exception as e:
+            LOG.error('Failed to fetch skill settings: {}'.format(repr(e)))
+            return
+        for settings in skills:
+            settings._poll_skill_settings(remote_settings)
+
+
+class SkillSettings(_TrackedDict):
     """ A dictionary that can easily be save to a file, serialized as json. It
         also syncs to the backend for skill settings
 
+        Changes are tracked, including changes to lists and dicts read
+        from settings.json, so storing unchanged settings costs nothing.
+        Lists and dicts stored by the skill are kept as they are, the skill
+        may keep changing them, and are compared to what was last written
+        when the settings are stored.
+
         Args:
             directory (str): Path to storage directory
             name (str):      user readable name associated with the settings
     """
 
     def __init__(self, directory, name):
-        super(SkillSettings, self).__init__()
+        super(SkillSettings, self).__init__(self._mark_changed)
+        self._dirty = False
+        self._written = None  # JSON last written, if it had untracked values
+        self._store_lock = Lock()
+        self._store_timer = None
         # when skills try to instantiate settings
         # in __init__, it can erase the settings saved
         # on disk (settings.json). So this prevents that
@@ -92,29 +409,34 @@ class SkillSettings(dict):
         self._settings_path = join(directory, 'settings.json')
         self._meta_path = join(directory, 'settingsmeta.json')
         self.is_alive = True
-        self.loaded_hash = hash(json.dumps(self, sort_keys=True))
+        # Seconds to combine changes into one write in schedule_store()
+        self.store_delay = self.config.get('skills', {}).get(
+            'settings_store_delay', 0)
         self._complete_intialization = False
         self._device_identity = None
         self._api_path = None
         self._user_identity = None
         self.changed_callback = None
-        self._poll_timer = None
+        self._sync = None
         self._is_alive = True
+        # Time spent reading, writing and syncing the settings
+        self.io_time = 0.0
+        self._timing_io = False
 
         # if settingsmeta exist
         if isfile(self._meta_path):
-            self._poll_skill_settings()
+            self._sync = SettingsSync.get()
+            self._sync.register(self)
 
     def run_poll(self, _=None):
         """Immediately poll the web for new skill settings"""
-        if self._poll_timer:
-            self._poll_timer.cancel()
-            self._poll_skill_settings()
+        if self._sync:
+            self._sync.sync_soon()
 
     def stop_polling(self):
         self._is_alive = False
-        if self._poll_timer:
-            self._poll_timer.cancel()
+        if self._sync:
+            self._sync.unregister(self)
 
     def set_changed_callback(self, callback):
         """
@@ -125,8 +447,13 @@ class SkillSettings(dict):
         self.changed_callback = callback
 
     # TODO: break this up into two classes
-    def initialize_remote_settings(self):
-        """ initializes the remote settings to the server """
+    def initialize_remote_settings(self, remote_settings=None):
+        """ initializes the remote settings to the server
+
+            Args:
+                remote_settings (list): settings of all skills on this
+                                        device, requested if None
+        """
         # if settingsmeta.json exists (and is valid)
         # this block of code is a control flow for
         # different scenarios that may arises with settingsmeta
@@ -164,7 +491,8 @@ class SkillSettings(dict):
                 self['not_owner'] = True
                 self.save_skill_settings(skill_settings)
             else:
-                settings = self._request_my_settings(hashed_meta)
+                settings = self._request_my_settings(hashed_meta,
+                                                     remote_settings)
                 if settings is None:
                     LOG.debug("seems like it got deleted from home... "
                               "sending settingsmeta.json for "
@@ -176,7 +504,15 @@ class SkillSettings(dict):
 
     @property
     def _is_stored(self):
-        return hash(json.dumps(self, sort_keys=True)) == self.loaded_hash
+        if self._dirty:
+            return False
+        if self._written is None or not _has_untracked(self):
+            return True
+        # Lists and dicts of the skill may have changed
+        return json.dumps(self, sort_keys=True) == self._written
+
+    def _mark_changed(self):
+        self._dirty = True
 
     def __getitem__(self, key):
         """ Get key """
@@ -360,9 +696,15 @@ class SkillSettings(dict):
             return False if current_hash == str(hashed_meta) else True
         return True
 
-    def update_remote(self):
-        """ update settings state from server """
+    def update_remote(self, remote_settings=None):
+        """ update settings state from server
+
+            Args:
+                remote_settings (list): settings of all skills on this
+                                        device, requested if None
+        """
         skills_settings = None
+        previous = getattr(self, '_remote_settings', None)
         settings_meta = self._load_settings_meta()
         if settings_meta is None:
             return
@@ -370,30 +712,38 @@ class SkillSettings(dict):
         if self.get('not_owner'):
             skills_settings = self._request_other_settings(hashed_meta)
         if not skills_settings:
-            skills_settings = self._request_my_settings(hashed_meta)
+            skills_settings = self._request_my_settings(hashed_meta,
+                                                        remote_settings)
 
         if skills_settings is not None:
+            if skills_settings == previous:
+                return  # Nothing changed on the server
             self.save_skill_settings(skills_settings)
             self.store()
         else:
             settings_meta = self._load_settings_meta()
             self._upload_meta(settings_meta, hashed_meta)
 
-    def _poll_skill_settings(self):
+    @timed_io
+    def _poll_skill_settings(self, remote_settings=None):
         """ If identifier exists for this skill poll to backend to
             request settings and store it if it changes
             TODO: implement as websocket
+
+            Args:
+                remote_settings (list): settings of all skills on this
+                                        device, requested if None
         """
         original = hash(str(self))
         try:
             if not is_paired():
                 pass
             elif not self._complete_intialization:
-                self.initialize_remote_settings()
+                self.initialize_remote_settings(remote_settings)
                 if not self._complete_intialization:
                     return  # unable to do remote sync
             else:
-                self.update_remote()
+                self.update_remote(remote_settings)
 
         except Exception as e:
             LOG.exception('Failed to fetch skill settings: {}'.format(repr(e)))
@@ -402,43 +752,40 @@ class SkillSettings(dict):
             if self.changed_callback and hash(str(self)) != original:
                 self.changed_callback()
 
-        if self._poll_timer:
-            self._poll_timer.cancel()
-
-        if not self._is_alive:
-            return
-
-        # continues to poll settings every minute
-        self._poll_timer = Timer(60, self._poll_skill_settings)
-        self._poll_timer.daemon = True
-        self._poll_timer.start()
-
+    @timed_io
     def load_skill_settings_from_file(self):
         """ If settings.json exist, open and read stored values into self """
         if isfile(self._settings_path):
+            # The values read don't need to be stored again
+            dirty = self._dirty
             with open(self._settings_path) as f:
                 try:
                     json_data = json.load(f)
                     for key in json_data:
-                        self[key] = json_data[key]
+                        self[key] = _track(json_data[key], self._mark_changed)
                 except Exception as e:
                     # TODO: Show error on webUI.  Dev will have to fix
                     # metadata to be able to edit later.
                     LOG.error(e)
+            self._dirty = dirty
 
-    def _request_my_settings(self, identifier):
+    def _request_my_settings(self, identifier, remote_settings=None):
         """ Get skill settings for this device associated
             with the identifier
 
             Args:
                 identifier (str): a hashed_meta
+                remote_settings (list): settings of all skills on this
+                                        device, requested if None
 
             Returns:
                 skill_settings (dict or None): returns a dict if matches
         """
-        LOG.debug("getting skill settings from "
-                  "server for {}".format(self.name))
-        settings = self._request_settings()
+        if remote_settings is None:
+            LOG.debug("getting skill settings from "
+                      "server for {}".format(self.name))
+            remote_settings = self._request_settings()
+        settings = remote_settings
         # this loads the settings into memory for use in self.store
         for skill_settings in settings:
             if skill_settings['identifier'] == identifier:
@@ -535,17 +882,45 @@ class SkillSettings(dict):
             changed = False
         return changed
 
+    def schedule_store(self):
+        """ Store the settings after store_delay seconds, combining the
+            changes made until then into a single write.
+        """
+        if not self.store_delay:
+            self.store()
+            return
+        with self._store_lock:
+            if not self._is_stored and not self._store_timer:
+                self._store_timer = TimerService.get().call_later(
+                    self.store_delay, self.store)
+
+    @timed_io
     def store(self, force=False):
         """ Store dictionary to file if a change has occured.
 
+            The file is replaced atomically so it's never left half
+            written.
+
             Args:
                 force:  Force write despite no change
         """
-
-        if force or not self._is_stored:
-            with open(self._settings_path, 'w') as f:
-                json.dump(self, f)
-            self.loaded_hash = hash(json.dumps(self, sort_keys=True))
+        with self._store_lock:
+            if self._store_timer:
+                self._store_timer.cancel()
+                self._store_timer = None
+            if not force and self._is_stored:
+                return
+            self._dirty = False
+            try:
+                tmp_path = self._settings_path + '.tmp'
+                data = json.dumps(self, sort_keys=True)
+                with open(tmp_path, 'w') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._settings_path)
+                self._written = data if _has_untracked(self) else None
+            except Exception:
+                self._dirty = True
+                raise
 
         if self._should_upload_from_change:
             settings_meta = self._load_settings_meta()
@@ -33,7 +33,11 @@ def load_vocab_from_file(path, vocab_type, emitter):
         vocab_type:     keyword name
         emitter:        emitter to access the message bus
         skill_id(str):  skill id
+
+    Returns:
+        int: number of registered words
     """
+    count = 0
     if path.endswith('.voc'):
         with open(path, 'r') as voc_file:
             for line in voc_file.readlines():
@@ -48,6 +52,8 @@ def load_vocab_from_file(path, vocab_type, emitter):
                     emitter.emit(Message("register_vocab", {
                         'start': alias, 'end': vocab_type, 'alias_of': entity
                     }))
+                count += len(parts)
+    return count
 
 
 def load_regex_from_file(path, emitter, skill_id):
@@ -57,7 +63,11 @@ def load_regex_from_file(path, emitter, skill_id):
     Args:
         path:       path to vocabulary file (*.voc)
         emitter:    emitter to access the message bus
+
+    Returns:
+        int: number of registered expressions
     """
+    count = 0
     if path.endswith('.rx'):
         with open(path, 'r') as reg_file:
             for line in reg_file.readlines():
@@ -67,6 +77,8 @@ def load_regex_from_file(path, emitter, skill_id):
                 emitter.emit(
                     Message("register_vocab",
                             {'regex': munge_regex(line.strip(), skill_id)}))
+                count += 1
+    return count
 
 
 def load_vocabulary(basedir, emitter, skill_id):
@@ -77,12 +89,17 @@ def load_vocabulary(basedir, emitter, skill_id):
         emitter (messagebus emitter): websocket used to send the vocab to
                                       the intent service
         skill_id: skill the data belongs to
+
+    Returns:
+        int: number of registered words
     """
+    count = 0
     for vocab_file in listdir(basedir):
         if vocab_file.endswith(".voc"):
             vocab_type = to_alnum(skill_id) + splitext(vocab_file)[0]
-            load_vocab_from_file(
+            count += load_vocab_from_file(
                 join(basedir, vocab_file), vocab_type, emitter)
+    return count
 
 
 def load_regex(basedir, emitter, skill_id):
@@ -93,10 +110,16 @@ def load_regex(basedir, emitter, skill_id):
         emitter (messagebus emitter): websocket used to send the vocab to
                                       the intent service
         skill_id (str): skill identifier
+
+    Returns:
+        int: number of registered expressions
     """
+    count = 0
     for regex_type in listdir(basedir):
         if regex_type.endswith(".rx"):
-            load_regex_from_file(join(basedir, regex_type), emitter, skill_id)
+            count += load_regex_from_file(join(basedir, regex_type), emitter,
+                                          skill_id)
+    return count
 
 
 def to_alnum(skill_id):
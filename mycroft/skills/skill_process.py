@@ -0,0 +1,85 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import signal
+import subprocess
+import sys
+
+import monotonic
+import psutil
+
+from mycroft.util.log import LOG
+
+
+class SkillProcess(object):
+    """
+        A skill running in its own process, hosted by a SkillContainer
+        connected to the messagebus.
+
+        Args:
+            path (str): skill directory
+            skill_id (str): id of the skill
+            memory_limit (int): bytes of memory the skill may use before
+                                it's restarted, None for no limit
+    """
+    def __init__(self, path, skill_id, memory_limit=None):
+        self.path = path
+        self.skill_id = skill_id
+        self.memory_limit = memory_limit
+        self.process = None
+        self.start_time = None
+        self.restarts = 0  # Restarts since the skill last ran stable
+        self.restart_time = None  # When to restart after an exit
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def returncode(self):
+        return self.process.returncode if self.process else None
+
+    def start(self):
+        """ Start the skill process. """
+        cmd = [sys.executable, '-m', 'mycroft.skills.container',
+               '--config=', '--skill-id', self.skill_id, self.path]
+        self.process = subprocess.Popen(cmd)
+        self.start_time = monotonic.monotonic()
+        self.restart_time = None
+        LOG.info('Started {} in process {}'.format(self.skill_id,
+                                                   self.process.pid))
+
+    def stop(self, timeout=5):
+        """ Interrupt the skill process, killing it if it doesn't exit. """
+        if not self.running:
+            return
+        self.process.send_signal(signal.SIGINT)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            LOG.warning('Killing {}, it did not stop within {} '
+                        'seconds'.format(self.skill_id, timeout))
+            self.process.kill()
+            self.process.wait()
+
+    def memory_usage(self):
+        """ Resident memory of the process in bytes. """
+        try:
+            return psutil.Process(self.process.pid).memory_info().rss
+        except (psutil.Error, AttributeError):
+            return 0
+
+    def over_memory_limit(self):
+        return bool(self.memory_limit and
+                    self.memory_usage() > self.memory_limit)
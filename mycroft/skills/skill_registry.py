@@ -0,0 +1,120 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from os.path import basename
+from threading import Lock
+
+# States of a skill in the registry
+UNLOADED = 'unloaded'
+LOADED = 'loaded'
+FAILED = 'failed'
+LAZY = 'lazy'  # Registered from its manifest, loaded on first use
+PROCESS = 'process'  # Running in a separate process
+
+
+class SkillRegistry(object):
+    """
+        The skills known to the SkillManager, indexed by path, id and name.
+
+        Each skill is a dict holding its state, the SkillManager stores the
+        skill instance, process etc. in it as well.
+    """
+    def __init__(self):
+        self.skills = {}  # By path
+        self._by_id = {}
+        self._by_name = {}
+        self.lock = Lock()
+
+    def add(self, path):
+        """
+            Get the skill in path, adding it to the registry if needed.
+
+            Args:
+                path (str): skill directory
+
+            Returns:
+                dict: the skill
+        """
+        with self.lock:
+            skill = self.skills.get(path)
+            if skill is None:
+                skill = {'id': basename(path), 'path': path,
+                         'state': UNLOADED}
+                self.skills[path] = skill
+                self._by_id[skill['id']] = skill
+            return skill
+
+    def set_name(self, skill, name):
+        """ Set the name of the skill, as given by the skill instance. """
+        with self.lock:
+            if self._by_name.get(skill.get('name')) is skill:
+                del self._by_name[skill['name']]
+            skill['name'] = name
+            if name:
+                self._by_name[name] = skill
+
+    def get(self, path):
+        return self.skills.get(path)
+
+    def get_by_id(self, skill_id):
+        return self._by_id.get(skill_id)
+
+    def get_by_name(self, name):
+        return self._by_name.get(name)
+
+    def find(self, skill_id=None, name=None, path=None):
+        """
+            Get the skills matching all of the given keys, all skills if
+            no key is given.
+
+            Returns:
+                list: the matching skills
+        """
+        if skill_id is not None:
+            skills = [self.get_by_id(skill_id)]
+        elif name is not None:
+            skills = [self.get_by_name(name)]
+        elif path is not None:
+            skills = [self.get(path)]
+        else:
+            with self.lock:
+                return list(self.skills.values())
+        return [s for s in skills if s is not None and
+                (name is None or s.get('name') == name) and
+                (path is None or s['path'] == path)]
+
+    @staticmethod
+    def info(skill):
+        """ Summary of the skill that can be sent on the messagebus. """
+        data = {
+            'id': skill['id'],
+            'path': skill['path'],
+            'name': skill.get('name'),
+            'state': skill['state'],
+            'last_modified': skill.get('last_modified'),
+            'load_time': None,
+            'handlers': None
+        }
+        if skill.get('profile'):
+            data['load_time'] = skill['profile'].total
+        stats = getattr(skill.get('instance'), 'handler_stats', None)
+        if stats is not None:
+            data['handlers'] = dict(stats)
+        return data
+
+    def __len__(self):
+        return len(self.skills)
+
+    def __iter__(self):
+        return iter(self.find())
@@ -16,8 +16,12 @@ import re
 import json
 import requests
 from abc import ABCMeta, abstractmethod
+from queue import Queue
+from threading import Thread
+from urllib.parse import urlencode
 from requests import post, exceptions
 from speech_recognition import Recognizer
+from websocket import WebSocketConnectionClosedException, create_connection
 
 from mycroft.api import STTApi
 from mycroft.configuration import Configuration
@@ -47,6 +51,241 @@ class STT(object):
     def execute(self, audio, language=None):
         pass
 
+    def start(self, sample_rate, sample_width, on_partial=None):
+        """
+            Start transcribing an utterance while it's being recorded.
+
+            Engines that can't stream wait for finish() and transcribe the
+            whole utterance at once.
+
+            Args:
+                sample_rate (int): samples per second of the audio fed
+                sample_width (int): bytes per sample of the audio fed
+                on_partial (callable): called with each partial hypothesis
+        """
+        pass
+
+    def feed(self, chunk):
+        """ Send the next chunk of audio of the utterance. """
+        pass
+
+    def finish(self, audio, language=None):
+        """
+            Get the transcription of a recorded utterance.
+
+            Args:
+                audio (AudioData): the whole utterance
+                language (str): language of the utterance
+
+            Returns:
+                str: the final hypothesis
+        """
+        return self.execute(audio, language)
+
+
+class STTStream(Thread):
+    """
+        An utterance streamed to an engine while it's being recorded.
+
+        The audio fed is queued and sent from this thread, the listener
+        never waits for the network.
+
+        Args:
+            stt (StreamingSTT): engine transcribing the audio
+            sample_rate (int): samples per second of the audio
+            sample_width (int): bytes per sample of the audio
+            on_partial (callable): called with each partial hypothesis
+    """
+    def __init__(self, stt, sample_rate, sample_width, on_partial=None):
+        super(STTStream, self).__init__()
+        self.daemon = True
+        self.stt = stt
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.on_partial = on_partial
+        self.queue = Queue()
+        self.fed = 0  # Bytes of audio fed
+        self.cancelled = False
+        self.text = None
+        self.error = None
+
+    def feed(self, chunk):
+        self.fed += len(chunk)
+        self.queue.put(chunk)
+
+    def end(self):
+        """ No more audio will be fed. """
+        self.queue.put(None)
+
+    def cancel(self):
+        """ Stop streaming, the transcription isn't needed anymore. """
+        self.cancelled = True
+        self.end()
+
+    def chunks(self):
+        """ The audio as it's fed, until the end of the utterance. """
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def partial(self, text):
+        """ Report a partial hypothesis of the engine. """
+        LOG.debug("Partial STT: " + text)
+        if self.on_partial and not self.cancelled:
+            self.on_partial(text)
+
+    def run(self):
+        try:
+            self.text = self.stt.stream(self)
+        except Exception as e:
+            self.error = e
+
+
+class StreamingSTT(STT):
+    """
+        Engine transcribing the audio while it's being recorded, so the
+        final hypothesis is ready soon after the user stops talking.
+
+        The utterance is transcribed at once when it wasn't streamed or the
+        streaming failed.
+    """
+    __metaclass__ = ABCMeta
+
+    # Seconds to wait for the final hypothesis after the end of the audio
+    STREAM_TIMEOUT = 10.0
+
+    def __init__(self):
+        super(StreamingSTT, self).__init__()
+        self.current_stream = None
+
+    def can_stream(self):
+        return True
+
+    def start(self, sample_rate, sample_width, on_partial=None):
+        if self.current_stream:
+            # Never finished, like utterances too short to transcribe
+            self.current_stream.cancel()
+            self.current_stream = None
+        if self.can_stream():
+            self.current_stream = STTStream(self, sample_rate, sample_width,
+                                            on_partial)
+            self.current_stream.start()
+
+    def feed(self, chunk):
+        stream = self.current_stream
+        if stream:
+            stream.feed(chunk)
+
+    def finish(self, audio, language=None):
+        stream, self.current_stream = self.current_stream, None
+        language = language or self.lang
+        if stream is None or language != self.lang:
+            return self.execute(audio, language)
+        if stream.fed != len(audio.frame_data):
+            # Streaming the next utterance started already
+            stream.cancel()
+            return self.execute(audio, language)
+
+        stream.end()
+        stream.join(self.STREAM_TIMEOUT)
+        if stream.is_alive():
+            stream.cancel()
+            LOG.warning("Streaming STT timed out")
+        elif stream.error is not None:
+            LOG.warning("Streaming STT failed: {}".format(repr(stream.error)))
+        else:
+            return stream.text
+        return self.execute(audio, language)
+
+    @abstractmethod
+    def stream(self, stream):
+        """
+            Transcribe the audio of a stream, reporting partial hypotheses.
+
+            Args:
+                stream (STTStream): the utterance, its chunks() end with the
+                                    audio
+
+            Returns:
+                str: the final hypothesis
+        """
+        pass
+
+
+class WebsocketSTT(StreamingSTT):
+    """
+        Engine streaming raw audio to a websocket server, configured with
+        "stream_uri". The audio is sent in binary messages followed by the
+        text message "EOS", the server answers with JSON messages holding
+        the hypotheses and closes the connection after the last one.
+    """
+    __metaclass__ = ABCMeta
+
+    # Seconds without messages from the server before giving up
+    SOCKET_TIMEOUT = 30.0
+
+    def can_stream(self):
+        return bool(self.config.get("stream_uri"))
+
+    def stream_uri(self, stream):
+        return self.config.get("stream_uri")
+
+    @abstractmethod
+    def parse_message(self, message):
+        """
+            Read a message from the server.
+
+            Returns:
+                tuple: the hypothesis and whether it's final, None if the
+                       message has no hypothesis
+        """
+        pass
+
+    @staticmethod
+    def _send(ws, stream):
+        try:
+            for chunk in stream.chunks():
+                if stream.cancelled:
+                    break
+                ws.send_binary(chunk)
+            if stream.cancelled:
+                ws.abort()  # Wakes up the thread receiving
+            else:
+                ws.send("EOS")
+        except Exception as e:
+            LOG.debug("Streaming STT stopped sending: {}".format(repr(e)))
+
+    def stream(self, stream):
+        ws = create_connection(self.stream_uri(stream),
+                               timeout=self.SOCKET_TIMEOUT)
+        sender = Thread(target=self._send, args=(ws, stream))
+        sender.daemon = True
+        sender.start()
+
+        # The server can split the utterance into several final segments
+        segments = []
+        try:
+            while True:
+                try:
+                    message = ws.recv()
+                except WebSocketConnectionClosedException:
+                    break
+                if not message:
+                    break
+                hypothesis = self.parse_message(message)
+                if hypothesis is None:
+                    continue
+                text, final = hypothesis
+                if final:
+                    segments.append(text)
+                else:
+                    stream.partial(" ".join(segments + [text]).strip())
+        finally:
+            ws.close()
+        return " ".join(segments).strip()
+
 
 class TokenSTT(STT):
     __metaclass__ = ABCMeta
@@ -148,15 +387,23 @@ class MycroftDeepSpeechSTT(STT):
         return self.api.stt(audio.get_wav_data(), self.lang, 1)
 
 
-class DeepSpeechServerSTT(STT):
+class DeepSpeechServerSTT(WebsocketSTT):
     """
         STT interface for the deepspeech-server:
         https://github.com/MainRo/deepspeech-server
         use this if you want to host DeepSpeech yourself
+
+        A server with a streaming websocket endpoint can be set as
+        "stream_uri". It gets 16 bit mono audio at the rate given in the
+        "rate" parameter and answers {"text": ..., "final": ...} messages.
     """
     def __init__(self):
         super(DeepSpeechServerSTT, self).__init__()
 
+    def can_stream(self):
+        return (super(DeepSpeechServerSTT, self).can_stream() and
+                self.lang.startswith("en"))
+
     def execute(self, audio, language=None):
         language = language or self.lang
         if not language.startswith("en"):
@@ -164,8 +411,25 @@ class DeepSpeechServerSTT(STT):
         response = post(self.config.get("uri"), data=audio.get_wav_data())
         return response.text
 
+    def stream_uri(self, stream):
+        if stream.sample_width != 2:
+            raise ValueError("Deepspeech needs 16 bit audio")
+        return (self.config.get("stream_uri") + "?" +
+                urlencode({"rate": stream.sample_rate}))
+
+    def parse_message(self, message):
+        result = json.loads(message)
+        return result["text"], result.get("final", False)
 
-class KaldiSTT(STT):
+
+class KaldiSTT(WebsocketSTT):
+    """
+        STT interface for the kaldi-gstreamer-server:
+        https://github.com/alumae/kaldi-gstreamer-server
+
+        Its websocket API, e.g. ws://localhost:8080/client/ws/speech, can be
+        set as "stream_uri" to transcribe while the user is speaking.
+    """
     def __init__(self):
         super(KaldiSTT, self).__init__()
 
@@ -177,10 +441,61 @@ class KaldiSTT(STT):
     def get_response(self, response):
         try:
             hypotheses = response.json()["hypotheses"]
-            return re.sub(r'\s*\[noise\]\s*', '', hypotheses[0]["utterance"])
+            return self.clean(hypotheses[0]["utterance"])
         except:
             return None
 
+    @staticmethod
+    def clean(utterance):
+        return re.sub(r'\s*\[noise\]\s*', '', utterance)
+
+    def stream_uri(self, stream):
+        content_type = ("audio/x-raw, layout=(string)interleaved, "
+                        "rate=(int){}, format=(string)S{}LE, "
+                        "channels=(int)1").format(stream.sample_rate,
+                                                  8 * stream.sample_width)
+        return (self.config.get("stream_uri") + "?" +
+                urlencode({"content-type": content_type}))
+
+    def parse_message(self, message):
+        response = json.loads(message)
+        if response["status"] != 0:
+            raise ValueError("Kaldi status {}: {}".format(
+                response["status"], response.get("message")))
+        if "result" not in response:
+            return None  # e.g. adaptation state
+        result = response["result"]
+        return (self.clean(result["hypotheses"][0]["transcript"]),
+                result.get("final", False))
+
+
+class MockStreamingSTT(StreamingSTT):
+    """
+        Local engine trying out streaming without a server, it hears the
+        configured "utterance" one word per "word_sec" seconds of audio.
+    """
+    def __init__(self):
+        super(MockStreamingSTT, self).__init__()
+        self.utterance = self.config.get("utterance", "what time is it")
+        self.word_sec = self.config.get("word_sec", 0.3)
+
+    def execute(self, audio, language=None):
+        return self.utterance
+
+    def stream(self, stream):
+        words = self.utterance.split()
+        bytes_per_word = (self.word_sec * stream.sample_rate *
+                          stream.sample_width)
+        heard = 0
+        received = 0
+        for chunk in stream.chunks():
+            received += len(chunk)
+            num_words = min(int(received / bytes_per_word), len(words))
+            if num_words > heard:
+                heard = num_words
+                stream.partial(" ".join(words[:heard]))
+        return self.utterance
+
 
 class BingSTT(TokenSTT):
     def __init__(self):
@@ -212,7 +527,8 @@ class STTFactory(object):
         "bing": BingSTT,
         "houndify": HoundifySTT,
         "deepspeech_server": DeepSpeechServerSTT,
-        "mycroft_deepspeech": MycroftDeepSpeechSTT
+        "mycroft_deepspeech": MycroftDeepSpeechSTT,
+        "mock": MockStreamingSTT
     }
 
     @staticmethod
@@ -41,10 +41,8 @@ def send_playback_metric(stopwatch, ident):
         Send playback metrics in a background thread
     """
 
-    def do_send(stopwatch, ident):
-        report_timing(ident, 'speech_playback', stopwatch)
-
-    t = Thread(target=do_send, args=(stopwatch, ident))
+    t = Thread(target=report_timing,
+               args=(ident, 'speech_playback', stopwatch))
     t.daemon = True
     t.start()
 
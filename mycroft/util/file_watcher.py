@@ -0,0 +1,289 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Watch a directory tree for changes.
+
+The watchers report which top level subdirectories of the watched
+directory changed, for example which skills in the skills directory.
+On Linux inotify is used, elsewhere (or when inotify fails, for example
+because the watch limit is reached) the tree is polled.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from abc import ABCMeta, abstractmethod
+from os.path import join, isdir, getmtime
+
+from mycroft.util.log import LOG
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+              IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def ignore_file(name):
+    """ Default filter, ignores compiled python, hidden files and the
+    settings.json file which skills write themselves.
+    """
+    return (name.startswith('.') or name.endswith('.pyc') or
+            name == 'settings.json' or name == '__pycache__')
+
+
+class FileWatcher(object):
+    """ Base class for the watchers.
+
+    Args:
+        path (str): directory to watch
+        ignore (function): takes a file or directory name, returns True if
+                           changes to it should be ignored
+        debounce (float): seconds without changes before changes are
+                          reported, merges the burst of events caused by
+                          editors and git checkouts
+        max_delay (float): report changes after this many seconds even if
+                           events keep coming
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, path, ignore=ignore_file, debounce=1.0,
+                 max_delay=10.0):
+        self.path = path
+        self.ignore = ignore
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+    def _top_level(self, path):
+        """ Get the top level subdirectory containing path or None. """
+        rel = os.path.relpath(path, self.path)
+        if rel == '.' or rel.startswith('..'):
+            return None
+        name = rel.split(os.sep)[0]
+        return None if self.ignore(name) else join(self.path, name)
+
+    @abstractmethod
+    def _read(self, timeout):
+        """ Wait up to timeout seconds for changes.
+
+        Returns:
+            set: changed top level directories, may be empty
+        """
+        pass
+
+    def wait(self, timeout=None):
+        """ Wait for changes and return when they have settled.
+
+        Args:
+            timeout (float): seconds to wait for the first change,
+                             None to wait forever
+
+        Returns:
+            set: paths of the changed top level directories, empty if
+                 nothing changed before the timeout
+        """
+        changed = self._read(timeout)
+        if not changed:
+            return changed
+        deadline = time.time() + self.max_delay
+        while time.time() < deadline:
+            more = self._read(min(self.debounce, deadline - time.time()))
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def close(self):
+        pass
+
+
+class PollingWatcher(FileWatcher):
+    """ Detect changes by comparing modification times of the files.
+
+    Args:
+        interval (float): seconds between scans of the directory tree
+    """
+    def __init__(self, path, ignore=ignore_file, debounce=1.0,
+                 max_delay=10.0, interval=2.0):
+        super(PollingWatcher, self).__init__(path, ignore, debounce,
+                                             max_delay)
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _state(self, directory):
+        """ Newest modification time and number of files in directory. """
+        last = 0
+        count = 0
+        for root_dir, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if not self.ignore(d)]
+            for f in files:
+                if not self.ignore(f):
+                    try:
+                        last = max(last, getmtime(join(root_dir, f)))
+                        count += 1
+                    except OSError:
+                        pass  # Removed during the scan
+        return last, count
+
+    def _scan(self):
+        snapshot = {}
+        if not isdir(self.path):
+            return snapshot
+        for name in os.listdir(self.path):
+            path = join(self.path, name)
+            if not self.ignore(name) and isdir(path):
+                try:
+                    snapshot[path] = self._state(path)
+                except OSError:
+                    pass
+        return snapshot
+
+    def _read(self, timeout):
+        if timeout is not None:
+            time.sleep(min(self.interval, timeout))
+        else:
+            time.sleep(self.interval)
+        snapshot = self._scan()
+        changed = {path for path in set(snapshot) | set(self.snapshot)
+                   if snapshot.get(path) != self.snapshot.get(path)}
+        self.snapshot = snapshot
+        return changed
+
+
+class InotifyWatcher(FileWatcher):
+    """ Detect changes using the Linux inotify API.
+
+    Every directory in the tree is watched, directories created later are
+    added as their creation is reported.
+
+    Raises:
+        OSError: if inotify is unavailable or the tree can't be watched
+    """
+    def __init__(self, path, ignore=ignore_file, debounce=1.0,
+                 max_delay=10.0):
+        super(InotifyWatcher, self).__init__(path, ignore, debounce,
+                                             max_delay)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+        try:
+            self._add_tree(path)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory),
+                                         WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, 'Could not watch {}: {}'.format(
+                directory, os.strerror(err)))
+        self.watches[wd] = directory
+
+    def _add_tree(self, directory):
+        self._add_watch(directory)
+        for root_dir, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if not self.ignore(d)]
+            for d in dirs:
+                self._add_watch(join(root_dir, d))
+
+    def _read(self, timeout):
+        try:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+        except InterruptedError:
+            return set()
+        if not readable:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, report everything as changed
+                LOG.warning('inotify queue overflow in ' + self.path)
+                changed |= {join(self.path, d) for d in os.listdir(self.path)
+                            if not self.ignore(d)}
+                continue
+            directory = self.watches.get(wd)
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            if directory is None:
+                continue
+            name = os.fsdecode(name)
+            if name and self.ignore(name):
+                continue
+            path = join(directory, name) if name else directory
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    self._add_tree(path)
+                except OSError as e:
+                    LOG.warning(str(e))
+            top_level = self._top_level(path)
+            if top_level:
+                changed.add(top_level)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_file_watcher(path, backend='auto', interval=2.0, **kwargs):
+    """ Create the best available watcher for path.
+
+    Args:
+        path (str): directory to watch
+        backend (str): 'inotify', 'poll' or 'auto' to use inotify when
+                       available and polling otherwise
+        interval (float): seconds between scans when polling
+        kwargs: passed to the watcher
+
+    Returns:
+        FileWatcher: the watcher
+    """
+    if backend in ('auto', 'inotify'):
+        try:
+            return InotifyWatcher(path, **kwargs)
+        except (OSError, AttributeError, TypeError) as e:
+            # AttributeError / TypeError if libc lacks inotify
+            LOG.warning('inotify not available ({}), polling {} '
+                        'instead'.format(e, path))
+    return PollingWatcher(path, interval=interval, **kwargs)
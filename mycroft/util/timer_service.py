@@ -0,0 +1,158 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Timers and background calls sharing a few threads.
+
+Instead of starting a threading.Timer or Thread for every delayed or
+background call, the calls are queued with the TimerService of the
+process. A single thread waits for the next timer to expire and hands the
+calls to a small pool of worker threads, so a slow call doesn't hold up
+the other timers.
+
+The pool is shared by the whole process, calls should be short. Calls
+that block for seconds, like network requests or waiting for speech,
+belong in a thread of their own.
+"""
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from threading import Condition, Event, Lock, Thread
+
+import monotonic
+
+from mycroft.util.log import LOG
+
+
+class TimerHandle(object):
+    """ A call queued with the TimerService, replaces threading.Timer. """
+    def __init__(self, due, func, args, kwargs):
+        self.due = due
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.running = False
+        self.finished = Event()
+        self._lock = Lock()
+
+    def cancel(self):
+        """ Stop the call from being made if it hasn't started yet. """
+        with self._lock:
+            self.cancelled = True
+            if not self.running:
+                self.finished.set()
+
+    def wait(self, timeout=None):
+        """
+            Wait until the call has been made or cancelled.
+
+            Returns:
+                bool: False if the timeout expired first
+        """
+        return self.finished.wait(timeout)
+
+    def run(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.running = True
+        try:
+            self.func(*self.args, **self.kwargs)
+        except Exception:
+            LOG.exception('Error in timer {}'.format(self.func))
+        finally:
+            self.finished.set()
+
+
+class TimerService(object):
+    """
+        Makes delayed calls from a shared timer thread and worker pool.
+
+        Args:
+            max_workers (int): number of threads making the calls
+    """
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self, max_workers=2):
+        self._heap = []
+        self._counter = count()
+        self._changed = Condition(Lock())
+        self._stopped = False
+        self.executor = ThreadPoolExecutor(max_workers)
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @classmethod
+    def get(cls):
+        """ Get the timer service shared by this process. """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def call_later(self, delay, func, *args, **kwargs):
+        """
+            Call func(*args, **kwargs) after delay seconds.
+
+            Returns:
+                TimerHandle: handle to cancel or wait for the call
+        """
+        timer = TimerHandle(monotonic.monotonic() + delay, func, args,
+                            kwargs)
+        with self._changed:
+            heapq.heappush(self._heap, (timer.due, next(self._counter),
+                                        timer))
+            # Wake the thread if the new timer is the next to expire
+            if self._heap[0][2] is timer:
+                self._changed.notify()
+        return timer
+
+    def submit(self, func, *args, **kwargs):
+        """
+            Call func(*args, **kwargs) in the background.
+
+            Returns:
+                TimerHandle: handle to wait for the call
+        """
+        timer = TimerHandle(monotonic.monotonic(), func, args, kwargs)
+        self.executor.submit(timer.run)
+        return timer
+
+    def shutdown(self):
+        """ Stop the timer thread, pending timers are dropped. """
+        with self._changed:
+            self._stopped = True
+            self._changed.notify()
+        self._thread.join()
+        self.executor.shutdown(wait=False)
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while not self._stopped:
+                    if self._heap:
+                        timeout = self._heap[0][0] - monotonic.monotonic()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._changed.wait(timeout)
+                if self._stopped:
+                    return
+                _, _, timer = heapq.heappop(self._heap)
+            if not timer.cancelled:
+                self.executor.submit(timer.run)
@@ -48,6 +48,10 @@ function help() {
   echo "  skill_container <skill>  container for running a single skill"
   echo "  audiotest                attempt simple audio validation"
   echo "  audioaccuracytest        more complex audio validation"
+  echo "  intentbenchmark          measure intent matching performance"
+  echo "  isolationbenchmark       compare skills in one or many processes"
+  echo "  schedulerbenchmark       measure event scheduler performance"
+  echo "  vadbenchmark             measure end of speech detection delay"
   echo "  sdkdoc                   generate sdk documentation"
   echo
   echo "Examples:"
@@ -70,6 +74,10 @@ function name-to-script-path() {
     "skill_container") _script=${DIR}/mycroft/skills/container.py ;;
     "audiotest")       _script=${DIR}/mycroft/util/audio_test.py ;;
     "audioaccuracytest") _script=${DIR}/mycroft/audio-accuracy-test/audio_accuracy_test.py ;;
+    "intentbenchmark") _script=${DIR}/mycroft/skills/intent_benchmark.py ;;
+    "isolationbenchmark") _script=${DIR}/mycroft/skills/isolation_benchmark.py ;;
+    "schedulerbenchmark") _script=${DIR}/mycroft/skills/scheduler_benchmark.py ;;
+    "vadbenchmark")    _script=${DIR}/mycroft/client/speech/vad_benchmark.py ;;
     "sdkdoc")          _script=${DIR}/doc/generate_sdk_docs.py ;;
     "enclosure")       _script=${DIR}/mycroft/client/enclosure/main.py ;;
 
@@ -171,6 +179,18 @@ case ${_opt} in
   "audioaccuracytest")
     launch-process ${_opt}
     ;;
+  "intentbenchmark")
+    launch-process ${_opt}
+    ;;
+  "isolationbenchmark")
+    launch-process ${_opt}
+    ;;
+  "schedulerbenchmark")
+    launch-process ${_opt}
+    ;;
+  "vadbenchmark")
+    launch-process ${_opt}
+    ;;
   "sdkdoc")
     launch-process ${_opt}
     ;;
@@ -0,0 +1,157 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import unittest
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import mock
+from speech_recognition import AudioData, AudioSource
+
+from mycroft.client.speech.audio_buffer import (
+    AudioBuffer, RingBuffer, write_wav
+)
+from mycroft.client.speech.mic import ResponsiveRecognizer
+
+
+class MockStream(object):
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read(self, size, of_exc=False):
+        return self.chunks.pop(0)
+
+
+class MockSource(AudioSource):
+    def __init__(self, chunks):
+        self.stream = MockStream(chunks)
+        self.CHUNK = 1024
+        self.SAMPLE_RATE = 16000
+        self.SAMPLE_WIDTH = 2
+
+
+class MockHotWord(object):
+    """ Finds the wake word on the given check. """
+    key_phrase = 'hey mycroft'
+    num_phonemes = 5
+
+    def __init__(self, found_on_check):
+        self.found_on_check = found_on_check
+        self.checked = []
+
+    def update(self, chunk):
+        pass
+
+    def found_wake_word(self, frame_data):
+        self.checked.append(frame_data)
+        return len(self.checked) == self.found_on_check
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_append(self):
+        ring = RingBuffer(10)
+        ring.append(b'abc')
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.get(), b'abc')
+        ring.append(b'defghij')
+        self.assertEqual(ring.get(), b'abcdefghij')
+        # Wraps around, dropping the oldest audio
+        ring.append(b'klm')
+        self.assertEqual(len(ring), 10)
+        self.assertEqual(ring.get(), b'defghijklm')
+        self.assertEqual(ring.get(4), b'jklm')
+        self.assertEqual(ring.get(4, b'00'), b'jklm00')
+        self.assertEqual(b''.join(ring.views(5)), b'ijklm')
+        # Chunks bigger than the buffer keep their end
+        ring.append(b'0123456789abc')
+        self.assertEqual(ring.get(), b'3456789abc')
+        ring.clear()
+        self.assertEqual(ring.get(), b'')
+
+
+class AudioBufferTest(unittest.TestCase):
+    def test_append(self):
+        audio = AudioBuffer(b'ab')
+        audio.append(b'cd')
+        audio.append(b'efg')
+        self.assertEqual(len(audio), 7)
+        self.assertEqual(audio.get(), b'abcdefg')
+        self.assertIs(audio.get(), audio.get())
+        audio.append(b'h')
+        self.assertEqual(audio.get(), b'abcdefgh')
+        audio.clear()
+        self.assertEqual(audio.get(), b'')
+
+    def test_write_wav(self):
+        tmp_dir = mkdtemp()
+        self.addCleanup(rmtree, tmp_dir)
+        filename = os.path.join(tmp_dir, 'audio.wav')
+        chunks = [os.urandom(2048) for _ in range(5)]
+        write_wav(filename, chunks, 16000, 2)
+        with open(filename, 'rb') as f:
+            wav_data = f.read()
+        audio = AudioData(b''.join(chunks), 16000, 2)
+        self.assertEqual(wav_data, audio.get_wav_data())
+
+
+class WakeWordWindowTest(unittest.TestCase):
+    def test_wake_word_window(self):
+        chunks = [os.urandom(2048) for _ in range(200)]
+        hot_word = MockHotWord(found_on_check=40)
+        recognizer = ResponsiveRecognizer(hot_word)
+        recognizer.save_wake_words = False
+        recognizer._skip_wake_word = mock.Mock(return_value=False)
+        source = MockSource(chunks)
+
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        recognizer._wait_until_wake_word(source, sec_per_buffer)
+
+        # The tested audio is the end of what was heard plus silence
+        heard = b''.join(chunks[:len(chunks) - len(source.stream.chunks)])
+        test_size = recognizer.sec_to_bytes(recognizer.TEST_WW_SEC, source)
+        silence_size = recognizer.sec_to_bytes(recognizer.SILENCE_SEC,
+                                               source)
+        self.assertEqual(len(hot_word.checked), 40)
+        self.assertEqual(hot_word.checked[-1],
+                         heard[-test_size:] + b'\0' * silence_size)
+
+
+class RecordPhraseTest(unittest.TestCase):
+    def test_record_phrase(self):
+        loud = [os.urandom(2048) for _ in range(20)]
+        quiet = [b'\0' * 2048 for _ in range(100)]
+        recognizer = ResponsiveRecognizer(MockHotWord(0))
+        source = MockSource(loud + quiet)
+
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        audio = recognizer._record_phrase(source, sec_per_buffer)
+
+        recorded = len(loud) + len(quiet) - len(source.stream.chunks)
+        self.assertLess(recorded, len(loud) + len(quiet))
+        self.assertEqual(audio.get(),
+                         b'\0\0' + b''.join((loud + quiet)[:recorded]))
+
+    def test_stream(self):
+        loud = [os.urandom(2048) for _ in range(20)]
+        quiet = [b'\0' * 2048 for _ in range(100)]
+        recognizer = ResponsiveRecognizer(MockHotWord(0))
+        source = MockSource(loud + quiet)
+        stt = mock.Mock()
+
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        audio = recognizer._record_phrase(source, sec_per_buffer, stt)
+        # The STT engine gets the audio as it's recorded
+        fed = b''.join(c[0][0] for c in stt.feed.call_args_list)
+        self.assertEqual(fed, audio.get())
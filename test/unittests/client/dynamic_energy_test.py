@@ -15,70 +15,26 @@
 import audioop
 import unittest
 
-from speech_recognition import AudioSource
-
-from mycroft.client.speech.mic import ResponsiveRecognizer
-
-
-class MockStream(object):
-    def __init__(self):
-        self.chunks = []
-
-    def inject(self, chunk):
-        self.chunks.append(chunk)
-
-    def read(self, chunk_size):
-        result = self.chunks[0]
-        if len(self.chunks) > 1:
-            self.chunks = self.chunks[1:]
-        return result
-
-
-class MockSource(AudioSource):
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc_value, traceback):
-        pass
-
-    def __init__(self, stream=None):
-        self.stream = stream if stream else MockStream()
-        self.CHUNK = 1024
-        self.SAMPLE_RATE = 16000
-        self.SAMPLE_WIDTH = 2
+from mycroft.client.speech.vad import EnergyVad
 
 
 class DynamicEnergytest(unittest.TestCase):
-    def setUp(self):
-        pass
-
-    @unittest.skip('Disabled while unittests are brought upto date')
     def testMaxAudioWithBaselineShift(self):
-        low_base = b"".join(["\x10\x00\x01\x00"] * 100)
-        higher_base = b"".join(["\x01\x00\x00\x01"] * 100)
-
-        source = MockSource()
-
-        for i in xrange(100):
-            source.stream.inject(low_base)
-
-        source.stream.inject(higher_base)
-        recognizer = ResponsiveRecognizer(None)
+        low_base = b"".join([b"\x10\x00\x01\x00"] * 256)
+        higher_base = b"".join([b"\x01\x00\x00\x01"] * 256)
 
-        sec_per_buffer = float(source.CHUNK) / (source.SAMPLE_RATE *
-                                                source.SAMPLE_WIDTH)
+        vad = EnergyVad({'energy_ratio': 1.5}, 16000, 2)
+        for i in range(100):
+            vad.calibrate(low_base)
 
         test_seconds = 30.0
         while test_seconds > 0:
-            test_seconds -= sec_per_buffer
-            data = source.stream.read(source.CHUNK)
-            energy = recognizer.calc_energy(data, source.SAMPLE_WIDTH)
-            recognizer.adjust_threshold(energy, sec_per_buffer)
+            test_seconds -= vad.seconds(higher_base)
+            vad.calibrate(higher_base)
 
-        higher_base_energy = audioop.rms(higher_base, source.SAMPLE_WIDTH)
+        higher_base_energy = audioop.rms(higher_base, 2)
         # after recalibration (because of max audio length) new threshold
         # should be >= 1.5 * higher_base_energy
-        delta_below_threshold = (
-            recognizer.energy_threshold - higher_base_energy)
+        delta_below_threshold = vad.threshold - higher_base_energy
         min_delta = higher_base_energy * .5
         assert abs(delta_below_threshold - min_delta) < 1
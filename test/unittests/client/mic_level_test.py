@@ -0,0 +1,72 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+import unittest
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from mycroft.client.speech.mic_level import (
+    SEQ, MicLevelReader, MicLevelWriter
+)
+
+
+class MicLevelTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = mkdtemp()
+        self.addCleanup(rmtree, tmp_dir)
+        self.filename = join(tmp_dir, 'mic_level.mmap')
+
+    def test_read_write(self):
+        writer = MicLevelWriter(self.filename)
+        self.addCleanup(writer.close)
+        reader = MicLevelReader(self.filename)
+        self.addCleanup(reader.close)
+        self.assertIsNone(reader.read())
+
+        writer.write(4.5, 1.5)
+        level = reader.read()
+        self.assertEqual(level.energy, 4.5)
+        self.assertEqual(level.threshold, 1.5)
+        self.assertAlmostEqual(level.timestamp, time.time(), delta=1)
+
+        writer.write(8.0, 2.0)
+        self.assertEqual(reader.read().energy, 8.0)
+        self.assertGreater(reader.read().seq, level.seq)
+
+    def test_update_in_progress(self):
+        writer = MicLevelWriter(self.filename)
+        self.addCleanup(writer.close)
+        writer.write(4.5, 1.5)
+        reader = MicLevelReader(self.filename)
+        self.addCleanup(reader.close)
+        # An odd sequence number marks a half written record
+        SEQ.pack_into(writer._map, 0, writer.seq + 1)
+        self.assertIsNone(reader.read())
+
+    def test_restart_writer(self):
+        writer = MicLevelWriter(self.filename)
+        writer.write(4.5, 1.5)
+        reader = MicLevelReader(self.filename)
+        self.addCleanup(reader.close)
+        seq = reader.read().seq
+        writer.close()
+
+        # A new listener keeps counting so readers notice the updates
+        writer = MicLevelWriter(self.filename)
+        self.addCleanup(writer.close)
+        writer.write(3.0, 1.0)
+        self.assertGreater(reader.read().seq, seq)
+        self.assertEqual(reader.read().energy, 3.0)
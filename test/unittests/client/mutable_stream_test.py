@@ -0,0 +1,102 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+import unittest
+import wave
+from os.path import dirname, join
+from threading import Thread
+
+from mycroft.client.speech.mic import (
+    FileMicrophone, FileStream, MutableStream
+)
+
+DATA_DIR = join(dirname(__file__), 'data')
+
+
+def read_wav(name):
+    wav = wave.open(join(DATA_DIR, name), 'rb')
+    try:
+        return wav.readframes(wav.getnframes())
+    finally:
+        wav.close()
+
+
+class FileMicrophoneTest(unittest.TestCase):
+    def test_read(self):
+        frames = read_wav('hey_mycroft.wav')
+        mic = FileMicrophone(join(DATA_DIR, 'hey_mycroft.wav'),
+                             realtime=False)
+        with mic as source:
+            self.assertEqual(source.SAMPLE_RATE, 16000)
+            self.assertEqual(source.SAMPLE_WIDTH, 2)
+            # Reads don't need to line up with the chunks
+            audio = b''.join(source.stream.read(size)
+                             for size in (1000, 24, 3000, 20000, 23976))
+            self.assertEqual(audio, frames)
+            # After the file silence is recorded
+            self.assertEqual(source.stream.read(2048), b'\0' * 4096)
+            self.assertTrue(source.stream.finished.is_set())
+            self.assertEqual(source.stream.stats()['dropped'], 0)
+
+    def test_mute(self):
+        mic = FileMicrophone(join(DATA_DIR, 'hey_mycroft.wav'),
+                             realtime=False)
+        mic.mute()
+        with mic as source:
+            self.assertEqual(source.stream.read(1024), b'\0\0')
+            mic.unmute()
+            self.assertEqual(len(source.stream.read(1024)), 2048)
+        self.assertFalse(mic.is_muted())
+
+
+class MutableStreamTest(unittest.TestCase):
+    def test_keep_newest(self):
+        stream = MutableStream(2, 16000, 2, max_chunks=3)
+        for i in range(5):
+            stream._push(bytes([i]) * 4)
+        self.assertEqual(stream.stats()['dropped'], 2)
+        self.assertEqual(stream.read(6), b'\x02' * 4 + b'\x03' * 4 +
+                         b'\x04' * 4)
+
+    def test_wake_reader(self):
+        stream = MutableStream(2, 16000, 2)
+        read = []
+        reader = Thread(target=lambda: read.append(stream.read(2)))
+        reader.start()
+        time.sleep(0.1)
+        start = time.time()
+        stream._push(b'\x01' * 4)
+        reader.join(stream.READ_TIMEOUT)
+        # The waiting reader is woken by the chunk, not the read timeout
+        self.assertLess(time.time() - start, stream.READ_TIMEOUT / 2)
+        self.assertEqual(read, [b'\x01' * 4])
+
+
+class FileStreamTest(unittest.TestCase):
+    def test_drop_oldest(self):
+        # 10 ms chunks, a second of audio when nobody reads the stream
+        stream = FileStream(join(DATA_DIR, 'record.wav'), chunk_size=160,
+                            max_chunks=5)
+        try:
+            self.assertTrue(stream.finished.wait(5))
+            stats = stream.stats()
+            self.assertGreaterEqual(stats['dropped'], 90)
+            self.assertEqual(stats['overflows'], 0)
+            # Lost audio is only raised when asked for
+            self.assertRaises(IOError, stream.read, 160, True)
+            self.assertEqual(len(stream.read(160)), 320)
+            self.assertGreater(stream.stats()['max_latency'], 0.0)
+        finally:
+            stream.close()
@@ -0,0 +1,130 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+import wave
+from os.path import dirname, join
+
+import numpy as np
+
+from mycroft.client.speech.vad import EnergyVad, SpectralVad, VadFactory
+
+DATA_DIR = join(dirname(__file__), 'data')
+
+RATE = 16000
+CHUNK_BYTES = 2048
+
+
+def noise(seconds, level, seed=0):
+    samples = np.random.RandomState(seed).normal(0, level,
+                                                 int(seconds * RATE))
+    return samples.astype('<i2').tobytes()
+
+
+def tone(seconds, level, freq=300):
+    t = np.arange(int(seconds * RATE)) / float(RATE)
+    return (np.sin(2 * np.pi * freq * t) * level).astype('<i2').tobytes()
+
+
+def mix(*parts):
+    samples = [np.frombuffer(p, dtype='<i2').astype(int) for p in parts]
+    return np.clip(sum(samples), -32768, 32767).astype('<i2').tobytes()
+
+
+def chunks(audio):
+    return [audio[i:i + CHUNK_BYTES]
+            for i in range(0, len(audio), CHUNK_BYTES)]
+
+
+class VadFactoryTest(unittest.TestCase):
+    def test_create(self):
+        vad = VadFactory.create({'vad': {'module': 'spectral'}}, RATE, 2)
+        self.assertIsInstance(vad, SpectralVad)
+        self.assertIsInstance(VadFactory.create({}, RATE, 2), EnergyVad)
+
+    def test_fallback(self):
+        vad = VadFactory.create({'vad': {'module': 'unknown'}}, RATE, 2)
+        self.assertIsInstance(vad, EnergyVad)
+        # Unsupported audio falls back too
+        vad = VadFactory.create({'vad': {'module': 'spectral'}}, RATE, 1)
+        self.assertIsInstance(vad, EnergyVad)
+
+
+class EnergyVadTest(unittest.TestCase):
+    def test_process(self):
+        vad = EnergyVad({}, RATE, 2)
+        for chunk in chunks(noise(1, 100)):
+            vad.calibrate(chunk)
+        vad.start_phrase()
+        self.assertEqual(vad.process(noise(0.05, 100)), (0.0, 0.05))
+        self.assertEqual(vad.process(tone(0.05, 5000)), (0.05, 0.0))
+        # Silence counts once the noise counter is back at zero
+        self.assertEqual(vad.process(noise(0.05, 100)), (0.0, 0.0))
+        self.assertEqual(vad.process(noise(0.05, 100)), (0.0, 0.05))
+
+
+class SpectralVadTest(unittest.TestCase):
+    def setUp(self):
+        self.vad = SpectralVad({}, RATE, 2)
+        for chunk in chunks(noise(1, 300)):
+            self.vad.calibrate(chunk)
+
+    def test_trailing_silence(self):
+        # 40 ms of speech, then 60 ms of background
+        chunk = mix(noise(0.1, 300, seed=1),
+                    tone(0.04, 3000) + b'\0\0' * int(0.06 * RATE))
+        speech, silence = self.vad.process(chunk)
+        self.assertAlmostEqual(speech, 0.04)
+        self.assertAlmostEqual(silence, 0.06)
+
+    def test_frames_across_chunks(self):
+        # Samples of a partial frame are kept for the next chunk
+        audio = noise(0.1, 300, seed=1)
+        speech, silence = self.vad.process(audio[:500])
+        self.assertEqual((speech, silence), (0.0, 0.0))
+        speech, silence = self.vad.process(audio[500:])
+        self.assertAlmostEqual(silence, 0.1)
+
+    def test_louder_noise_is_not_speech(self):
+        # A background 6 dB louder with the same spectrum is still noise
+        louder = noise(0.5, 600, seed=1)
+        speech, _ = self.vad.process(louder)
+        self.assertEqual(speech, 0.0)
+
+    def test_quiet_speech(self):
+        # Speech only 9 dB above the noise is found by its spectrum
+        speech, _ = self.vad.process(mix(noise(0.5, 300, seed=1),
+                                         tone(0.5, 1200)))
+        self.assertGreater(speech, 0.4)
+
+    def test_recording(self):
+        wav = wave.open(join(DATA_DIR, 'weather_mycroft.wav'), 'rb')
+        audio = wav.readframes(wav.getnframes())
+        wav.close()
+        vad = SpectralVad({}, RATE, 2)
+        # The file starts with 0.3 seconds of background noise
+        recording = chunks(audio)
+        for chunk in recording[:4]:
+            vad.calibrate(chunk)
+        elapsed = 0.0
+        end = None
+        for chunk in recording[4:]:
+            elapsed += 0.064
+            speech, silence = vad.process(chunk)
+            if speech > 0:
+                end = elapsed - silence
+            elif end is not None and elapsed - end >= 0.4:
+                break
+        # The speech ends 2.61 seconds into the file
+        self.assertAlmostEqual(0.256 + end, 2.61, delta=0.1)
@@ -0,0 +1,87 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import os
+import unittest
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import mock
+
+from mycroft.metrics import Tracer
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.path = join(self.tmp_dir, 'trace.json')
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_span(self):
+        tracer = Tracer(path=self.path)
+        tracer.start_trace('utterance')
+        with tracer.span('utterance', 'stage', {'skill': 'test'}):
+            pass
+        tracer.add_first_span('utterance', 'first_speak')
+        tracer.add_first_span('utterance', 'first_speak')
+
+        traces = tracer.get_traces()
+        self.assertEqual(len(traces), 1)
+        self.assertEqual(traces[0]['ident'], 'utterance')
+        spans = traces[0]['spans']
+        self.assertEqual([s['name'] for s in spans], ['stage', 'first_speak'])
+        self.assertEqual(spans[0]['args'],
+                         {'skill': 'test', 'ident': 'utterance'})
+
+        # Spans are written to the file in the background
+        self.assertFalse(exists(self.path))
+        tracer.flush()
+        # Trace file is a valid Chrome trace once closed
+        with open(self.path) as f:
+            events = json.loads(f.read().rstrip(',\n') + ']')
+        self.assertEqual(events, spans)
+
+    def test_flush_interval(self):
+        tracer = Tracer(path=self.path, flush_interval=0.05)
+        tracer.add_span('a', 'stage', 0.0, 1.0)
+        tracer.add_span('a', 'other', 1.0, 1.0)
+        tracer._flush_timer.wait(2)
+        with open(self.path) as f:
+            events = json.loads(f.read().rstrip(',\n') + ']')
+        self.assertEqual([e['name'] for e in events], ['stage', 'other'])
+
+    def test_file_per_process(self):
+        config = {'trace': {'enabled': True, 'file': self.path}}
+        with mock.patch('mycroft.metrics.Configuration.get',
+                        return_value=config), \
+                mock.patch.object(Tracer, '_Tracer__instance', None):
+            tracer = Tracer.get()
+        self.assertEqual(tracer.path, join(
+            self.tmp_dir, 'trace.{}.json'.format(os.getpid())))
+
+    def test_max_traces(self):
+        tracer = Tracer(max_traces=2)
+        for ident in ['a', 'b', 'c']:
+            tracer.add_span(ident, 'stage', 0.0, 1.0)
+        self.assertEqual([t['ident'] for t in tracer.get_traces()],
+                         ['b', 'c'])
+
+    def test_disabled(self):
+        tracer = Tracer(enabled=False, path=self.path)
+        tracer.add_span('a', 'stage', 0.0, 1.0)
+        self.assertEqual(tracer.get_traces(), [])
@@ -14,10 +14,14 @@
 # limitations under the License.
 #
 import sys
+import time
 import unittest
+from shutil import rmtree
+from tempfile import mkdtemp
 
 import mock
 from adapt.intent import IntentBuilder
+from os import listdir, makedirs
 from os.path import join, dirname, abspath
 from re import error
 from datetime import datetime
@@ -26,8 +30,8 @@ from mycroft.configuration import Configuration
 from mycroft.messagebus.message import Message
 from mycroft.skills.skill_data import load_regex_from_file, load_regex, \
     load_vocab_from_file, load_vocabulary
-from mycroft.skills.core import MycroftSkill, load_skill, \
-    create_skill_descriptor, open_intent_envelope
+from mycroft.skills.core import MycroftSkill, FallbackSkill, load_skill, \
+    create_skill_descriptor, open_intent_envelope, unload_skill_module
 
 from mycroft.configuration.config import LocalConf, DEFAULT_CONFIG
 
@@ -206,6 +210,30 @@ class MycroftSkillTest(unittest.TestCase):
         self.assertEquals(s.skill_id, 847)
         self.assertEquals(s.name, 'LoadTestSkill')
 
+    def test_load_skill_module(self):
+        """ Verify skills are imported as packages with cached bytecode. """
+        path = join(mkdtemp(), 'submodule_skill')
+        self.addCleanup(rmtree, dirname(path))
+        makedirs(path)
+        with open(join(path, '__init__.py'), 'w') as f:
+            f.write('from mycroft.skills.core import MycroftSkill\n'
+                    'from .util import SKILL_NAME\n\n\n'
+                    'def create_skill():\n'
+                    '    return MycroftSkill(name=SKILL_NAME)\n')
+        with open(join(path, 'util.py'), 'w') as f:
+            f.write('SKILL_NAME = "SubmoduleSkill"\n')
+
+        with mock.patch.object(sys, 'dont_write_bytecode', False):
+            s = load_skill(create_skill_descriptor(path), MockEmitter(), 848)
+        self.assertEquals(s.name, 'SubmoduleSkill')
+        self.assertIn('submodule_skill.util', sys.modules)
+        self.assertTrue(any(f.startswith('__init__.') for f in
+                            listdir(join(path, '__pycache__'))))
+
+        unload_skill_module('submodule_skill')
+        self.assertNotIn('submodule_skill', sys.modules)
+        self.assertNotIn('submodule_skill.util', sys.modules)
+
     def check_detach_intent(self):
         self.assertTrue(len(self.emitter.get_types()) > 0)
         for msg_type in self.emitter.get_types():
@@ -481,6 +509,141 @@ class MycroftSkillTest(unittest.TestCase):
             # handler
             self.assertTrue('A:sched_handler1' not in [e[0] for e in s.events])
 
+    @mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+    def test_cancel_all_repeating_events(self):
+        emitter = mock.MagicMock()
+        s = SimpleSkill1()
+        s.bind(emitter)
+        for i in range(3):
+            s.schedule_repeating_event(s.handler, None, 60,
+                                       name='repeat{}'.format(i))
+        s.cancel_all_repeating_events()
+        # All events are removed with a single message
+        message = emitter.emit.call_args[0][0]
+        self.assertEqual(message.type, 'mycroft.scheduler.remove_events')
+        self.assertEqual(message.data['events'],
+                         ['A:repeat0', 'A:repeat1', 'A:repeat2'])
+        self.assertEqual(s.scheduled_repeats, [])
+        self.assertFalse([e for e in s.events if e[0].startswith('A:')])
+
+
+class FallbackSkillTest(unittest.TestCase):
+    emitter = MockEmitter()
+
+    def setUp(self):
+        self.emitter.reset()
+        FallbackSkill.make_intent_failure_handler(self.emitter)
+        FallbackSkill._fallback_stats.clear()
+        self.called = []
+
+    def tearDown(self):
+        for handler in list(FallbackSkill.fallback_handlers.values()):
+            FallbackSkill.remove_fallback(handler)
+
+    def make_handler(self, name, result, delay=0):
+        def handler(message):
+            time.sleep(delay)
+            self.called.append(name)
+            return result
+        handler.handler_name = name
+        return handler
+
+    def test_priority_order(self):
+        FallbackSkill._register_fallback(self.make_handler('c', False), 90)
+        FallbackSkill._register_fallback(self.make_handler('a', False), 10)
+        FallbackSkill._register_fallback(self.make_handler('b', True), 50)
+        self.assertEqual(FallbackSkill._fallback_order, [10, 50, 90])
+
+        handled_by = FallbackSkill._run_fallbacks(Message('intent_failure'),
+                                                  1.0, 2.0)
+        self.assertEqual(handled_by, 'b')
+        self.assertEqual(self.called, ['a', 'b'])
+
+    def test_remove_fallback(self):
+        handler = self.make_handler('a', True)
+        FallbackSkill._register_fallback(handler, 10)
+        FallbackSkill._register_fallback(self.make_handler('b', False), 10)
+        self.assertEqual(FallbackSkill._fallback_order, [10, 11])
+        FallbackSkill.remove_fallback(handler)
+        self.assertEqual(FallbackSkill._fallback_order, [11])
+
+    def test_handler_timeout(self):
+        committed = []
+        slow = self.make_handler('slow', lambda: committed.append(True), 1.0)
+        slow.speculative = True
+        FallbackSkill._register_fallback(slow, 10)
+        FallbackSkill._register_fallback(self.make_handler('fast', True), 20)
+        handled_by = FallbackSkill._run_fallbacks(Message('intent_failure'),
+                                                  0.1, 2.0)
+        self.assertEqual(handled_by, 'fast')
+        stats = FallbackSkill.get_fallback_stats()
+        self.assertEqual(stats['slow']['timeouts'], 1)
+        self.assertEqual(stats['fast']['success_rate'], 1.0)
+        # The abandoned handler finishes but never answers
+        time.sleep(1.2)
+        self.assertEqual(self.called, ['fast', 'slow'])
+        self.assertEqual(committed, [])
+
+    def test_hung_handlers(self):
+        # Hung handlers don't hold up later utterances
+        for priority in range(10, 15):
+            hung = self.make_handler('hung', lambda: None, 1.0)
+            hung.speculative = True
+            FallbackSkill._register_fallback(hung, priority)
+        FallbackSkill._register_fallback(self.make_handler('slow', True, 1.0),
+                                         20)
+        FallbackSkill._register_fallback(self.make_handler('fast', True), 30)
+        for _ in range(3):
+            start = time.time()
+            handled_by = FallbackSkill._run_fallbacks(
+                Message('intent_failure'), 0.1, 2.0)
+            self.assertEqual(handled_by, 'fast')
+            self.assertLess(time.time() - start, 0.5)
+        # Handlers still running weren't started again
+        time.sleep(1.2)
+        self.assertEqual(self.called.count('hung'), 5)
+        self.assertEqual(self.called.count('slow'), 1)
+        stats = FallbackSkill.get_fallback_stats()
+        self.assertEqual(stats['slow']['timeouts'], 3)
+
+    def test_slow_handler(self):
+        # A handler with side effects timing out is skipped too, what it
+        # returns afterwards is ignored
+        FallbackSkill._register_fallback(self.make_handler('slow', True, 0.3),
+                                         10)
+        FallbackSkill._register_fallback(self.make_handler('b', True), 20)
+        handled_by = FallbackSkill._run_fallbacks(Message('intent_failure'),
+                                                  0.1, 2.0)
+        self.assertEqual(handled_by, 'b')
+        time.sleep(0.4)
+        self.assertEqual(self.called, ['b', 'slow'])
+        stats = FallbackSkill.get_fallback_stats()
+        self.assertEqual(stats['slow']['timeouts'], 1)
+        self.assertEqual(stats['slow']['success_rate'], 0.0)
+
+    def test_speculative_handler(self):
+        committed = []
+        speculative = self.make_handler('spec',
+                                        lambda: committed.append(True))
+        speculative.speculative = True
+        FallbackSkill._register_fallback(self.make_handler('a', True, 0.2),
+                                         10)
+        FallbackSkill._register_fallback(speculative, 20)
+
+        # Speculative handler is run but not committed
+        handled_by = FallbackSkill._run_fallbacks(Message('intent_failure'),
+                                                  1.0, 2.0)
+        self.assertEqual(handled_by, 'a')
+        self.assertEqual(self.called, ['spec', 'a'])
+        self.assertEqual(committed, [])
+
+        # Committed when higher priority fallbacks fail
+        FallbackSkill.remove_fallback(FallbackSkill.fallback_handlers[10])
+        handled_by = FallbackSkill._run_fallbacks(Message('intent_failure'),
+                                                  1.0, 2.0)
+        self.assertEqual(handled_by, 'spec')
+        self.assertEqual(committed, [True])
+
 
 class _TestSkill(MycroftSkill):
     def __init__(self):
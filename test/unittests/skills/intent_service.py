@@ -13,8 +13,16 @@
 # limitations under the License.
 #
 import unittest
+from threading import Thread
 
-from mycroft.skills.intent_service import ContextManager
+import mock
+
+from mycroft.configuration import Configuration
+from mycroft.configuration.config import LocalConf, DEFAULT_CONFIG
+from mycroft.messagebus.message import Message
+from mycroft.skills.intent_service import ContextManager, IntentService
+
+BASE_CONF = LocalConf(DEFAULT_CONFIG)
 
 
 class MockEmitter(object):
@@ -67,6 +75,149 @@ class ContextManagerTest(unittest.TestCase):
         self.context_manager.remove_context('TestContext')
         self.assertEqual(len(self.context_manager.frame_stack), 0)
 
+    def test_max_stored_frames(self):
+        context_manager = ContextManager(3, max_stored_frames=2)
+        for i in range(5):
+            entity = {'confidence': 1.0, 'data': [('Word', 'Context')],
+                      'match': 'Word', 'key': 'Word'}
+            context_manager.inject_context(entity, {'frame': i})
+        self.assertEqual(len(context_manager.frame_stack), 2)
+        self.assertEqual(context_manager.frame_stack[0][0].metadata,
+                         {'frame': 4})
+
+    def test_context_expiry(self):
+        entity = {'confidence': 1.0, 'data': [('Word', 'Context')],
+                  'match': 'Word', 'key': 'Word'}
+        with mock.patch('mycroft.skills.intent_service.time') as time_mock:
+            time_mock.time.return_value = 1000.0
+            self.context_manager.inject_context(entity)
+            self.assertEqual(len(self.context_manager.get_context()), 1)
+            # Three minute timeout
+            time_mock.time.return_value = 1000.0 + 3 * 60
+            self.assertEqual(self.context_manager.get_context(), [])
+            self.assertEqual(len(self.context_manager.frame_stack), 0)
+
+    def test_latest_keyword_used(self):
+        old = {'confidence': 1.0, 'data': [('Old', 'Context')],
+               'match': 'Old', 'key': 'Old'}
+        new = {'confidence': 1.0, 'data': [('New', 'Context')],
+               'match': 'New', 'key': 'New'}
+        self.context_manager.inject_context(old, {'frame': 1})
+        self.assertEqual(self.context_manager.get_context()[0]['key'], 'Old')
+        self.context_manager.inject_context(new, {'frame': 2})
+        context = self.context_manager.get_context()
+        self.assertEqual(len(context), 1)
+        self.assertEqual(context[0]['key'], 'New')
+        self.assertEqual(context[0]['confidence'], 0.5)
+
+
+class ThreadedEmitter(object):
+    """ Emitter dispatching each message in a thread like the websocket. """
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, f):
+        self.handlers.setdefault(event, []).append(f)
+
+    def emit(self, message):
+        for handler in self.handlers.get(message.type, []):
+            Thread(target=handler, args=(message,)).start()
+
+
+class IntentServiceSessionTest(unittest.TestCase):
+    @mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+    def setUp(self):
+        self.emitter = ThreadedEmitter()
+        self.service = IntentService(self.emitter)
+        self.handled = {}
+
+        # Fake skill manager, a skill only converses in its own session
+        def converse_request(message):
+            session = message.context['session']
+            result = message.data['skill_id'] == 'skill-' + session
+            if result:
+                self.handled[session] = message.data['utterances'][0]
+            self.emitter.emit(message.reply('skill.converse.response', {
+                'skill_id': message.data['skill_id'], 'result': result}))
+
+        self.emitter.on('skill.converse.request', converse_request)
+
+    def test_session_context(self):
+        entity = {'confidence': 1.0, 'data': [('Word', 'Context')],
+                  'match': 'Word', 'key': 'Word'}
+        self.service.get_session('a').context_manager.inject_context(entity)
+        self.assertEqual(
+            len(self.service.get_session('a').context_manager.get_context()),
+            1)
+        self.assertEqual(
+            self.service.get_session('b').context_manager.get_context(), [])
+
+    def test_session_eviction(self):
+        self.service.max_sessions = 3
+        for i in range(5):
+            self.service.get_session(str(i))
+        self.service.get_session('2')
+        self.service.get_session('5')
+        self.assertEqual(list(self.service.sessions.keys()),
+                         ['4', '2', '5'])
+
+    @mock.patch('mycroft.skills.intent_service.report_timing')
+    def test_concurrent_sessions(self, _):
+        self.service.max_sessions = 100
+        sessions = [str(i) for i in range(50)]
+        for session in sessions:
+            # Make every skill active in every session, the last activated
+            # session specific skill is asked last
+            self.service.add_active_skill('skill-' + session, session)
+            for other in sessions[:5]:
+                self.service.add_active_skill('skill-' + other + '-x',
+                                              session)
+
+        threads = [Thread(target=self.service.handle_utterance,
+                          args=(Message('recognizer_loop:utterance', {
+                              'utterances': ['utterance ' + session],
+                              'session': session}),))
+                   for session in sessions]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.handled,
+                         {s: 'utterance ' + s for s in sessions})
+
+    @mock.patch('mycroft.skills.intent_service.report_timing')
+    def test_context_without_session(self, _):
+        # Context set from a skill's initialize() has no session
+        self.service.handle_add_context(Message('add_context', {
+            'context': 'Location', 'word': 'Paris'}))
+        self.service.handle_utterance(Message('recognizer_loop:utterance', {
+            'utterances': ['what is the weather'], 'session': 'device'}))
+
+        session = self.service.get_session('device')
+        context = session.context_manager.get_context()
+        self.assertEqual([c['key'] for c in context], ['Paris'])
+
+        # Later it applies to the sessions in use as well
+        self.service.handle_add_context(Message('add_context', {
+            'context': 'Time', 'word': 'tomorrow'}))
+        context = session.context_manager.get_context()
+        self.assertEqual(set(c['key'] for c in context),
+                         set(['Paris', 'tomorrow']))
+        self.service.handle_clear_context(Message('clear_context'))
+        self.assertEqual(session.context_manager.get_context(), [])
+
+    def test_reset_converse(self):
+        requests = []
+        self.emitter.on('skill.converse.request',
+                        lambda m: requests.append(m.context['session']))
+        self.service.add_active_skill('skill-x', 'device')
+        self.service.reset_converse(Message(
+            'mycroft.speech.recognition.unknown', {'session': 'device'}))
+        self.service.reset_converse(Message(
+            'mycroft.speech.recognition.unknown'))
+        self.assertEqual(requests, ['device', 'device'])
+
 
 if __name__ == '__main__':
     unittest.main()
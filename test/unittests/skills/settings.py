@@ -15,6 +15,7 @@
 import json
 import unittest
 
+import mock
 from os import remove
 from os.path import join, dirname
 
@@ -124,6 +125,87 @@ class SkillSettingsTest(unittest.TestCase):
         s.load_skill_settings_from_file()
         self.assertEqual(len(s), 1)
 
+    def test_track_nested_changes(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        s.allow_overwrite = True
+        s['d'] = {'l': [1, 2]}
+        s.store()
+        self.assertTrue(s._is_stored)
+
+        s['d']['l'].append({'a': 3})
+        self.assertFalse(s._is_stored)
+        s.store()
+        s['d']['l'][2]['a'] = 4
+        self.assertFalse(s._is_stored)
+        s.store()
+
+        s2 = SkillSettings(join(dirname(__file__), 'settings'),
+                           "test-skill-settings")
+        s2.allow_overwrite = True
+        s2.load_skill_settings_from_file()
+        self.assertTrue(s2._is_stored)
+        self.assertEqual(s2['d'], {'l': [1, 2, {'a': 4}]})
+
+    def test_keep_references(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        s.allow_overwrite = True
+        lst = []
+        s['l'] = lst
+        self.assertIs(s['l'], lst)
+        s.store()
+
+        # Changes through the skill's reference are stored
+        lst.append(1)
+        self.assertFalse(s._is_stored)
+        s.store()
+        self.assertTrue(s._is_stored)
+        d = {'a': 1}
+        s['l'].append(d)
+        d['a'] = 2
+        s.schedule_store()
+
+        s2 = SkillSettings(join(dirname(__file__), 'settings'),
+                           "test-skill-settings")
+        s2.allow_overwrite = True
+        s2.load_skill_settings_from_file()
+        self.assertEqual(s2['l'], [1, {'a': 2}])
+        self.assertTrue(s2._is_stored)
+
+    def test_store_unchanged(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        s.allow_overwrite = True
+        s['test'] = 1
+        s.store()
+        with mock.patch('json.dumps', wraps=json.dumps) as dump:
+            s.store()
+            s['test'] = 1  # Set to the same value
+            s.store()
+            self.assertFalse(dump.called)
+            s.store(force=True)
+            self.assertEqual(dump.call_count, 1)
+
+    def test_schedule_store(self):
+        s = SkillSettings(join(dirname(__file__), 'settings'),
+                          "test-skill-settings")
+        s.allow_overwrite = True
+        s.store_delay = 0.1
+        with mock.patch.object(s, 'store', wraps=s.store) as store:
+            for i in range(10):
+                s['test'] = i
+                s.schedule_store()
+            self.assertFalse(store.called)
+            s._store_timer.wait(1)
+            self.assertEqual(store.call_count, 1)
+
+        s2 = SkillSettings(join(dirname(__file__), 'settings'),
+                           "test-skill-settings")
+        s2.allow_overwrite = True
+        s2.load_skill_settings_from_file()
+        self.assertEqual(s2['test'], 9)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,40 +5,45 @@
 import unittest
 import mock
 import time
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Event
 
-from mycroft.skills.event_scheduler import EventScheduler
+from mycroft.messagebus.message import Message
+from mycroft.skills.event_scheduler import EventScheduler, repeat_time
 
 
 class TestEventScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.addCleanup(rmtree, self.tmp_dir)
+        self.schedule_file = join(self.tmp_dir, 'schedule.json')
+
     @mock.patch('threading.Thread')
     @mock.patch('json.load')
     @mock.patch('json.dump')
-    @mock.patch('mycroft.skills.event_scheduler.open')
-    def test_create(self, mock_open, mock_json_dump, mock_load, mock_thread):
+    def test_create(self, mock_json_dump, mock_load, mock_thread):
         """
             Test creating and shutting down event_scheduler.
         """
         mock_load.return_value = ''
-        mock_open.return_value = mock.MagicMock()
         emitter = mock.MagicMock()
-        es = EventScheduler(emitter)
+        es = EventScheduler(emitter, self.schedule_file)
         es.shutdown()
         self.assertEquals(mock_json_dump.call_args[0][0], {})
 
     @mock.patch('threading.Thread')
     @mock.patch('json.load')
     @mock.patch('json.dump')
-    @mock.patch('mycroft.skills.event_scheduler.open')
-    def test_add_remove(self, mock_open, mock_json_dump,
-                        mock_load, mock_thread):
+    def test_add_remove(self, mock_json_dump, mock_load, mock_thread):
         """
             Test add an event and then remove it.
         """
         # Thread start is mocked so will not actually run the thread loop
         mock_load.return_value = ''
-        mock_open.return_value = mock.MagicMock()
         emitter = mock.MagicMock()
-        es = EventScheduler(emitter)
+        es = EventScheduler(emitter, self.schedule_file)
 
         # 900000000000 should be in the future for a long time
         es.schedule_event('test', 90000000000, None)
@@ -57,15 +62,13 @@ class TestEventScheduler(unittest.TestCase):
     @mock.patch('threading.Thread')
     @mock.patch('json.load')
     @mock.patch('json.dump')
-    @mock.patch('mycroft.skills.event_scheduler.open')
-    def test_save(self, mock_open, mock_dump, mock_load, mock_thread):
+    def test_save(self, mock_dump, mock_load, mock_thread):
         """
             Test save functionality.
         """
         mock_load.return_value = ''
-        mock_open.return_value = mock.MagicMock()
         emitter = mock.MagicMock()
-        es = EventScheduler(emitter)
+        es = EventScheduler(emitter, self.schedule_file)
 
         # 900000000000 should be in the future for a long time
         es.schedule_event('test', 900000000000, None)
@@ -81,15 +84,13 @@ class TestEventScheduler(unittest.TestCase):
     @mock.patch('threading.Thread')
     @mock.patch('json.load')
     @mock.patch('json.dump')
-    @mock.patch('mycroft.skills.event_scheduler.open')
-    def test_send_event(self, mock_open, mock_dump, mock_load, mock_thread):
+    def test_send_event(self, mock_dump, mock_load, mock_thread):
         """
             Test save functionality.
         """
         mock_load.return_value = ''
-        mock_open.return_value = mock.MagicMock()
         emitter = mock.MagicMock()
-        es = EventScheduler(emitter)
+        es = EventScheduler(emitter, self.schedule_file)
 
         # 0 should be in the future for a long time
         es.schedule_event('test', time.time(), None)
@@ -98,3 +99,138 @@ class TestEventScheduler(unittest.TestCase):
         self.assertEquals(emitter.emit.call_args[0][0].type, 'test')
         self.assertEquals(emitter.emit.call_args[0][0].data, {})
         es.shutdown()
+
+    def test_wakeup(self):
+        """
+            Test that events are sent on time without polling.
+        """
+        sent = Event()
+        emitter = mock.MagicMock()
+        emitter.emit.side_effect = lambda m: sent.set()
+        es = EventScheduler(emitter, schedule_file=None)
+        self.addCleanup(es.shutdown)
+        # The thread sleeps until woken by the new event
+        es.schedule_event('test', time.time() + 0.05, None)
+        self.assertTrue(sent.wait(1))
+        self.assertEqual(emitter.emit.call_args[0][0].type, 'test')
+        lateness = es.metrics._timers['scheduler.lateness']
+        self.assertEqual(len(lateness), 1)
+        self.assertLess(lateness[0], 0.25)
+
+    def test_heap_order(self):
+        """
+            Test that removed events are skipped and the rest sent in order.
+        """
+        emitter = mock.MagicMock()
+        es = EventScheduler(emitter, schedule_file=None)
+        es.shutdown()
+        now = time.time()
+        for i in range(10):
+            es.schedule_event('test-{}'.format(i), now - i, None)
+        es.remove_event('test-3')
+        es.check_state()
+        sent = [c[0][0].type for c in emitter.emit.call_args_list]
+        self.assertEqual(sent, ['test-{}'.format(i)
+                                for i in range(9, -1, -1) if i != 3])
+        self.assertEqual(es.events, {})
+        self.assertEqual(es._heap, [])
+
+    def test_journal(self):
+        """
+            Test that changes are recovered without a clean shutdown.
+        """
+        es = EventScheduler(mock.MagicMock(), self.schedule_file)
+        self.addCleanup(es.shutdown)
+        es.schedule_event('test', 900000000000, None, {'a': 1})
+        es.schedule_event('test-2', 900000000000, None)
+        es.schedule_event('test-repeat', 900000000000, 60)
+        es.update_event('test', {'a': 2})
+        es.remove_event('test-2')
+        # A crash can leave a partly written line
+        with open(es.journal_file, 'a') as f:
+            f.write('["add", "test-3", 9')
+
+        recovered = EventScheduler(mock.MagicMock(), self.schedule_file)
+        self.addCleanup(recovered.shutdown)
+        self.assertEqual(recovered.events,
+                         {'test': [(900000000000, None, {'a': 2})]})
+        # The replayed journal was compacted into the snapshot
+        with open(recovered.journal_file) as f:
+            self.assertEqual(f.read(), '')
+
+    def test_journal_compaction(self):
+        """
+            Test that the journal is compacted once it grows too big.
+        """
+        es = EventScheduler(mock.MagicMock(), self.schedule_file)
+        self.addCleanup(es.shutdown)
+        es.JOURNAL_SIZE = 10
+        for i in range(25):
+            es.schedule_event('test', 900000000000 + i, None)
+            es.remove_event('test')
+        es.schedule_event('test', 900000000000, None)
+        with open(es.journal_file) as f:
+            self.assertLessEqual(len(f.readlines()), 10)
+
+        recovered = EventScheduler(mock.MagicMock(), self.schedule_file)
+        self.addCleanup(recovered.shutdown)
+        self.assertEqual(recovered.events,
+                         {'test': [(900000000000, None, {})]})
+
+    def test_schedule_events(self):
+        """
+            Test scheduling and removing events in batches.
+        """
+        emitter = mock.MagicMock()
+        es = EventScheduler(emitter, self.schedule_file)
+        self.addCleanup(es.shutdown)
+        events = [{'event': 'skill-a:{}'.format(i), 'time': 900000000000 + i}
+                  for i in range(5)]
+        events.append({'event': 'skill-b:0', 'time': 900000000000,
+                       'data': {'a': 1}})
+        events.append({'event': 'skill-b:1'})  # No time, ignored
+        es.schedule_events_handler(
+            Message('mycroft.scheduler.schedule_events', {'events': events}))
+        self.assertEqual(len(es.events), 6)
+        self.assertEqual(es.events['skill-b:0'],
+                         [(900000000000, None, {'a': 1})])
+
+        es.remove_events_handler(
+            Message('mycroft.scheduler.remove_events',
+                    {'prefix': 'skill-a:'}))
+        self.assertEqual(list(es.events), ['skill-b:0'])
+
+        recovered = EventScheduler(mock.MagicMock(), self.schedule_file)
+        self.addCleanup(recovered.shutdown)
+        self.assertEqual(list(recovered.events), ['skill-b:0'])
+
+    def test_repeat_time(self):
+        """
+            Test that repeating events keep their schedule.
+        """
+        now = time.time()
+        self.assertEqual(repeat_time(now + 10, 0.5), now + 10.5)
+        # Missed repeats are skipped without shifting the schedule
+        next_time = repeat_time(now - 10.2, 0.5)
+        self.assertGreaterEqual(next_time, now)
+        self.assertLess(next_time, now + 0.5)
+        self.assertAlmostEqual((next_time - (now - 10.2)) % 0.5, 0.0,
+                               places=6)
+
+    def test_repeating_event(self):
+        """
+            Test that sub-second repeats are sent without drift.
+        """
+        times = []
+        emitter = mock.MagicMock()
+        emitter.emit.side_effect = lambda m: times.append(time.time())
+        es = EventScheduler(emitter, schedule_file=None)
+        self.addCleanup(es.shutdown)
+        start = time.time() + 0.05
+        es.schedule_event('test', start, 0.05)
+        while len(times) < 10 and time.time() < start + 2:
+            time.sleep(0.05)
+        es.remove_event('test')
+        self.assertGreaterEqual(len(times), 10)
+        # The tenth repeat is on time, the lateness didn't add up
+        self.assertLess(times[9] - (start + 9 * 0.05), 0.04)
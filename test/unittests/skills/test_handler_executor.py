@@ -0,0 +1,113 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+import unittest
+from threading import Event, Lock
+
+import mock
+
+from mycroft.skills.handler_executor import HandlerExecutor
+
+
+class TestHandlerExecutor(unittest.TestCase):
+    def setUp(self):
+        self.release = Event()
+        self.lock = Lock()
+        self.running = {}
+        self.max_running = {}
+
+    def tearDown(self):
+        self.release.set()
+
+    def blocking_handler(self, skill_id):
+        def handler():
+            with self.lock:
+                self.running[skill_id] = self.running.get(skill_id, 0) + 1
+                self.max_running[skill_id] = max(
+                    self.running[skill_id],
+                    self.max_running.get(skill_id, 0))
+            self.release.wait(5)
+            with self.lock:
+                self.running[skill_id] -= 1
+        return handler
+
+    def test_limit_per_skill(self):
+        executor = HandlerExecutor(max_workers=4, max_per_skill=2,
+                                   soft_timeout=0, hard_timeout=0)
+        self.addCleanup(executor.shutdown)
+        jobs = [executor.submit('slow', 'handler',
+                                self.blocking_handler('slow'))
+                for _ in range(5)]
+
+        # Other skills don't wait for the handlers of the slow skill
+        done = Event()
+        executor.submit('fast', 'handler', done.set)
+        self.assertTrue(done.wait(1))
+        self.assertFalse(executor.join(0.1))
+
+        self.release.set()
+        self.assertTrue(executor.join(5))
+        self.assertEqual(self.max_running['slow'], 2)
+        self.assertTrue(all(j.queue_time is not None for j in jobs))
+
+    def test_errors_dont_stop_workers(self):
+        executor = HandlerExecutor(max_workers=1, soft_timeout=0,
+                                   hard_timeout=0)
+        self.addCleanup(executor.shutdown)
+        done = Event()
+        executor.submit('skill', 'broken', mock.Mock(side_effect=Exception))
+        executor.submit('skill', 'handler', done.set)
+        self.assertTrue(done.wait(1))
+
+    def test_timeouts(self):
+        executor = HandlerExecutor(max_workers=1, max_per_skill=1,
+                                   soft_timeout=0.05, hard_timeout=0.2)
+        self.addCleanup(executor.shutdown)
+        emitter = mock.Mock()
+        executor.submit('slow', 'handler', self.blocking_handler('slow'),
+                        emitter)
+
+        # The abandoned handler frees both the skill and the worker
+        done = Event()
+        executor.submit('slow', 'other', done.set)
+        self.assertTrue(done.wait(2))
+        self.assertTrue(executor.join(1))
+
+        messages = [c[0][0] for c in emitter.emit.call_args_list]
+        self.assertEqual([m.type for m in messages],
+                         ['mycroft.skill.handler.timeout'] * 2)
+        self.assertEqual([m.data['timeout'] for m in messages],
+                         ['soft', 'hard'])
+        self.assertEqual(messages[0].data['skill_id'], 'slow')
+        self.assertEqual(messages[0].data['handler'], 'handler')
+        self.assertGreaterEqual(messages[1].data['elapsed'], 0.2)
+
+    def test_watchdog_idle(self):
+        executor = HandlerExecutor(max_workers=1, soft_timeout=0.01,
+                                   hard_timeout=0.02)
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(executor, '_next_timeout',
+                               wraps=executor._next_timeout) as next_timeout:
+            # Nothing running, the watchdog sleeps
+            time.sleep(0.2)
+            self.assertEqual(next_timeout.call_count, 0)
+
+            # It wakes for the timeouts of a handler, and sleeps after
+            done = Event()
+            executor.submit('skill', 'handler', done.set)
+            self.assertTrue(done.wait(1))
+            self.assertTrue(executor.join(1))
+            time.sleep(0.2)
+            self.assertLessEqual(next_timeout.call_count, 3)
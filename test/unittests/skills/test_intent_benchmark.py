@@ -0,0 +1,90 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import mock
+
+from mycroft.configuration import Configuration
+from mycroft.configuration.config import LocalConf, DEFAULT_CONFIG
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import FallbackSkill
+from mycroft.skills.intent_benchmark import (FakeEmitter, SyntheticSkills,
+                                             create_services, percentile,
+                                             run_benchmark, summarize)
+
+BASE_CONF = LocalConf(DEFAULT_CONFIG)
+
+
+class IntentBenchmarkTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    @mock.patch('mycroft.skills.intent_service.report_timing')
+    @mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+    def test_adapt_benchmark(self, report_timing):
+        emitter = FakeEmitter()
+        service, padatious = create_services(emitter, use_padatious=False)
+        skills = SyntheticSkills(5, join(self.tmp_dir, 'skills'))
+        skills.register(emitter)
+        corpus = skills.create_corpus(50, padatious=False)
+
+        results = run_benchmark(service, padatious, corpus)
+        report = summarize(results, 1.0)
+        self.assertEqual(report['utterances'], 50)
+        self.assertEqual(report['stage_accuracy']['adapt'], 1.0)
+        self.assertEqual(report['stage_accuracy']['none'], 1.0)
+        self.assertIn('adapt.tagging', report['stages'])
+        # Metrics are disabled and a single session is used
+        self.assertFalse(report_timing.called)
+        self.assertEqual(list(service.sessions), ['benchmark'])
+
+    @mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+    def test_fallback_benchmark(self):
+        emitter = FakeEmitter()
+        service, _ = create_services(emitter, use_padatious=False)
+        skills = SyntheticSkills(5, join(self.tmp_dir, 'skills'))
+        skills.register(emitter)
+        corpus = skills.create_corpus(50, padatious=False)
+        corpus.append(('please find the answer', 'skill-fake:query.intent'))
+
+        def handle_fallback(message):
+            if message.data['utterance'].startswith('please'):
+                return lambda: emitter.emit(
+                    message.reply('skill-fake:query.intent', {}))
+            return False
+
+        FallbackSkill._register_fallback(handle_fallback, 5)
+        try:
+            results = run_benchmark(service, mock.Mock(), corpus)
+        finally:
+            FallbackSkill.remove_fallback(handle_fallback)
+        report = summarize(results, 1.0)
+        self.assertEqual(report['stage_accuracy']['padatious'], 1.0)
+        self.assertEqual(report['stage_accuracy']['none'], 1.0)
+        self.assertEqual(results[-1]['stage'], 'padatious')
+        self.assertIn('fallback', report['stages'])
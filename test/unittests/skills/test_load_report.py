@@ -0,0 +1,64 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+from os.path import dirname, join
+
+import mock
+
+from mycroft.skills.core import load_skill, create_skill_descriptor
+from mycroft.skills.load_report import (SkillLoadProfile, create_load_report,
+                                        format_load_report)
+
+
+class TestSkillLoadProfile(unittest.TestCase):
+    def test_load_skill(self):
+        path = join(dirname(__file__), 'test_skill')
+        profile = SkillLoadProfile('test_skill', path)
+        skill = load_skill(create_skill_descriptor(path), mock.MagicMock(),
+                           'test_skill', profile=profile)
+        self.assertIsNotNone(skill)
+        self.assertTrue(profile.loaded)
+        for phase in ('import', 'create', 'data_files', 'initialize',
+                      'settings'):
+            self.assertIn(phase, profile.phases)
+        self.assertEqual(profile.counts['intents'], 0)
+        self.assertEqual(profile.counts['vocab'], 0)
+
+    def test_failed_load(self):
+        path = join(dirname(__file__), 'empty_dir')
+        profile = SkillLoadProfile('empty_dir', path)
+        load_skill(create_skill_descriptor(path), mock.MagicMock(),
+                   'empty_dir', profile=profile)
+        self.assertFalse(profile.loaded)
+
+    def test_report(self):
+        fast = SkillLoadProfile('fast', '/skills/fast')
+        fast.phases.update({'import': 0.01, 'initialize': 0.01,
+                            'settings': 0.005})
+        slow = SkillLoadProfile('slow', '/skills/slow')
+        slow.phases.update({'import': 0.5, 'initialize': 1.0})
+        slow.counts['intents'] = 3
+        report = create_load_report([fast, slow], 1.2,
+                                    {'/skills/slow': 2048})
+        self.assertEqual([s['id'] for s in report['skills']],
+                         ['slow', 'fast'])
+        # Settings I/O is part of the other phases, not added to the total
+        self.assertAlmostEqual(report['skills'][1]['total'], 0.02)
+        self.assertEqual(report['skills'][0]['memory'], 2048)
+
+        lines = format_load_report(report, 1)
+        self.assertEqual(len(lines), 3)
+        self.assertIn('slow', lines[2])
+        self.assertIn('2kB', lines[2])
@@ -0,0 +1,162 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+
+import mock
+
+from mycroft.api import Api
+from mycroft.skills.settings import SettingsSync, SkillSettings
+
+
+def skill_settings(identifier, value):
+    return {
+        'identifier': identifier,
+        'uuid': identifier + '-uuid',
+        'skillMetadata': {'sections': [
+            {'fields': [{'name': 'value', 'value': value}]}
+        ]}
+    }
+
+
+class SettingsHandler(BaseHTTPRequestHandler):
+    """ Stand-in for the backend serving the skill settings of a device. """
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path,
+                                self.headers.get('If-None-Match')))
+        etag = str(hash(json.dumps(server.settings, sort_keys=True)))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(server.settings).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', '"{}"'.format(etag))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSettingsSync(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), SettingsHandler)
+        self.server.requests = []
+        self.server.settings = [skill_settings('skill-a', 1),
+                                skill_settings('skill-b', 2)]
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.sync = SettingsSync(interval=3600, delay=0)
+        self.sync.api.url = 'http://127.0.0.1:{}'.format(
+            self.server.server_port)
+        self.sync.api.version = 'v1'
+        self.sync.api.identity = mock.Mock(uuid='device-1', access='token',
+                                           refresh='')
+        for patcher in (mock.patch('mycroft.skills.settings.is_paired',
+                                   return_value=True),
+                        mock.patch.dict(Api.params_to_etag, clear=True),
+                        mock.patch.dict(Api.etag_to_response, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.sync.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_single_request(self):
+        skills = [mock.Mock() for _ in range(3)]
+        for skill in skills:
+            self.sync.settings.append(skill)
+
+        self.sync.sync()
+        self.sync.sync()
+
+        # One request per sync, the second one answered from the ETag cache
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[0],
+                         ('/v1/device/device-1/skill', None))
+        self.assertIsNotNone(self.server.requests[1][1])
+        for skill in skills:
+            self.assertEqual(skill._poll_skill_settings.call_count, 2)
+            skill._poll_skill_settings.assert_called_with(
+                self.server.settings)
+
+    def test_changes_dispatched(self):
+        directory = mkdtemp()
+        self.addCleanup(rmtree, directory)
+        skills = {}
+        for identifier in ('skill-a', 'skill-b'):
+            s = SkillSettings(directory, identifier)
+            s._complete_intialization = True
+            s._load_settings_meta = mock.Mock(return_value={})
+            s._get_meta_hash = mock.Mock(return_value=identifier)
+            s.save_skill_settings = mock.Mock()
+            s.store = mock.Mock()
+            self.sync.settings.append(s)
+            skills[identifier] = s
+
+        self.sync.sync()
+        self.assertEqual(skills['skill-a'].save_skill_settings.call_count, 1)
+        self.assertEqual(skills['skill-b'].save_skill_settings.call_count, 1)
+
+        # Only the skill with changed settings is updated
+        self.server.settings[1] = skill_settings('skill-b', 3)
+        self.sync.sync()
+        self.assertEqual(skills['skill-a'].save_skill_settings.call_count, 1)
+        self.assertEqual(skills['skill-b'].save_skill_settings.call_count, 2)
+        skills['skill-b'].save_skill_settings.assert_called_with(
+            self.server.settings[1])
+
+    def test_register(self):
+        directory = mkdtemp()
+        self.addCleanup(rmtree, directory)
+        # Equal dicts must still be registered separately
+        s1 = SkillSettings(directory, 'skill-a')
+        s2 = SkillSettings(directory, 'skill-b')
+        s1._poll_skill_settings = mock.Mock()
+        s2._poll_skill_settings = mock.Mock()
+        self.sync.register(s1)
+        self.sync.register(s2)
+        self.sync.register(s1)
+        self.assertEqual(len(self.sync.settings), 2)
+
+        # Synced before register returns, sharing a single request
+        self.assertEqual(len(self.server.requests), 1)
+        s1._poll_skill_settings.assert_called_with(self.server.settings)
+        s2._poll_skill_settings.assert_called_once_with(self.server.settings)
+
+        self.sync.unregister(s1)
+        self.assertEqual(len(self.sync.settings), 1)
+        self.assertIs(self.sync.settings[0], s2)
+
+    def test_register_not_paired(self):
+        directory = mkdtemp()
+        self.addCleanup(rmtree, directory)
+        s = SkillSettings(directory, 'skill-a')
+        s._poll_skill_settings = mock.Mock()
+        with mock.patch('mycroft.skills.settings.is_paired',
+                        return_value=False):
+            self.sync.register(s)
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(s._poll_skill_settings.called)
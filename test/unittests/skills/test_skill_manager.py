@@ -0,0 +1,388 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+import unittest
+from os import makedirs
+from os.path import basename, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Event
+
+import mock
+
+from mycroft.configuration import Configuration
+from mycroft.configuration.config import LocalConf, DEFAULT_CONFIG
+from mycroft.messagebus.message import Message
+from mycroft.skills.core import FallbackSkill
+from mycroft.skills.handler_executor import HandlerExecutor
+from mycroft.skills.main import SkillManager, check_connection
+
+BASE_CONF = LocalConf(DEFAULT_CONFIG)
+
+LAZY_SKILL = '''
+from adapt.intent import IntentBuilder
+from mycroft.skills.core import MycroftSkill, intent_handler
+
+
+class LazySkill(MycroftSkill):
+    @intent_handler(IntentBuilder('HelloIntent').require('Hello'))
+    def handle_hello(self, message):
+        self.speak('hi')
+
+    def stop(self):
+        pass
+
+
+def create_skill():
+    return LazySkill()
+'''
+
+FALLBACK_SKILL = '''
+from mycroft.skills.core import FallbackSkill
+
+
+class UnknownSkill(FallbackSkill):
+    def initialize(self):
+        self.register_fallback(self.handle_fallback, 100)
+
+    def handle_fallback(self, message):
+        self.speak('unknown')
+        return True
+
+
+def create_skill():
+    return UnknownSkill()
+'''
+
+
+class MockEmitter(object):
+    def __init__(self):
+        self.handlers = {}
+        self.types = []
+
+    def on(self, event, f):
+        self.handlers.setdefault(event, []).append(f)
+
+    def once(self, event, f):
+        self.on(event, f)
+
+    def remove(self, event, f):
+        if f in self.handlers.get(event, []):
+            self.handlers[event].remove(f)
+
+    def emit(self, message):
+        self.types.append(message.type)
+        for f in list(self.handlers.get(message.type, [])):
+            f(message)
+
+
+@mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+@mock.patch('mycroft.skills.main.SkillManager.create_msm', mock.Mock())
+class TestSkillManagerLoading(unittest.TestCase):
+    def setUp(self):
+        self.emitter = mock.MagicMock()
+
+    def test_load_skills_concurrently(self):
+        manager = SkillManager(self.emitter)
+
+        def load(path):
+            time.sleep(0.2)
+            return True
+
+        manager._load_or_reload_skill = load
+        start = time.time()
+        self.assertTrue(manager.load_skills(['a', 'b', 'c', 'd']))
+        self.assertLess(time.time() - start, 0.6)
+
+    def test_load_skills_timeout(self):
+        manager = SkillManager(self.emitter)
+        release = Event()
+        loaded = []
+
+        def load(path):
+            if path == 'hanging':
+                release.wait(5)
+            loaded.append(path)
+            return False
+
+        manager._load_or_reload_skill = load
+        with mock.patch.dict(Configuration._Configuration__config['skills'],
+                             {'loader': {'max_workers': 2, 'timeout': 0.2}}):
+            start = time.time()
+            manager.load_skills(['hanging', 'other'])
+            self.assertLess(time.time() - start, 2)
+        self.assertEqual(loaded, ['other'])
+        release.set()
+
+    def test_load_skills_more_hanging_than_workers(self):
+        manager = SkillManager(self.emitter)
+        release = Event()
+        loaded = []
+
+        def load(path):
+            if path.startswith('hanging'):
+                release.wait(5)
+            loaded.append(path)
+            return path == 'other'
+
+        manager._load_or_reload_skill = load
+        paths = ['hanging1', 'hanging2', 'hanging3', 'other']
+        with mock.patch.dict(Configuration._Configuration__config['skills'],
+                             {'loader': {'max_workers': 2, 'timeout': 0.2}}):
+            start = time.time()
+            self.assertTrue(manager.load_skills(paths))
+            self.assertLess(time.time() - start, 2)
+        self.assertEqual(loaded, ['other'])
+        release.set()
+
+
+@mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+@mock.patch('mycroft.skills.main.SkillManager.create_msm', mock.Mock())
+class TestSkillManagerLazyLoading(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.skill_path = join(self.tmp_dir, 'lazy-skill')
+        makedirs(join(self.skill_path, 'vocab', 'en-us'))
+        with open(join(self.skill_path, '__init__.py'), 'w') as f:
+            f.write(LAZY_SKILL)
+        with open(join(self.skill_path, 'vocab', 'en-us', 'Hello.voc'),
+                  'w') as f:
+            f.write('hello\n')
+        self.config = {'lazy_loading': {
+            'enabled': True, 'idle_timeout': 0, 'always_loaded': [],
+            'manifest': join(self.tmp_dir, 'manifests.json')
+        }}
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def create_manager(self):
+        emitter = MockEmitter()
+        with mock.patch.dict(Configuration._Configuration__config['skills'],
+                             self.config):
+            return SkillManager(emitter), emitter
+
+    def test_lazy_loading(self):
+        # First start loads the skill and creates the manifest
+        manager, emitter = self.create_manager()
+        self.assertTrue(manager._load_or_reload_skill(self.skill_path))
+        self.assertIsNotNone(manager.loaded_skills[self.skill_path]
+                             ['instance'])
+        manager.stop()
+
+        # Later starts only register the skill
+        manager, emitter = self.create_manager()
+        self.assertTrue(manager._load_or_reload_skill(self.skill_path))
+        skill = manager.loaded_skills[self.skill_path]
+        self.assertNotIn('instance', skill)
+        self.assertIn('register_vocab', emitter.types)
+        self.assertIn('register_intent', emitter.types)
+
+        # The intent loads the skill and is handled
+        emitter.types = []
+        emitter.emit(Message('lazy-skill:HelloIntent', {}))
+        HandlerExecutor.get().join(5)
+        self.assertIsNotNone(skill['instance'])
+        self.assertIn('speak', emitter.types)
+        self.assertNotIn('register_intent', emitter.types)
+
+        # Unused skills are unloaded without removing the intents
+        emitter.types = []
+        manager.unload_idle_skills()
+        self.assertNotIn('instance', skill)
+        self.assertNotIn('detach_skill', emitter.types)
+        emitter.emit(Message('lazy-skill:HelloIntent', {}))
+        HandlerExecutor.get().join(5)
+        self.assertIn('speak', emitter.types)
+
+
+@mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+@mock.patch('mycroft.skills.main.SkillManager.create_msm', mock.Mock())
+class TestSkillManagerIsolation(unittest.TestCase):
+    def create_manager(self):
+        emitter = MockEmitter()
+        config = {'isolation': {'enabled': True, 'skills': ['*'],
+                                'memory_limit': 100, 'restart_delay': 0}}
+        with mock.patch.dict(Configuration._Configuration__config['skills'],
+                             config):
+            return SkillManager(emitter), emitter
+
+    @mock.patch('mycroft.skills.main.SkillProcess')
+    def test_supervise(self, mock_process):
+        manager, emitter = self.create_manager()
+        tmp_dir = mkdtemp()
+        try:
+            with open(join(tmp_dir, '__init__.py'), 'w') as f:
+                f.write('')
+            self.assertTrue(manager._load_or_reload_skill(tmp_dir))
+        finally:
+            rmtree(tmp_dir)
+        process = mock_process.return_value
+        self.assertEqual(process.start.call_count, 1)
+        self.assertEqual(mock_process.call_args[0][2], 100 * 1024 * 1024)
+
+        # Running process within its memory limit is left alone
+        process.running = True
+        process.over_memory_limit.return_value = False
+        process.start_time = time.time()
+        process.restart_time = None
+        with mock.patch('monotonic.monotonic', return_value=time.time()):
+            manager.supervise_processes()
+        self.assertEqual(process.start.call_count, 1)
+
+        # Exited process has its intents detached and is restarted
+        process.running = False
+        process.restarts = 0
+        manager.supervise_processes()
+        self.assertIn('detach_skill', emitter.types)
+        manager.supervise_processes()
+        self.assertEqual(process.start.call_count, 2)
+        self.assertEqual(process.restarts, 1)
+
+    @mock.patch('mycroft.skills.main.SkillProcess')
+    def test_fallback_skill(self, mock_process):
+        manager, emitter = self.create_manager()
+        emitter.on('intent_failure',
+                   FallbackSkill.make_intent_failure_handler(emitter))
+        tmp_dir = mkdtemp()
+        skill_path = join(tmp_dir, 'unknown-skill')
+        makedirs(skill_path)
+        with open(join(skill_path, '__init__.py'), 'w') as f:
+            f.write(FALLBACK_SKILL)
+        try:
+            self.assertTrue(manager._load_or_reload_skill(skill_path))
+            # Fallbacks only work in this process, the skill isn't isolated
+            self.assertFalse(mock_process.called)
+            skill = manager.registry.get_by_id('unknown-skill')
+            self.assertEqual(skill['state'], 'loaded')
+
+            emitter.emit(Message('intent_failure',
+                                 {'utterance': 'what is a fish'}))
+            self.assertIn('speak', emitter.types)
+            self.assertNotIn('complete_intent_failure', emitter.types)
+        finally:
+            skill['instance']._shutdown()
+            rmtree(tmp_dir)
+
+    @mock.patch('mycroft.skills.main.SkillProcess')
+    def test_converse_process_not_running(self, mock_process):
+        manager, emitter = self.create_manager()
+        tmp_dir = mkdtemp()
+        try:
+            with open(join(tmp_dir, '__init__.py'), 'w') as f:
+                f.write('')
+            manager._load_or_reload_skill(tmp_dir)
+        finally:
+            rmtree(tmp_dir)
+        replies = []
+        emitter.on('skill.converse.response', replies.append)
+        request = Message('skill.converse.request', {
+            'skill_id': basename(tmp_dir), 'utterances': ['hello'],
+            'lang': 'en-us'})
+
+        # A running process answers itself
+        mock_process.return_value.running = True
+        emitter.emit(request)
+        self.assertEqual(replies, [])
+
+        # A dead or restarting process can't, the manager answers for it
+        mock_process.return_value.running = False
+        emitter.emit(request)
+        self.assertEqual(replies[0].data, {'skill_id': basename(tmp_dir),
+                                           'result': False})
+
+
+@mock.patch.dict(Configuration._Configuration__config, BASE_CONF)
+@mock.patch('mycroft.skills.main.SkillManager.create_msm', mock.Mock())
+class TestSkillManagerRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.skill_path = join(self.tmp_dir, 'hello-skill')
+        makedirs(join(self.skill_path, 'vocab', 'en-us'))
+        with open(join(self.skill_path, '__init__.py'), 'w') as f:
+            f.write(LAZY_SKILL)
+        with open(join(self.skill_path, 'vocab', 'en-us', 'Hello.voc'),
+                  'w') as f:
+            f.write('hello\n')
+        self.broken_path = join(self.tmp_dir, 'broken-skill')
+        makedirs(self.broken_path)
+        with open(join(self.broken_path, '__init__.py'), 'w') as f:
+            f.write('raise Exception("broken")\n')
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def request(self, emitter, msg_type, data=None,
+                reply_type='mycroft.skills.registry'):
+        replies = []
+        emitter.on(reply_type, replies.append)
+        emitter.emit(Message(msg_type, data or {}))
+        return replies[-1].data
+
+    def test_registry(self):
+        emitter = MockEmitter()
+        manager = SkillManager(emitter)
+        manager.load_skills([self.skill_path, self.broken_path])
+        emitter.emit(Message('hello-skill:HelloIntent', {}))
+        HandlerExecutor.get().join(5)
+
+        data = self.request(emitter, 'mycroft.skills.registry.request')
+        skills = {s['id']: s for s in data['skills']}
+        self.assertEqual(skills['hello-skill']['state'], 'loaded')
+        self.assertEqual(skills['hello-skill']['name'], 'LazySkill')
+        self.assertEqual(skills['hello-skill']['handlers']['calls'], 1)
+        self.assertIsNotNone(skills['hello-skill']['load_time'])
+        self.assertEqual(skills['broken-skill']['state'], 'failed')
+
+        data = self.request(emitter, 'mycroft.skills.registry.request',
+                            {'name': 'LazySkill'})
+        self.assertEqual([s['id'] for s in data['skills']], ['hello-skill'])
+
+        # Converse requests are answered by the skill looked up by id
+        data = self.request(emitter, 'skill.converse.request',
+                            {'skill_id': 'hello-skill',
+                             'utterances': ['hello'], 'lang': 'en-us'},
+                            'skill.converse.response')
+        self.assertEqual(data, {'skill_id': 'hello-skill', 'result': False})
+        manager.stop()
+
+
+class TestCheckConnection(unittest.TestCase):
+    @mock.patch('mycroft.skills.main.TimerService')
+    @mock.patch('mycroft.skills.main.connected', return_value=False)
+    def test_offline(self, _, timer_service):
+        check_connection()
+        timer_service.get().call_later.assert_called_once_with(
+            1, check_connection)
+
+    @mock.patch('mycroft.skills.main.TimerService')
+    @mock.patch('mycroft.skills.main.connected', return_value=True)
+    def test_connected(self, _, timer_service):
+        # Setting up the connected device doesn't block the TimerService
+        release = Event()
+        done = Event()
+
+        def handle_connected():
+            release.wait(5)
+            done.set()
+
+        with mock.patch('mycroft.skills.main._handle_connected',
+                        handle_connected):
+            start = time.time()
+            check_connection()
+            self.assertLess(time.time() - start, 1)
+            release.set()
+            self.assertTrue(done.wait(5))
+        self.assertFalse(timer_service.get().call_later.called)
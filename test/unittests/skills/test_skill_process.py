@@ -0,0 +1,128 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import subprocess
+import sys
+import unittest
+
+import mock
+
+from mycroft.messagebus.message import Message
+from mycroft.skills.container import SkillContainer
+from mycroft.skills.skill_process import SkillProcess
+
+SLEEPER = [sys.executable, '-c', 'import time; time.sleep(30)']
+IGNORE_SIGINT = [sys.executable, '-c',
+                 'import signal, time\n'
+                 'signal.signal(signal.SIGINT, signal.SIG_IGN)\n'
+                 'print("ready", flush=True)\n'
+                 'time.sleep(30)']
+Popen = subprocess.Popen
+
+
+def popen(cmd):
+    """ Create a Popen running cmd instead of a skill container. """
+    def create(args, **kwargs):
+        create.args = args
+        return Popen(cmd, stdout=subprocess.PIPE)
+    return create
+
+
+class TestSkillProcess(unittest.TestCase):
+    def test_start_stop(self):
+        process = SkillProcess('/skills/test-skill', 'test-skill')
+        self.assertFalse(process.running)
+        create = popen(SLEEPER)
+        with mock.patch('subprocess.Popen', create):
+            process.start()
+        self.addCleanup(process.process.kill)
+        self.assertIn('mycroft.skills.container', create.args)
+        self.assertEqual(create.args[-3:],
+                         ['--skill-id', 'test-skill', '/skills/test-skill'])
+        self.assertTrue(process.running)
+        self.assertGreater(process.memory_usage(), 0)
+
+        process.stop()
+        self.assertFalse(process.running)
+        self.assertIsNotNone(process.returncode)
+
+    def test_kill_on_stop_timeout(self):
+        process = SkillProcess('/skills/test-skill', 'test-skill')
+        with mock.patch('subprocess.Popen', popen(IGNORE_SIGINT)):
+            process.start()
+        self.addCleanup(process.process.kill)
+        process.process.stdout.readline()  # SIGINT is ignored from now on
+        process.stop(timeout=0.2)
+        self.assertFalse(process.running)
+        self.assertEqual(process.returncode, -9)
+
+    def test_memory_limit(self):
+        process = SkillProcess('/skills/test-skill', 'test-skill', 1)
+        with mock.patch('subprocess.Popen', popen(SLEEPER)):
+            process.start()
+        self.addCleanup(process.process.kill)
+        self.assertTrue(process.over_memory_limit())
+        process.memory_limit = None
+        self.assertFalse(process.over_memory_limit())
+
+
+class TestSkillContainer(unittest.TestCase):
+    def create_container(self):
+        with mock.patch('mycroft.skills.container.WebsocketClient'), \
+                mock.patch('mycroft.skills.container.Configuration.init'):
+            return SkillContainer(['--config=', '--skill-id', 'test-skill',
+                                   '/skills/test-skill'])
+
+    @mock.patch('mycroft.skills.container.load_skill')
+    @mock.patch('mycroft.skills.container.create_skill_descriptor')
+    def test_load_skill(self, _, load_skill):
+        container = self.create_container()
+        load_skill.return_value.name = 'TestSkill'
+        container.load_skill()
+        message = container.ws.emit.call_args[0][0]
+        self.assertEqual(message.type, 'mycroft.skills.loaded')
+        self.assertEqual(message.data, {'path': '/skills/test-skill',
+                                        'id': 'test-skill',
+                                        'name': 'TestSkill'})
+
+        load_skill.return_value = None
+        container.load_skill()
+        message = container.ws.emit.call_args[0][0]
+        self.assertEqual(message.type, 'mycroft.skills.loading_failure')
+
+    def test_converse(self):
+        container = self.create_container()
+        container.skill = mock.Mock()
+        container.skill.converse.return_value = True
+        request = Message('skill.converse.request', {
+            'skill_id': 'test-skill', 'utterances': ['hello'],
+            'lang': 'en-us'})
+        container.handle_converse_request(request)
+        reply = container.ws.emit.call_args[0][0]
+        self.assertEqual(reply.type, 'skill.converse.response')
+        self.assertEqual(reply.data, {'skill_id': 'test-skill',
+                                      'result': True})
+
+        # Errors in the skill are answered with False
+        container.skill.converse.side_effect = Exception
+        container.handle_converse_request(request)
+        self.assertFalse(container.ws.emit.call_args[0][0].data['result'])
+
+        # Requests for other skills are left to them
+        container.ws.emit.reset_mock()
+        container.handle_converse_request(Message(
+            'skill.converse.request', {'skill_id': 'other-skill',
+                                       'utterances': ['hello'],
+                                       'lang': 'en-us'}))
+        self.assertFalse(container.ws.emit.called)
@@ -0,0 +1,62 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+import mock
+
+from mycroft.skills.skill_registry import SkillRegistry, LOADED, UNLOADED
+
+
+class TestSkillRegistry(unittest.TestCase):
+    def test_indexes(self):
+        registry = SkillRegistry()
+        skill = registry.add('/skills/skill-a')
+        self.assertIs(registry.add('/skills/skill-a'), skill)
+        self.assertEqual(skill['state'], UNLOADED)
+        self.assertIs(registry.get('/skills/skill-a'), skill)
+        self.assertIs(registry.get_by_id('skill-a'), skill)
+        self.assertIsNone(registry.get_by_name('SkillA'))
+
+        registry.set_name(skill, 'SkillA')
+        self.assertIs(registry.get_by_name('SkillA'), skill)
+        registry.set_name(skill, 'RenamedSkill')
+        self.assertIsNone(registry.get_by_name('SkillA'))
+        self.assertIs(registry.get_by_name('RenamedSkill'), skill)
+
+    def test_find(self):
+        registry = SkillRegistry()
+        skill_a = registry.add('/skills/skill-a')
+        skill_b = registry.add('/skills/skill-b')
+        registry.set_name(skill_b, 'SkillB')
+        self.assertEqual(len(registry.find()), 2)
+        self.assertEqual(registry.find(skill_id='skill-a'), [skill_a])
+        self.assertEqual(registry.find(name='SkillB'), [skill_b])
+        self.assertEqual(registry.find(skill_id='skill-a', name='SkillB'),
+                         [])
+        self.assertEqual(registry.find(path='/skills/skill-c'), [])
+
+    def test_info(self):
+        registry = SkillRegistry()
+        skill = registry.add('/skills/skill-a')
+        skill['state'] = LOADED
+        skill['profile'] = mock.Mock(total=0.5)
+        skill['instance'] = mock.Mock(handler_stats={'calls': 2,
+                                                     'errors': 0,
+                                                     'time': 0.1})
+        info = registry.info(skill)
+        self.assertEqual(info['id'], 'skill-a')
+        self.assertEqual(info['state'], LOADED)
+        self.assertEqual(info['load_time'], 0.5)
+        self.assertEqual(info['handlers']['calls'], 2)
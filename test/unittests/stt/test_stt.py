@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import json
 import unittest
+from threading import Event
 
 import mock
+from speech_recognition import AudioData
 
 import mycroft.stt
 from mycroft.configuration import Configuration
@@ -235,3 +238,127 @@ class TestSTT(unittest.TestCase):
         stt = mycroft.stt.HoundifySTT()
         stt.execute(audio)
         self.assertTrue(stt.recognizer.recognize_houndify.called)
+
+
+class MockWebsocket(object):
+    """ Answers the messages once the audio was sent. """
+    def __init__(self, messages):
+        self.messages = [json.dumps(m) for m in messages]
+        self.audio = []
+        self.eos = Event()
+
+    def send_binary(self, chunk):
+        self.audio.append(chunk)
+
+    def send(self, message):
+        if message == 'EOS':
+            self.eos.set()
+
+    def recv(self):
+        self.eos.wait(5)
+        return self.messages.pop(0) if self.messages else ''
+
+    def close(self):
+        pass
+
+
+class TestStreamingSTT(unittest.TestCase):
+    def audio(self, seconds):
+        return AudioData(b'\0\0' * int(seconds * 16000), 16000, 2)
+
+    def stream(self, stt, audio, chunk_size=2048):
+        partials = []
+        stt.start(audio.sample_rate, audio.sample_width, partials.append)
+        for i in range(0, len(audio.frame_data), chunk_size):
+            stt.feed(audio.frame_data[i:i + chunk_size])
+        return partials
+
+    @mock.patch.object(Configuration, 'get')
+    def test_batch_fallback(self, mock_get):
+        mycroft.stt.Recognizer = mock.MagicMock
+        mock_get.return_value = {
+            'stt': {'module': 'google',
+                    'google': {'credential': {'token': 'FOOBAR'}}},
+            'lang': 'en-US'
+        }
+        stt = mycroft.stt.GoogleSTT()
+        audio = self.audio(1)
+        self.stream(stt, audio)
+        stt.finish(audio)
+        stt.recognizer.recognize_google.assert_called_once_with(
+            audio, 'FOOBAR', 'en-US')
+
+    @mock.patch.object(Configuration, 'get')
+    def test_mock_stream(self, mock_get):
+        mock_get.return_value = {
+            'stt': {'module': 'mock',
+                    'mock': {'utterance': 'what time is it',
+                             'word_sec': 0.3}},
+            'lang': 'en-US'
+        }
+        stt = mycroft.stt.STTFactory.create()
+        self.assertEqual(type(stt), mycroft.stt.MockStreamingSTT)
+        audio = self.audio(1)
+        partials = self.stream(stt, audio)
+        self.assertEqual(stt.finish(audio), 'what time is it')
+        self.assertEqual(partials, ['what', 'what time', 'what time is'])
+
+    @mock.patch.object(Configuration, 'get')
+    def test_other_utterance(self, mock_get):
+        mock_get.return_value = {'stt': {'module': 'mock'}, 'lang': 'en-US'}
+        stt = mycroft.stt.MockStreamingSTT()
+        stt.stream = mock.Mock(return_value='streamed')
+        self.stream(stt, self.audio(1))
+        # The audio streamed doesn't match the utterance to transcribe
+        stt.execute = mock.Mock(return_value='batch')
+        self.assertEqual(stt.finish(self.audio(2)), 'batch')
+
+    @mock.patch('mycroft.stt.create_connection')
+    @mock.patch.object(Configuration, 'get')
+    def test_kaldi_stream(self, mock_get, mock_connect):
+        mock_get.return_value = {
+            'stt': {'module': 'kaldi',
+                    'kaldi': {'uri': 'http://test.com/recognize',
+                              'stream_uri': 'ws://test.com/speech'}},
+            'lang': 'en-US'
+        }
+
+        def result(transcript, final):
+            return {'status': 0, 'result': {
+                'hypotheses': [{'transcript': transcript}], 'final': final}}
+        ws = MockWebsocket([result('what', False),
+                            result('[noise] what time', True),
+                            result('is', False),
+                            result('is it', True)])
+        mock_connect.return_value = ws
+
+        stt = mycroft.stt.KaldiSTT()
+        audio = self.audio(1)
+        partials = self.stream(stt, audio)
+        self.assertEqual(stt.finish(audio), 'what time is it')
+        self.assertEqual(partials, ['what', 'what time is'])
+        self.assertEqual(b''.join(ws.audio), audio.frame_data)
+        uri = mock_connect.call_args[0][0]
+        self.assertTrue(uri.startswith('ws://test.com/speech?content-type='))
+        self.assertIn('rate%3D%28int%2916000', uri)
+
+    @mock.patch('mycroft.stt.post')
+    @mock.patch('mycroft.stt.create_connection')
+    @mock.patch.object(Configuration, 'get')
+    def test_stream_failure(self, mock_get, mock_connect, mock_post):
+        mock_get.return_value = {
+            'stt': {'module': 'deepspeech_server',
+                    'deepspeech_server': {
+                        'uri': 'http://test.com/stt',
+                        'stream_uri': 'ws://test.com/stt/stream'}},
+            'lang': 'en-US'
+        }
+        mock_connect.side_effect = IOError('Connection refused')
+        mock_post.return_value.text = 'what time is it'
+
+        stt = mycroft.stt.DeepSpeechServerSTT()
+        audio = self.audio(1)
+        self.stream(stt, audio)
+        # The whole utterance is sent instead
+        self.assertEqual(stt.finish(audio), 'what time is it')
+        self.assertTrue(mock_post.called)
@@ -0,0 +1,93 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import time
+import unittest
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from mycroft.util.file_watcher import (InotifyWatcher, PollingWatcher,
+                                       create_file_watcher)
+
+
+def touch(path, content='x'):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+class WatcherTestBase(object):
+    def setUp(self):
+        self.dir = mkdtemp()
+        for skill in ('skill-a', 'skill-b'):
+            os.makedirs(join(self.dir, skill, 'vocab'))
+            touch(join(self.dir, skill, '__init__.py'))
+        self.watcher = self.create_watcher()
+
+    def tearDown(self):
+        self.watcher.close()
+        rmtree(self.dir)
+
+    def test_no_change(self):
+        self.assertEqual(self.watcher.wait(0.2), set())
+
+    def test_modified_file(self):
+        time.sleep(0.01)
+        touch(join(self.dir, 'skill-a', 'vocab', 'Hello.voc'), 'hello')
+        self.assertEqual(self.watcher.wait(2),
+                         {join(self.dir, 'skill-a')})
+
+    def test_ignored_files(self):
+        touch(join(self.dir, 'skill-a', 'settings.json'), '{}')
+        touch(join(self.dir, 'skill-b', 'test.pyc'))
+        self.assertEqual(self.watcher.wait(0.2), set())
+
+    def test_new_skill(self):
+        os.makedirs(join(self.dir, 'skill-c', 'dialog'))
+        self.watcher.wait(2)
+        touch(join(self.dir, 'skill-c', 'dialog', 'hi.dialog'))
+        self.assertEqual(self.watcher.wait(2),
+                         {join(self.dir, 'skill-c')})
+
+    def test_debounce(self):
+        for i in range(5):
+            touch(join(self.dir, 'skill-a', '__init__.py'), str(i))
+            touch(join(self.dir, 'skill-b', '__init__.py'), str(i))
+        self.assertEqual(self.watcher.wait(2),
+                         {join(self.dir, 'skill-a'),
+                          join(self.dir, 'skill-b')})
+        self.assertEqual(self.watcher.wait(0.2), set())
+
+
+class TestInotifyWatcher(WatcherTestBase, unittest.TestCase):
+    def create_watcher(self):
+        return InotifyWatcher(self.dir, debounce=0.1)
+
+
+class TestPollingWatcher(WatcherTestBase, unittest.TestCase):
+    def create_watcher(self):
+        return PollingWatcher(self.dir, debounce=0.1, interval=0.05)
+
+    def setUp(self):
+        super(TestPollingWatcher, self).setUp()
+        # Make sure modifications get a different mtime
+        time.sleep(0.01)
+
+
+class TestCreateFileWatcher(unittest.TestCase):
+    def test_missing_directory(self):
+        watcher = create_file_watcher('/tmp/does/not/exist')
+        self.assertIsInstance(watcher, PollingWatcher)
+        watcher.close()
@@ -0,0 +1,63 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import threading
+import time
+import unittest
+from threading import Event
+
+from mycroft.util.timer_service import TimerService
+
+
+class TestTimerService(unittest.TestCase):
+    def setUp(self):
+        self.service = TimerService(max_workers=2)
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_call_later(self):
+        calls = []
+        start = time.time()
+        timers = [self.service.call_later(delay, calls.append, delay)
+                  for delay in (0.2, 0.05, 0.1)]
+        for timer in timers:
+            self.assertTrue(timer.wait(2))
+        self.assertEqual(calls, [0.05, 0.1, 0.2])
+        self.assertGreaterEqual(time.time() - start, 0.2)
+
+    def test_cancel(self):
+        called = Event()
+        timer = self.service.call_later(0.05, called.set)
+        timer.cancel()
+        self.assertTrue(timer.wait(0))
+        self.assertFalse(called.wait(0.2))
+
+    def test_errors_and_slow_calls(self):
+        release = Event()
+        called = Event()
+        self.service.submit(release.wait, 2)
+        self.service.call_later(0, lambda: 1 / 0)
+        # Neither the slow nor the failing call holds up other timers
+        self.service.call_later(0.05, called.set)
+        self.assertTrue(called.wait(1))
+        release.set()
+
+    def test_thread_count(self):
+        threads = threading.active_count()
+        timers = [self.service.call_later(0.01 * (i % 10), lambda: None)
+                  for i in range(100)]
+        for timer in timers:
+            timer.wait(2)
+        self.assertLessEqual(threading.active_count(), threads + 2)